@@ -0,0 +1,128 @@
+# This file contains the implementation of BatchAnalyzer class
+
+"""
+BatchAnalyzer analyzes many positions, e.g. for hints or for labeling positions offline. For every
+position it gives the score of every column and the top_k principal variations (multi-PV):
+
+    {"scores": [score of column 0, score of column 1, ...],    None for full columns
+     "pvs": [(score, [(row, col), ...]), ...]}                 best first, at most top_k of them
+
+Scores are minimax values at the given depth from the point of view of the side to move, which is
+searched as AI (see BoardGameAI.analyze_moves()). Positions must not be over. The transposition
+table is kept between positions (see below), so a score can also come from a deeper entry stored
+while analyzing an earlier position, like think() after earlier searches. Without a table (e.g.
+ai_factory with tt_size_mb=0) scores are exactly the ones of the given depth.
+
+Positions are given as Board.to_bytes() (or as boards) in a list or any iterator, and analyze()
+yields the results lazily in the same order, so a batch doesn't have to fit in memory.
+
+Related positions share the search: the AI of a board size is kept with its transposition table
+and move ordering, and every position is loaded into its board with Board.load(), only the
+columns that changed (the incremental evaluator follows them). Positions of one game one after the
+other reuse most of what the previous ones found.
+
+Large batches are split into chunks of chunk_size consecutive positions (so related positions
+stay together) which are analyzed in a process pool, at most 2 * workers chunks at a time. A batch
+of one chunk, or workers=1, is analyzed in this process. The pool is created at the first large
+batch and kept until close(), like in parallel_search.py. Workers build their AI with
+ai_factory(board), which must be picklable.
+"""
+
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+
+# state of a worker process, set by _init_worker()
+_worker_ai_factory = None
+_worker_board_class = Board
+_worker_ais = {}
+
+
+def _init_worker(ai_factory, board_class) -> None:
+    global _worker_ai_factory, _worker_board_class
+    _worker_ai_factory = ai_factory
+    _worker_board_class = board_class
+
+
+def _analyze_chunk(chunk: list[bytes], depth: int, top_k: int) -> list[dict]:
+    return [_analyze(_worker_ais, _worker_ai_factory, _worker_board_class, data, depth, top_k)
+            for data in chunk]
+
+
+def _analyze(ais: dict, ai_factory, board_class, data: bytes, depth: int, top_k: int) -> dict:
+    # analyzes the position with the AI of its board size from ais, creates the AI if there isn't one
+    position = board_class.from_bytes(data)
+    size = (position.row, position.column)
+    if size not in ais:
+        work = board_class(chr(data[2]), position.row, position.column)
+        ais[size] = (work, ai_factory(work))
+    work, ai = ais[size]
+    work.load(position)
+
+    scores = [None] * position.column
+    lines = ai.analyze_moves(work, depth)
+    for move, score, _ in lines:
+        scores[move[1]] = score
+
+    return {"scores": scores, "pvs": [(score, pv) for _, score, pv in lines[:top_k]]}
+
+
+class BatchAnalyzer:
+
+    def __init__(self, ai_factory, workers: int=1, chunk_size: int=64, board_class=Board):
+        if chunk_size <= 0:
+            raise ValueError("BatchAnalyzer::chunk_size must be positive")
+
+        self.ai_factory = ai_factory
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.board_class = board_class   # Board or BitBoard, positions are rebuilt with it
+
+        self._pool = None
+        self._ais = {}    # (row, column) -> (board, AI) for the positions analyzed in this process
+
+    def analyze(self, positions, depth: int=5, top_k: int=3):
+        # yields the analysis of every position, in the order of positions
+        chunks = self.__chunks(positions)
+        first = next(chunks, None)
+        second = next(chunks, None)
+        if second is None or self.workers <= 1:
+            # not worth sending to other processes
+            for chunk in itertools.chain([chunk for chunk in (first, second) if chunk is not None], chunks):
+                for data in chunk:
+                    yield _analyze(self._ais, self.ai_factory, self.board_class, data, depth, top_k)
+            return
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.ai_factory, self.board_class))
+
+        pending = deque()
+        try:
+            for chunk in itertools.chain([first, second], chunks):
+                pending.append(self._pool.submit(_analyze_chunk, chunk, depth, top_k))
+                if len(pending) >= 2 * self.workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # the caller stopped reading the results
+            for future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __chunks(self, positions):
+        # lists of chunk_size positions as bytes, the last one can be shorter
+        positions = iter(positions)
+        while True:
+            chunk = [position if isinstance(position, bytes) else position.to_bytes()
+                     for position in itertools.islice(positions, self.chunk_size)]
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,175 @@
+# This file contains the implementation of AnytimeSearch class
+
+"""
+AnytimeSearch runs BoardGameAI.think_iter() in a process pool for asyncio programs (e.g. UIs and
+servers), so the event loop is never blocked by a search:
+
+    async with search.updates(board, max_depth, time_limit) as updates:
+        async for move, score, depth, nodes in updates:
+            show(move)              # better and better moves, the first one almost at once
+            if good_enough(score):
+                break               # the search is stopped when the async with block is left
+
+updates() gives the updates of think_iter(): ((row, col), score, depth, nodes), as an async
+iterator that is also an async context manager. think() returns only the last one, the move of the
+deepest search completed within time_limit.
+
+Searches are stopped cooperatively, the worker processes are never killed: leaving the async with
+block, calling aclose() of the updates or cancelling the task that reads them sets the stop flag
+of the search, and the worker sees it through BoardGameAI.should_stop at its next check (every 1024
+nodes) and is free for the next search. Breaking out of a plain async for loop doesn't close an
+async iterator (Python closes it only when it is garbage collected), so without async with the
+updates must be closed with aclose(). time_limit is counted from the call, time spent waiting for
+a free worker included, so it can be used for a latency target.
+
+Every running search has a slot in a shared array: [stop flag, number of updates, row, column,
+score, depth, nodes]. The worker writes every update of think_iter() to its slot, and updates()
+reads the slot every poll_interval seconds, so when a worker finds two moves within one poll only
+the later one is yielded. There are slots for 4 * workers searches, more searches wait for a slot.
+
+Positions are sent as Board.to_bytes(). Every worker builds one AI with ai_factory(board) and keeps
+it, with its transposition table, for all its searches, like in parallel_search.py. The pool is created at the first search and kept until close().
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+
+_FIELDS = 7   # stop, updates, row, column, score, depth, nodes
+
+# state of a worker process, set by _init_worker()
+_worker_ai_factory = None
+_worker_state = None
+_worker_board_class = Board
+_worker_board = None   # board of the worker's AI, made at the first task, every task loads its position
+_worker_ai = None
+
+
+def _init_worker(ai_factory, state, board_class) -> None:
+    global _worker_ai_factory, _worker_state, _worker_board_class
+    _worker_ai_factory = ai_factory
+    _worker_state = state
+    _worker_board_class = board_class
+
+
+class _Updates:
+    # async iterator of the updates of a search, closing it (or leaving async with) stops the search
+
+    def __init__(self, updates):
+        self._updates = updates   # the async generator of AnytimeSearch.__updates()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._updates.__anext__()
+
+    async def aclose(self) -> None:
+        await self._updates.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+def _search_task(data: bytes, max_depth: int, deadline: float, slot: int):
+    # runs think_iter() writing every update to the slot, returns the last update
+    global _worker_board, _worker_ai
+    position = _worker_board_class.from_bytes(data)
+    if _worker_board is None or position.row != _worker_board.row or position.column != _worker_board.column:
+        # the first task or a board of another size, the AI of this one is made again
+        _worker_board = _worker_board_class(Board.red, position.row, position.column)
+        _worker_ai = _worker_ai_factory(_worker_board)
+    board = _worker_board
+    board.load(position)
+    ai = _worker_ai
+    base = slot * _FIELDS
+    ai.should_stop = lambda: _worker_state[base] != 0
+
+    time_limit = None if deadline is None else max(deadline - time.time(), 0.0)
+    last = None
+    for last in ai.think_iter(board, max_depth, time_limit):
+        (row, col), score, depth, nodes = last
+        with _worker_state.get_lock():
+            count = _worker_state[base + 1] + 1
+            _worker_state[base + 1:base + _FIELDS] = [count, row, col, score, depth, nodes]
+
+    return last
+
+
+class AnytimeSearch:
+
+    def __init__(self, ai_factory, workers: int=1, board_class=Board, poll_interval: float=0.01):
+        self.ai_factory = ai_factory
+        self.workers = workers
+        self.board_class = board_class   # Board or BitBoard, the workers rebuild the board with it
+        self.poll_interval = poll_interval
+
+        self._pool = None
+        self._state = None
+        self._n_slots = 4 * workers
+        self._free = list(range(0, self._n_slots))   # slots of the searches that can start
+        self._slots = asyncio.Semaphore(self._n_slots)
+
+    def updates(self, board: Board, max_depth: int=3, time_limit: float=None) -> _Updates:
+        # ((row, col), score, depth, nodes) of every completed iteration, see the top of the file
+        return _Updates(self.__updates(board, max_depth, time_limit))
+
+    async def think(self, board: Board, max_depth: int=3, time_limit: float=None):
+        # returns the last update of updates(), the move of the deepest completed search
+        last = None
+        async with self.updates(board, max_depth, time_limit) as updates:
+            async for last in updates:
+                pass
+        return last
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def __updates(self, board: Board, max_depth: int, time_limit: float):
+        deadline = time.time() + time_limit if time_limit is not None else None
+        await self._slots.acquire()
+        slot = self._free.pop()
+        if self._pool is None:
+            self._state = multiprocessing.Array("d", _FIELDS * self._n_slots)
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.ai_factory, self._state, self.board_class))
+
+        base = slot * _FIELDS
+        with self._state.get_lock():
+            self._state[base:base + _FIELDS] = [0.0] * _FIELDS
+        future = asyncio.wrap_future(self._pool.submit(_search_task, board.to_bytes(), max_depth, deadline,
+                                                       slot))
+
+        seen = 0
+        try:
+            while True:
+                finished = future.done()
+                with self._state.get_lock():
+                    _, count, row, col, score, depth, nodes = self._state[base:base + _FIELDS]
+                if count != seen:
+                    seen = count
+                    yield (int(row), int(col)), score, int(depth), int(nodes)
+                if finished:
+                    future.result()   # errors of the worker are raised here
+                    return
+                await asyncio.wait({future}, timeout=self.poll_interval)
+        finally:
+            if future.done():
+                self.__release(slot)
+            else:
+                # the slot is free again when the worker has stopped
+                with self._state.get_lock():
+                    self._state[base] = 1
+                future.add_done_callback(lambda _: self.__release(slot))
+
+    def __release(self, slot: int) -> None:
+        self._free.append(slot)
+        self._slots.release()
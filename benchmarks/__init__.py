@@ -0,0 +1,2 @@
+# Benchmarks of the AI. Run them from the root of the repository, e.g.
+# python3 -m benchmarks.suite
@@ -0,0 +1,49 @@
+# This file contains the fixed positions the benchmarks are run on
+
+"""
+Positions are given as the columns played one after another from the empty board, AI moves first.
+They never change, so the results of different versions of the code can be compared. None of them
+is a finished game, and AI is to move in all of them (even number of pieces).
+
+CORPORA maps the name of a corpus to (number of rows, number of columns, positions).
+"""
+
+from board import Board
+from bitboard import BitBoard
+from connect_four import ConnectFour
+
+CORPORA = {
+    "6x7 opening": (6, 7, [
+        [],
+        [1, 3, 3, 6, 1, 5],
+        [4, 6, 1, 4, 2, 3, 0, 5],
+    ]),
+    "6x7 middlegame": (6, 7, [
+        [1, 5, 4, 2, 1, 4, 5, 5, 4, 1, 3, 2, 4, 3, 4, 4],
+        [5, 3, 5, 5, 5, 6, 1, 5, 0, 4, 5, 0, 6, 3, 3, 2, 6, 0, 3, 0],
+    ]),
+    "6x7 endgame": (6, 7, [
+        [0, 6, 1, 5, 6, 1, 3, 2, 0, 5, 1, 6, 6, 0, 1, 0, 1, 0, 0, 6, 3, 3, 6, 1, 3, 4, 5, 4, 3, 4],
+        [0, 1, 6, 0, 2, 1, 1, 6, 0, 6, 2, 1, 5, 4, 1, 4, 6, 2, 2, 6, 0, 3, 6, 5, 4, 4, 3, 0, 4, 1, 2, 2, 0, 5],
+    ]),
+    "12x14 opening": (12, 14, [
+        [2, 7, 7, 12, 2, 11, 6, 11, 5, 6],
+    ]),
+    "12x14 middlegame": (12, 14, [
+        [13, 2, 0, 6, 2, 4, 1, 12, 2, 6, 10, 11, 13, 5, 10, 9, 7, 2, 7, 13, 8, 4, 13, 13, 2, 11, 8, 10, 13,
+         0, 1, 1, 0, 9, 5, 8, 11, 7, 13, 13],
+        [9, 9, 13, 11, 9, 6, 13, 10, 4, 11, 10, 1, 9, 9, 5, 0, 5, 4, 2, 3, 7, 11, 2, 0, 12, 9, 11, 2, 12, 2,
+         4, 8, 4, 5, 6, 12, 2, 11, 12, 2, 4, 13, 10, 11, 3, 12, 13, 9, 9, 13, 7, 4, 11, 8, 0, 1, 4, 9, 7, 0,
+         12, 12, 4, 9, 4, 4, 13, 9, 11, 6, 9, 12, 11, 4, 6, 4, 0, 5, 0, 3],
+    ]),
+}
+
+
+def make_board(columns: list[int], n_row: int=6, n_column: int=7, bitboard: bool=False) -> Board:
+    board = BitBoard(Board.red, n_row, n_column) if bitboard else Board(Board.red, n_row, n_column)
+    char = Board.ai
+    for col in columns:
+        board.set(ConnectFour.gravity(board, col), col, char)
+        char = Board.player if char == Board.ai else Board.ai
+
+    return board
@@ -0,0 +1,59 @@
+# This file measures how fast Lazy SMP reaches a depth with more workers
+
+"""
+Searches a few fixed positions to a fixed depth with LazySMPSearch using 1, 2, 4, ... worker
+processes and prints the time to depth, the total nodes of all workers and the speedup compared
+to one worker. The pool is started (and the processes warmed up) before the time is measured.
+
+Usage: python3 -m benchmarks.lazy_smp [-d depth] [-w max workers]
+"""
+
+import argparse
+import functools
+import multiprocessing
+import time
+
+from benchmarks.corpus import make_board
+from benchmarks.move_ordering import POSITIONS
+from connect_four import ConnectFour
+from lazy_smp import LazySMPSearch
+
+
+def run(depth: int, max_workers: int) -> None:
+    ai_factory = functools.partial(ConnectFour.make_ai, evaluator="incremental", tt_size_mb=0)
+
+    worker_counts = []
+    workers = 1
+    while workers <= max_workers:
+        worker_counts.append(workers)
+        workers *= 2
+
+    print(f"{'position':<30} {'workers':>8} {'seconds':>10} {'nodes':>12} {'speedup':>8}")
+    for columns in POSITIONS:
+        baseline = None
+        for workers in worker_counts:
+            search = LazySMPSearch(ai_factory, workers=workers, tt_size_mb=64)
+            try:
+                # start the processes
+                search.think(make_board(columns), 0)
+
+                start = time.perf_counter()
+                search.think(make_board(columns), depth)
+                seconds = time.perf_counter() - start
+                nodes = search.last_stats.total_nodes
+            finally:
+                search.close()
+
+            if baseline is None:
+                baseline = seconds
+            print(f"{str(columns):<30} {workers:>8} {seconds:>10.3f} {nodes:>12} {baseline / seconds:>7.2f}x")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--depth", type=int, help="depth of the search", default=6)
+    parser.add_argument("-w", "--workers", type=int, help="largest number of workers",
+                        default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+    run(args.depth, args.workers)
@@ -0,0 +1,78 @@
+# This file measures how much move ordering reduces the search
+
+"""
+Searches a few fixed positions at a fixed depth with different move ordering settings and prints
+the number of visited nodes and the reduction compared to plain left to right order. Scores of the
+root moves must not depend on the order, this is checked too.
+
+Usage: python3 -m benchmarks.move_ordering [-d depth]
+"""
+
+import argparse
+import functools
+
+from benchmarks.corpus import make_board
+from board_game_AI import BoardGameAI
+from connect_four import ConnectFour
+from move_ordering import MoveOrdering
+from search_trace import TraceSink
+
+# positions given as columns played one after another, AI moves first
+POSITIONS = [
+    [],
+    [3, 3, 2, 4],
+    [3, 2, 3, 3, 4, 2, 1],
+    [3, 3, 3, 3, 2, 4, 4, 2, 5, 1],
+]
+
+# name, center first, transposition table, killers, history
+SETTINGS = [
+    ("left to right", False, False, False, False),
+    ("center first", True, False, False, False),
+    ("+ tt move", True, True, False, False),
+    ("+ killers", True, True, True, False),
+    ("+ history", True, True, True, True),
+]
+
+
+class _Scores(TraceSink):
+    # remembers the scores of the root moves
+
+    def summary(self, move_scores):
+        self.scores = sorted((tuple(move), value) for move, value in move_scores)
+
+
+def run(depth: int) -> None:
+    print(f"{'position':<30} {'setting':<15} {'nodes':>10} {'reduction':>10}")
+    for columns in POSITIONS:
+        baseline = None
+        baseline_scores = None
+        for name, center, tt, killers, history in SETTINGS:
+            board = make_board(columns)
+            legal_moves_func = ConnectFour.generate_legal_moves
+            if center:
+                legal_moves_func = functools.partial(ConnectFour.generate_legal_moves,
+                                                     order=ConnectFour.center_order(board.column))
+            ordering = MoveOrdering(killers, history) if killers or history else None
+            scores = _Scores()
+            ai = BoardGameAI(ConnectFour.evaluation_func, ConnectFour.is_endgame, legal_moves_func,
+                             tt_size_mb=16 if tt else 0, trace=scores, move_ordering=ordering)
+            ai.think(board, depth)
+
+            nodes = ai.last_stats.total_nodes
+            if baseline is None:
+                baseline = nodes
+                baseline_scores = scores.scores
+            elif scores.scores != baseline_scores:
+                print(f"scores differ from left to right order: {scores.scores} {baseline_scores}")
+
+            reduction = 100.0 * (baseline - nodes) / baseline
+            print(f"{str(columns):<30} {name:<15} {nodes:>10} {reduction:>9.1f}%")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--depth", type=int, help="depth of the search", default=4)
+    args = parser.parse_args()
+    run(args.depth)
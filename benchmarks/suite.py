@@ -0,0 +1,188 @@
+# This file runs the benchmark suite and compares it with a baseline
+
+"""
+Runs micro benchmarks of the functions the search calls at every node (evaluation_func,
+is_endgame, generate_legal_moves) and macro benchmarks of fixed depth searches, on the fixed
+positions of benchmarks/corpus.py, with both Board and BitBoard.
+
+Every benchmark gives its time (microseconds per call for micro benchmarks, seconds of all the
+searches for macro benchmarks). Macro benchmarks also give the number of visited nodes and the
+moves chosen. These don't depend on the machine, so if they change the search itself has changed,
+not only its speed.
+
+Results are written as JSON with -o. They are compared to a baseline file: a benchmark is a
+regression if its nodes or moves are different from the baseline, or if its time is more than
+threshold (default 10%) slower. The exit code is 1 if there is any.
+
+benchmarks/baseline.json is the baseline by default. It has the nodes and moves of the search
+benchmarks, without times, so every run is checked for changes of the search out of the box. When
+a change of the search is intended, write the new nodes and moves to it with -u. Times are only
+comparable on the same machine: for them write a baseline with -o on the machine you compare on,
+and give it with -b. -b off turns the comparison off.
+
+Usage: python3 -m benchmarks.suite [-o results.json] [-b baseline.json | off] [-u] [-t threshold]
+                                   [-k filter]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks.corpus import CORPORA, make_board
+from connect_four import ConnectFour
+
+# depth of the macro benchmark searches for each board size
+SEARCH_DEPTH = {(6, 7): 5, (12, 14): 3}
+
+# nodes and moves of the search benchmarks, see the description at the top of the file
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+MICRO = {
+    "evaluation_func": lambda board, last: ConnectFour.evaluation_func(board),
+    "is_endgame": lambda board, last: ConnectFour.is_endgame(board, last[0], last[1]),
+    "generate_legal_moves": lambda board, last: ConnectFour.generate_legal_moves(board),
+}
+
+
+def _last_move(board, columns: list[int]):
+    # (row, col) of the last piece put on the board
+    col = columns[-1]
+    return ConnectFour.gravity(board, col) + 1, col
+
+
+def _time_micro(func, boards, repeat: int) -> float:
+    # best of repeat runs, in microseconds per call
+    number = 0
+    elapsed = 0.0
+    # at least 0.05 seconds per run, so timer resolution doesn't matter
+    while elapsed < 0.05:
+        number = number * 2 if number else 1
+        start = time.perf_counter()
+        for _ in range(0, number):
+            for board, last in boards:
+                func(board, last)
+        elapsed = time.perf_counter() - start
+
+    best = elapsed
+    for _ in range(1, repeat):
+        start = time.perf_counter()
+        for _ in range(0, number):
+            for board, last in boards:
+                func(board, last)
+        best = min(best, time.perf_counter() - start)
+
+    return best / (number * len(boards)) * 1e6
+
+
+def run(selected: str=None, repeat: int=5) -> dict:
+    # runs the benchmarks whose name contains selected (all if None), returns {name: result}
+    results = {}
+    for corpus, (n_row, n_column, positions) in CORPORA.items():
+        for bitboard in (False, True):
+            board_name = "bitboard" if bitboard else "board"
+            played = [p for p in positions if p]
+
+            for func_name, func in MICRO.items():
+                name = f"micro/{func_name}/{corpus}/{board_name}"
+                if selected is not None and selected not in name:
+                    continue
+                boards = []
+                for columns in played:
+                    board = make_board(columns, n_row, n_column, bitboard)
+                    boards.append((board, _last_move(board, columns)))
+                results[name] = {"us_per_call": _time_micro(func, boards, repeat)}
+
+            depth = SEARCH_DEPTH[(n_row, n_column)]
+            name = f"search/{corpus}/{board_name}/depth{depth}"
+            if selected is not None and selected not in name:
+                continue
+            seconds = 0.0
+            nodes = 0
+            moves = []
+            for columns in positions:
+                board = make_board(columns, n_row, n_column, bitboard)
+                ai = ConnectFour.make_ai(board)
+                start = time.perf_counter()
+                move = ai.think(board, depth)
+                seconds += time.perf_counter() - start
+                nodes += ai.last_stats.total_nodes
+                moves.append([int(move[0]), int(move[1])])
+            results[name] = {"seconds": seconds, "nodes": nodes, "moves": moves}
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    # prints the comparison, returns True if there is no regression
+    ok = True
+    print(f"{'benchmark':<60} {'baseline':>12} {'current':>12} {'change':>8}  status")
+    for name, result in results.items():
+        key = "us_per_call" if "us_per_call" in result else "seconds"
+        if name not in baseline:
+            print(f"{name:<60} {'-':>12} {result[key]:>12.4f} {'-':>8}  new")
+            continue
+
+        base = baseline[name]
+        # a baseline without times (like the default one) only checks nodes and moves
+        timed = key in base
+        change = result[key] / base[key] - 1.0 if timed and base[key] > 0 else 0.0
+
+        status = "ok"
+        if result.get("nodes") != base.get("nodes") or result.get("moves") != base.get("moves"):
+            status = f"CHANGED (nodes {base.get('nodes')} -> {result.get('nodes')})"
+        elif change > threshold:
+            status = "SLOWER"
+        elif change < -threshold:
+            status = "faster"
+        if status.startswith(("CHANGED", "SLOWER")):
+            ok = False
+
+        if timed:
+            print(f"{name:<60} {base[key]:>12.4f} {result[key]:>12.4f} {100.0 * change:>7.1f}%  {status}")
+        else:
+            print(f"{name:<60} {'-':>12} {result[key]:>12.4f} {'-':>8}  {status}")
+
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-o", "--output", type=str, help="file to write the results to, JSON", default=None)
+    parser.add_argument("-b", "--baseline", type=str, help="results file to compare with, off for no comparison", default=DEFAULT_BASELINE)
+    parser.add_argument("-u", "--update_baseline", action="store_true", help="write the nodes and moves of the searches to the baseline file instead of comparing")
+    parser.add_argument("-t", "--threshold", type=float, help="slowdown counted as regression, 0.1 = 10%%", default=0.1)
+    parser.add_argument("-k", "--filter", type=str, help="run only the benchmarks whose name contains this", default=None)
+    parser.add_argument("-rp", "--repeat", type=int, help="runs of every micro benchmark, the best is taken", default=5)
+    args = parser.parse_args()
+
+    results = run(args.filter, args.repeat)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "results": results}, f, indent=1)
+
+    if args.update_baseline:
+        if args.baseline == "off":
+            print("baseline file must be given to update it")
+            sys.exit(1)
+        # benchmarks left out with -k keep their baseline
+        searches = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                searches = json.load(f)["results"]
+        searches.update({name: {"nodes": result["nodes"], "moves": result["moves"]}
+                         for name, result in results.items() if "nodes" in result})
+        with open(args.baseline, "w") as f:
+            json.dump({"results": searches}, f, indent=1)
+    elif args.baseline != "off":
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        if not compare(results, baseline, args.threshold):
+            sys.exit(1)
+    else:
+        for name, result in results.items():
+            print(f"{name:<60} {json.dumps(result)}")
@@ -0,0 +1,219 @@
+# This file contains BitBoard class implementation
+
+"""
+BitBoard is a drop-in replacement for Board that keeps the position in two python integers
+(one mask per side) instead of a numpy matrix. Every column owns (row + 1) consecutive bits,
+the extra top bit is a sentinel that is always 0, so shifted masks never wrap from one column
+into the next. Bit 0 of a column is the bottom cell of the board (row = n_row - 1).
+Following is the bit layout of 6x7 board (numbers are bit indices):
+
+                           0  1  2  3  4  5  6
+                           ____________________
+                        -  6 13 20 27 34 41 48   <- sentinel bits
+                        0 |5 12 19 26 33 40 47
+                        1 |4 11 18 25 32 39 46
+                        2 |3 10 17 24 31 38 45
+                        3 |2  9 16 23 30 37 44
+                        4 |1  8 15 22 29 36 43
+                        5 |0  7 14 21 28 35 42
+
+Four in a row is detected with shift-and-mask: for a direction with shift s,
+m = mask & (mask >> s) marks every cell that has a friendly piece s bits further, and
+m & (m >> 2s) is non-zero only if there are 4 friendly pieces in a row. Shifts are
+1 (vertical), row + 1 (horizontal), row (diagonal /) and row + 2 (diagonal \\).
+
+Python integers are not limited to 64 bits, so any board size accepted by main.py (up to 30x30)
+works the same way.
+
+Height of each column (number of pieces in it) and total number of pieces are kept alongside the
+masks, so gravity, is_full() and making/unmaking a move are all O(1). make_move() finds the winner
+with is_win() of the mover's mask.
+"""
+
+import numpy as np
+
+from board import Board
+
+class BitBoard(Board):
+
+    def __init__(self, p_colour: str, row: int=6, column: int=7):
+        # Board.__init__ is not called on purpose, there is no numpy matrix behind this board
+        self.column = column
+        self.row = row
+
+        self._p_colour = p_colour
+        self._ai_colour = Board.red if p_colour == Board.blue else Board.blue
+
+        self._col_bits = row + 1 # one sentinel bit on top of each column
+        self._shifts = (1, self._col_bits, self._col_bits - 1, self._col_bits + 1)
+        self._bottom = sum(1 << (c * self._col_bits) for c in range(0, column))
+
+        self._player_mask = 0
+        self._ai_mask = 0
+        self.heights = [0] * column # number of pieces in each column
+        self.n_pieces = 0
+        self._observers = []
+
+        # move stack, see Board
+        self.n_moves = 0
+        self._move_stack = [0] * (row * column)
+        self.last_row = -1
+        self.last_col = -1
+        self.winner = Board.empty
+
+    def set(self, row: int, col: int, char: int) -> None:
+        # puts the piece in a specified coordinate
+        if self._observers:
+            old = self.get(row, col)
+
+        bit = 1 << (col * self._col_bits + self.row - 1 - row)
+        if (self._player_mask | self._ai_mask) & bit:
+            self._player_mask &= ~bit
+            self._ai_mask &= ~bit
+        else:
+            self.n_pieces += 1
+
+        if char == Board.ai:
+            self._ai_mask |= bit
+        elif char == Board.player:
+            self._player_mask |= bit
+        else:
+            raise ValueError("BitBoard::set(): char should be either Board.ai or Board.player")
+
+        if self.heights[col] < self.row - row:
+            self.heights[col] = self.row - row
+        self.last_row = -1
+        self.winner = Board.empty
+
+        if self._observers:
+            for observer in self._observers:
+                observer.on_change(row, col, old, char)
+
+    def remove(self, row: int, col: int) -> None:
+        # removes the piece from board in a specified coordinate
+        if self._observers:
+            old = self.get(row, col)
+
+        bit = 1 << (col * self._col_bits + self.row - 1 - row)
+        if (self._player_mask | self._ai_mask) & bit:
+            self._player_mask &= ~bit
+            self._ai_mask &= ~bit
+            self.n_pieces -= 1
+
+        # pieces are removed from the top of the column (reverse order of moves)
+        if self.heights[col] > self.row - 1 - row:
+            self.heights[col] = self.row - 1 - row
+        self.last_row = -1
+        self.winner = Board.empty
+
+        if self._observers:
+            for observer in self._observers:
+                observer.on_change(row, col, old, Board.empty)
+
+    def get(self, row: int, col: int) -> int:
+        # returns the 'character' in board[row][col]
+        bit = 1 << (col * self._col_bits + self.row - 1 - row)
+        if self._ai_mask & bit:
+            return Board.ai
+        if self._player_mask & bit:
+            return Board.player
+        return Board.empty
+
+    def is_full(self) -> bool:
+        return self.n_pieces == self.row * self.column
+
+    def to_array(self) -> np.ndarray:
+        # returns the board as (row)x(column) int8 matrix, same as Board.to_array()
+        n_bytes = (self.column * self._col_bits + 7) // 8
+        arr = np.zeros((self.row, self.column), dtype=np.int8)
+        for mask, char in ((self._player_mask, Board.player), (self._ai_mask, Board.ai)):
+            bits = np.unpackbits(np.frombuffer(mask.to_bytes(n_bytes, "little"), dtype=np.uint8), bitorder="little")
+            # columns of bits are bottom to top, rows of the matrix are top to bottom
+            cells = bits[:self.column * self._col_bits].reshape(self.column, self._col_bits)[:, self.row - 1::-1].T
+            arr[cells == 1] = char
+
+        return arr
+
+    def key(self) -> int:
+        # same as Board.key(), the masks already have its layout
+        return self._ai_mask | (self._ai_mask + self._player_mask + self._bottom)
+
+    def play(self, col: int, char: int) -> int:
+        # drops a piece to the column and returns the row it landed on
+        row = self.row - 1 - self.heights[col]
+        bit = 1 << (col * self._col_bits + self.heights[col])
+        if char == Board.ai:
+            self._ai_mask |= bit
+        elif char == Board.player:
+            self._player_mask |= bit
+        else:
+            raise ValueError("BitBoard::play(): char should be either Board.ai or Board.player")
+
+        self.heights[col] += 1
+        self.n_pieces += 1
+        self.last_row = -1
+        self.winner = Board.empty
+
+        if self._observers:
+            for observer in self._observers:
+                observer.on_change(row, col, Board.empty, char)
+
+        return row
+
+    def undo(self, col: int) -> None:
+        # takes back the top piece of the column
+        self.heights[col] -= 1
+        self.n_pieces -= 1
+        self.last_row = -1
+        self.winner = Board.empty
+        if self._observers:
+            row = self.row - 1 - self.heights[col]
+            old = self.get(row, col)
+
+        bit = ~(1 << (col * self._col_bits + self.heights[col]))
+        self._ai_mask &= bit
+        self._player_mask &= bit
+
+        if self._observers:
+            for observer in self._observers:
+                observer.on_change(row, col, old, Board.empty)
+
+    def make_move(self, col: int, char: int) -> int:
+        # same as Board.make_move(), with play()
+        if self.heights[col] == self.row:
+            raise ValueError("BitBoard::make_move(): column is full")
+
+        row = self.play(col, char)
+        self._move_stack[self.n_moves] = col
+        self.n_moves += 1
+
+        self.last_row = row
+        self.last_col = col
+        self.winner = char if self.is_win(char) else Board.empty
+        return row
+
+    def unmake_move(self) -> None:
+        # same as Board.unmake_move(), with undo()
+        self.n_moves -= 1
+        self.undo(self._move_stack[self.n_moves])
+        self.winner = Board.empty
+
+        if self.n_moves > 0:
+            self.last_col = self._move_stack[self.n_moves - 1]
+            self.last_row = self.row - self.heights[self.last_col]
+        else:
+            self.last_row = -1
+
+    def is_winning_move(self, row: int, col: int) -> bool:
+        # there can't be 4 in a row of the mover before its move, so a win anywhere is made by it
+        return self.is_win(self.get(row, col))
+
+    def is_win(self, char: int) -> bool:
+        # checks whether 'char' has 4 in a row anywhere on the board
+        mask = self._ai_mask if char == Board.ai else self._player_mask
+        for shift in self._shifts:
+            m = mask & (mask >> shift)
+            if m & (m >> (2 * shift)):
+                return True
+
+        return False
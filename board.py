@@ -15,6 +15,38 @@ by Board.ai, empty cells by Board.empty. These static variables are just numbers
 Size of a board is not limited to the 6x7. it can be specified when creating a board, and cannot be and shouldnt be changed after that.
 
 display() function prints the board to the terminal in a nicely formatted way
+
+to_bytes() encodes the board in a compact form: 3 bytes of header (number of rows, number of
+columns, player's colour) followed by the cells packed 4 per byte, 2 bits each, row by row.
+Board.from_bytes() creates the board back. It is much smaller and faster than pickling the
+board, e.g. for sending it to other processes.
+
+key() gives the position as one integer, exact without collisions, for hashing and storing
+positions: every column gives (row + 1) bits, a bit for each piece in it from the bottom (1 for AI,
+0 for player) and a 1 bit just above the top piece, column 0 in the lowest bits. It is the same
+layout as BitBoard masks, so for a BitBoard it is just key = ai_mask | (ai_mask + player_mask +
+bottom bits). Whose turn it is follows from the pieces, so it doesn't need to be in the key.
+Board.from_key() creates the board back (pieces must lie on each other, as they do in the game).
+A position and its left-right mirror image are equally good for both sides, canonical_key() returns
+the smaller key of the two and whether it is the mirror's, to_bytes(canonical=True) and mirror()
+give the mirrored board the same way. is_symmetric() checks whether the board is its own mirror
+image (e.g. the empty board), then a move and its mirrored move are equally good.
+
+Besides set() and remove() the board has a move stack for searching: make_move(col, char) drops a
+piece to the column and unmake_move() takes back the last one. The board keeps the height of every
+column, the number of pieces (so is_full() and gravity() are O(1)), the last move made with
+make_move() (last_row, last_col) and winner: the 'character' that completed four in a row with that
+move, Board.empty if it didn't. Nothing is allocated per move, the stack is a list of
+row * column columns made once. set() and remove() clear last move and winner, since they can
+change the position in any way. Moves are not made after a win, so unmake_move() always clears the
+winner.
+
+load(position) makes the board the same position as another board of the same size, changing only
+the columns that differ, so a board (and what is attached to it) can be reused for many positions.
+
+Objects that need to follow the changes on the board (e.g. incremental evaluation) can be attached
+with attach(). Their on_change(row, col, old, new) is called after every set() and remove(),
+where old and new are the 'characters' in [row][col] before and after the change.
 """
 
 import numpy as np
@@ -27,6 +59,9 @@ class Board:
     empty = 0
     red = 'r'
     blue = 'b'
+
+    # (row, col) steps of the lines 4 in a row can be in: vertical, horizontal and two diagonals
+    DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
     
     def __init__(self, p_colour: str, row: int=6, column: int=7):
         self.column = column
@@ -35,10 +70,20 @@ class Board:
         self._p_colour = p_colour
         self._ai_colour = Board.red if p_colour == Board.blue else Board.blue
         self._board = Board.__create_board(self.row, self.column)
+        self._observers = []
 
+        self.heights = [0] * column     # number of pieces in each column
+        self.n_pieces = 0
+        self.n_moves = 0                # number of moves on the move stack
+        self._move_stack = [0] * (row * column)   # columns of make_move() calls
+        self.last_row = -1
+        self.last_col = -1
+        self.winner = Board.empty
 
     def set(self, row: int, col: int, char: int) -> None:
         # puts the piece in a specified coordinate
+        old = int(self._board[row][col])
+
         if char == Board.ai:
             self._board[row][col] = Board.ai
         elif char == Board.player:
@@ -46,20 +91,202 @@ class Board:
         else:
             raise ValueError("Board::put(): char should be either Board.ai or Board.player")
 
+        if old == Board.empty:
+            self.n_pieces += 1
+        if self.heights[col] < self.row - row:
+            self.heights[col] = self.row - row
+        self.last_row = -1
+        self.winner = Board.empty
+
+        if self._observers:
+            for observer in self._observers:
+                observer.on_change(row, col, old, char)
+
     def remove(self, row:int, col: int) -> None:
         # removes the the piece from board in a specified coordinate
         # just replaces the 'character' in [row][col] with Board.empty
+        old = int(self._board[row][col])
         self._board[row][col] = Board.empty
 
+        if old != Board.empty:
+            self.n_pieces -= 1
+        # pieces are removed from the top of the column (reverse order of moves)
+        if self.heights[col] > self.row - 1 - row:
+            self.heights[col] = self.row - 1 - row
+        self.last_row = -1
+        self.winner = Board.empty
+
+        if self._observers:
+            for observer in self._observers:
+                observer.on_change(row, col, old, Board.empty)
+
+    def make_move(self, col: int, char: int) -> int:
+        # drops the piece to the column, returns the row it landed on
+        if self.heights[col] == self.row:
+            raise ValueError("Board::make_move(): column is full")
+
+        row = self.row - 1 - self.heights[col]
+        self.set(row, col, char)
+        self._move_stack[self.n_moves] = col
+        self.n_moves += 1
+
+        self.last_row = row
+        self.last_col = col
+        if self.is_winning_move(row, col):
+            self.winner = char
+
+        return row
+
+    def unmake_move(self) -> None:
+        # takes back the last move made with make_move()
+        self.n_moves -= 1
+        col = self._move_stack[self.n_moves]
+        self.remove(self.row - self.heights[col], col)
+
+        # the previous move is on the top of its column
+        if self.n_moves > 0:
+            self.last_col = self._move_stack[self.n_moves - 1]
+            self.last_row = self.row - self.heights[self.last_col]
+
+    @property
+    def last_move(self):
+        # (row, col) of the last make_move(), None if there isn't one
+        if self.last_row == -1:
+            return None
+        return (self.last_row, self.last_col)
+
+    def is_winning_move(self, row: int, col: int) -> bool:
+        # checks whether the piece in [row][col] is part of 4 in a row, looking only at its lines
+        char = self._board[row, col]
+        for d_row, d_col in Board.DIRECTIONS:
+            count = 1
+            r, c = row + d_row, col + d_col
+            while 0 <= r < self.row and 0 <= c < self.column and self._board[r, c] == char:
+                count += 1
+                r, c = r + d_row, c + d_col
+            r, c = row - d_row, col - d_col
+            while 0 <= r < self.row and 0 <= c < self.column and self._board[r, c] == char:
+                count += 1
+                r, c = r - d_row, c - d_col
+            if count >= 4:
+                return True
+
+        return False
+
+    def gravity(self, col: int) -> int:
+        # returns the bottom row which is not occupied, -1 if column is full
+        return self.row - 1 - self.heights[col]
+
+    def attach(self, observer) -> None:
+        # observer.on_change(row, col, old, new) will be called on every change of the board
+        self._observers.append(observer)
+
+    def detach(self, observer) -> None:
+        self._observers.remove(observer)
+
     def get(self, row: int, col: int) -> int:
         # returns the 'character' in board[row][col]
         # 'character' is either Board.ai or Board.player
         return self._board[row][col]
 
     def is_full(self) -> bool:
-        return np.all(self._board != 0)
+        return self.n_pieces == self.row * self.column
+
+    def to_array(self) -> np.ndarray:
+        # returns the (row)x(column) int8 matrix of the board, it is not a copy
+        return self._board
+
+    def to_bytes(self, canonical: bool=False) -> bytes:
+        # with canonical=True a board and its mirror image give the same bytes (see canonical_key())
+        cells = self.to_array()
+        if canonical and self.canonical_key()[1]:
+            cells = cells[:, ::-1]
+        cells = cells.ravel().astype(np.uint8)
+        cells = np.concatenate([cells, np.zeros((-len(cells)) % 4, dtype=np.uint8)]).reshape(-1, 4)
+        packed = cells[:, 0] | (cells[:, 1] << 2) | (cells[:, 2] << 4) | (cells[:, 3] << 6)
+        return bytes([self.row, self.column, ord(self._p_colour)]) + packed.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Board":
+        # creates the board from to_bytes() output. Called on BitBoard creates a BitBoard
+        row, column, p_colour = data[0], data[1], chr(data[2])
+        packed = np.frombuffer(data, dtype=np.uint8, offset=3)
+        cells = np.stack([packed & 3, (packed >> 2) & 3, (packed >> 4) & 3, packed >> 6], axis=1).ravel()
+
+        board = cls(p_colour, row, column)
+        for index in np.flatnonzero(cells[:row * column]):
+            board.set(int(index) // column, int(index) % column, int(cells[index]))
+
+        return board
+
+    def load(self, position: "Board") -> None:
+        # makes this board the same position as 'position', changing only the columns that are
+        # different, with set() and remove() so attached objects follow the changes
+        for col in range(0, self.column):
+            # pieces of the column that are the same in both, from the bottom
+            same = 0
+            while (same < self.heights[col] and same < position.heights[col]
+                   and self.get(self.row - 1 - same, col) == position.get(self.row - 1 - same, col)):
+                same += 1
+
+            while self.heights[col] > same:
+                self.remove(self.row - self.heights[col], col)
+            for h in range(same, position.heights[col]):
+                self.set(self.row - 1 - h, col, position.get(self.row - 1 - h, col))
+
+    def key(self) -> int:
+        # exact key of the position, see the description at the top of the file
+        cells = self._board
+        key = 0
+        for c in range(self.column - 1, -1, -1):
+            height = self.heights[c]
+            code = 1 << height
+            for i in range(0, height):
+                if cells[self.row - 1 - i, c] == Board.ai:
+                    code |= 1 << i
+            key = (key << (self.row + 1)) | code
+
+        return key
+
+    def canonical_key(self) -> tuple[int, bool]:
+        # returns (the smaller key of the board and its mirror image, True if it is the mirror's)
+        key = self.key()
+        mirrored_key = self.__mirrored_key(key)
+        if mirrored_key < key:
+            return mirrored_key, True
+        return key, False
+
+    def is_symmetric(self) -> bool:
+        # checks whether the board is the same as its mirror image
+        heights = self.heights
+        for c in range(0, self.column // 2):
+            if heights[c] != heights[self.column - 1 - c]:
+                return False
+
+        key = self.key()
+        return self.__mirrored_key(key) == key
+
+    @classmethod
+    def from_key(cls, key: int, p_colour: str, row: int=6, column: int=7) -> "Board":
+        # creates the board from key(), the pieces of every column are put from the bottom
+        board = cls(p_colour, row, column)
+        column_mask = (1 << (row + 1)) - 1
+        for c in range(0, column):
+            code = (key >> (c * (row + 1))) & column_mask
+            for i in range(0, code.bit_length() - 1):
+                board.set(row - 1 - i, c, Board.ai if (code >> i) & 1 else Board.player)
+
+        return board
+
+    def mirror(self) -> "Board":
+        # returns a new board of the same class with the columns in reverse order
+        mirrored = type(self)(self._p_colour, self.row, self.column)
+        cells = self.to_array()
+        for row, col in zip(*np.nonzero(cells)):
+            mirrored.set(int(row), self.column - 1 - int(col), int(cells[row, col]))
+
+        return mirrored
 
-        
     def display(self) -> None:
         # at top print column numbers
         for i in range(0, self.column):
@@ -77,9 +304,10 @@ class Board:
 
             # print characters: Board.ai = blue O, Board.player = red O, Board.empty = .
             for j in range(0, self.column):
-                if self._board[i][j] == Board.player:
+                ch = self.get(i, j)
+                if ch == Board.player:
                     print(Board.__colour_char("O", self._p_colour), end=" ")
-                elif self._board[i][j] == Board.ai:
+                elif ch == Board.ai:
                     print(Board.__colour_char("O", self._ai_colour), end=" ")
                 else:
                     print(". ", end="")
@@ -88,6 +316,17 @@ class Board:
 
         print("\n")
 
+    def __mirrored_key(self, key: int) -> int:
+        # key of the mirror image of the board with key, the codes of the columns in reverse order
+        col_bits = self.row + 1
+        column_mask = (1 << col_bits) - 1
+        mirrored_key = 0
+        for _ in range(0, self.column):
+            mirrored_key = (mirrored_key << col_bits) | (key & column_mask)
+            key >>= col_bits
+
+        return mirrored_key
+
     @staticmethod
     def __create_board(row, col):# returns numpy array
         arr = np.zeros((row, col), dtype=np.int8)
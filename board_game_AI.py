@@ -11,72 +11,453 @@ values of evaluation.
 For getting the best move for AI at the turn just use
 think() function which returns a tuple(row, column)
 
+Passing tt_size_mb > 0 turns on the transposition table (see transposition_table.py). Positions
+are hashed with Zobrist hashing, the hash is updated while think() puts and removes pieces.
+Pieces are put and removed with the board's make_move() and unmake_move() (see board.py).
+The table lives as long as the object, so the results of the previous turns of the game are
+reused in the next turns.
+
+Search doesn't print anything by itself. What happens during the search can be followed by passing
+a trace sink (see search_trace.py), e.g. trace=PrintTrace() prints every searched move.
+
+Statistics of every search (nodes and cutoffs per depth, effective branching factor, evaluation
+and endgame function calls, transposition table hits, nodes per second) are kept in last_stats,
+see search_stats.py. With profile=True time spent in evaluation and endgame functions is measured.
+
+Moves are searched in the order the game's legal moves function gives them, improved by the
+principal variation and transposition table moves, and by killer moves and history heuristic when
+a MoveOrdering (see move_ordering.py) is given. Better order means more alpha-beta cutoffs.
+
+The moves of AI at the root are given by root_moves_func, legal_moves_func if it is not given.
+A game can leave out moves there that are known to be as good as other moves, e.g. ConnectFour
+leaves out mirror image moves on symmetric boards. Only the root is affected.
+
+A game can also give threat_func(board, char), called before the moves of every node are searched
+with the 'character' to move. It returns (1, columns) if the side to move wins at once by playing
+in one of the columns, (-1, None) if it loses whatever it plays (the opponent wins with its next
+move), otherwise (0, columns to search) or (0, None) for all of them. Won and lost nodes get their
+value without searching any move, forced nodes search only the given columns (see
+threat_analysis.py for ConnectFour). Forced wins and losses are found even at the last ply, where
+the search alone would only see the evaluation.
+
+think() can also be given a time limit in seconds instead of relying only on the depth. Then it
+searches with iterative deepening and returns the best move of the deepest completed depth. Each
+iteration searches the principal variation of the previous one first, which makes the cutoffs of
+alpha-beta pruning happen much earlier.
+
+With pvs=True the search is Principal Variation Search, in negamax form (every node maximizes
+the value for its side to move). The first move of a node is searched with the whole window, the
+other moves only with a null window (alpha, alpha + 1) that tells whether they are better than the
+first one, which is cheaper, and only the ones that are get searched again with the whole window.
+Scores are the same as alpha-beta finds at the same depth (evaluations must be integers for the
+null window), among equally good moves PVS keeps the first one and alpha-beta the last one. With
+time_limit every iteration searches the root with an aspiration window: +-ASPIRATION_WINDOW around
+the score of two iterations before, opened on one side when the score falls out of it.
+
+think_pv() returns the principal variation (the moves both sides are expected to play) and the
+score of the move too. analyze_moves() gives the exact score and the principal variation of every
+move instead of only the best one (multi-PV), e.g. for hints and analysis (see analysis.py).
+
+think_iter() is the anytime version of think(): a generator of better and better moves, one after
+every completed iteration of iterative deepening, that can be stopped whenever the move is good
+enough or the time is over (see anytime.py for using it from asyncio).
+
 User of this class only needs to use think() function
 """
 
+import time
+
 from board import Board
+from transposition_table import ZobristHash, TranspositionTable, EXACT, LOWER, UPPER
+from search_trace import TraceSink
+from search_stats import SearchStats
+from move_ordering import MoveOrdering
+
+class _SearchTimeout(Exception):
+    # raised inside the search when the time given to think() is over
+    pass
+
 
 class BoardGameAI:
 
-    def __init__(self, evaluation_func, endgame_func, legal_moves_func, pruning: bool=True):
+    # half width of the aspiration window of PVS, in evaluation points
+    ASPIRATION_WINDOW = 2
+    # time limit of think_iter() without one, it is stopped with should_stop() or by its caller
+    NO_TIME_LIMIT = 365 * 24 * 3600.0
+
+    def __init__(self, evaluation_func, endgame_func, legal_moves_func, pruning: bool=True,
+                 tt_size_mb: float=0, trace: TraceSink=None, profile: bool=False,
+                 move_ordering: MoveOrdering=None, root_moves_func=None, threat_func=None,
+                 pvs: bool=False):
         self._pos_inf = float("inf")
         self._neg_inf = float("-inf")
         
         self.evaluation_func = evaluation_func
         self.endgame_func = endgame_func
         self.legal_moves_func = legal_moves_func
+        self.root_moves_func = root_moves_func if root_moves_func is not None else legal_moves_func
+        self.threat_func = threat_func
         
         self.pruning = pruning
+        self.pvs = pvs and pruning   # PVS is a way of pruning, nothing to scout without it
         self._max_depth = 0
+        self.trace = trace
+        self.profile = profile
+        self.move_ordering = move_ordering
+
+        self.tt = TranspositionTable(tt_size_mb) if tt_size_mb > 0 else None
+        self._zobrist = None
+        self._hash = 0
+
+        self._deadline = None
+        self.should_stop = None  # function without arguments, a search with time limit stops when it returns True
+        self._node_count = 0
+        self._base_moves = 0     # moves on the board's move stack before the search, see Board.make_move()
+        self._pv_line = [[]]     # principal variation found below each ply in current iteration
+        self._prev_pv = []       # principal variation of the previous iteration
+        self._follow_pv = False
+        self.completed_depth = -1
+        self.principal_variation = []   # moves of the PV of the last think(), AI's move first
+        self.best_score = None          # score of the move think() returned
+
+        self.last_stats = None   # SearchStats of the last think()
+        self._stats = SearchStats()
+        self._start = 0.0
+        self._untimed = None     # evaluation and endgame functions without timing, when profiling
         
-    def think(self, board: Board, max_depth: int=3) -> tuple(int, int):
+    def think(self, board: Board, max_depth: int=3, time_limit: float=None) -> tuple(int, int):
         # check all moves and return the move with highest minimax value
         # use this function for generating AI move for the game
+
+        # with time_limit (in seconds) the search is iterative deepening: depth 0, 1, 2, ... up to
+        # max_depth, and the best move of the deepest iteration completed before the deadline is
+        # returned. Depth 0 is always completed, so there is always a move to return.
+        # Returns (-1, -1) when there is no move (full board)
+        self.__begin_search(board)
+        all_moves = self.__root_moves(board)
+        if not all_moves:
+            self.principal_variation = []
+            self.best_score = None
+            self.__end_search()
+            return (-1, -1)
+
+        if time_limit is None:
+            if self.pvs:
+                # nothing to center an aspiration window on, the root gets the whole window
+                best_move, move_scores, _ = self.__aspiration(board, all_moves, max_depth, None)
+            else:
+                best_move, move_scores = self.__search_root(board, all_moves, max_depth)
+            self.completed_depth = max_depth
+            self._prev_pv = self._pv_line[0]
+        else:
+            deadline = time.perf_counter() + time_limit
+            for best_move, move_scores in self.__deepen(board, all_moves, max_depth, deadline):
+                pass
+
+        self.__keep_result(best_move, move_scores)
+        self.__end_search()
+        if self.trace is not None:
+            self.trace.summary(move_scores)
+                
+        return (best_move[0], best_move[1])
+
+    def think_iter(self, board: Board, max_depth: int=3, time_limit: float=None):
+        # anytime version of think(): a generator of ((row, col), score, depth, nodes so far) after
+        # every completed iteration of iterative deepening, each one from a deeper search than the
+        # one before. The last one is the move think(board, max_depth, time_limit) would return.
+        # It can be stopped at any time: closing the generator (or just not asking for the next
+        # update) between updates, or should_stop() returning True during an iteration, which ends
+        # the generator without an update for that iteration
+        self.__begin_search(board)
+        all_moves = self.__root_moves(board)
+        if not all_moves:
+            # nothing to yield on a full board
+            self.__end_search()
+            return
+        if time_limit is None:
+            time_limit = BoardGameAI.NO_TIME_LIMIT
+
+        deadline = time.perf_counter() + time_limit
+        move_scores = None
+        try:
+            for best_move, move_scores in self.__deepen(board, all_moves, max_depth, deadline):
+                self.__keep_result(best_move, move_scores)
+                yield (best_move[0], best_move[1]), self.best_score, self.completed_depth, self._stats.total_nodes
+        finally:
+            self.__end_search()
+            if self.trace is not None and move_scores is not None:
+                self.trace.summary(move_scores)
+
+    def think_pv(self, board: Board, max_depth: int=3, time_limit: float=None):
+        # same search as think(), returns ((row, col), score of the move, principal variation)
+        # the principal variation starts with the move, then the reply of the player and so on
+        move = self.think(board, max_depth, time_limit)
+        return move, self.best_score, self.principal_variation
+
+    def analyze_moves(self, board: Board, max_depth: int=3):
+        # returns [((row, col), score, principal variation)] for every legal move of AI, best first.
+        # Unlike think() every move is searched with the whole window, so all the scores are exact
+        # and every move gets its own principal variation (multi-PV)
+        self.__begin_search(board)
         self._max_depth = max_depth
-        move_scores = []
+        self._pv_line = [[] for _ in range(0, max_depth + 3)]
+        self._stats.grow(max_depth)
+
+        lines = []
+        for (row, col) in self.legal_moves_func(board):
+            self.__set(board, row, col, Board.ai)
+            if self.pvs:
+                score = -self.__pvs(board, max_depth, self._neg_inf, self._pos_inf, False, row, col)
+            else:
+                score = self.__minimax(board, max_depth, self._neg_inf, self._pos_inf, False, row, col)
+            self.__remove(board, row, col, Board.ai)
+            lines.append(((row, col), score, [(row, col)] + self._pv_line[1]))
+
+        self.completed_depth = max_depth
+        self.__end_search()
+        # equally good moves stay in the order of legal moves
+        lines.sort(key=lambda line: line[1], reverse=True)
+        return lines
+
+    def evaluate_line(self, board: Board, line, max_depth: int, alpha=float("-inf"), beta=float("inf"),
+                      time_limit: float=None, last_move=None):
+        # returns the minimax value of the position after the moves in line, as think(board, max_depth)
+        # would find it: AI plays line[0], player plays line[1] and so on, then the position is
+        # searched with the remaining depth. Used for splitting the search of think() into parts,
+        # e.g. between processes. Returns None if time_limit (seconds) is over before the end.
+        # last_move is the (row, col) of the move that led to the position on board, the end of the
+        # game is checked with it when line is empty. The last move of the board if not given
+        self.__begin_search(board)
+        self._max_depth = max_depth
+        self._pv_line = [[] for _ in range(0, max_depth + 3)]
+        self._stats.grow(max_depth)
+        if time_limit is not None:
+            self._deadline = time.perf_counter() + time_limit
+
+        row, col = last_move if last_move is not None else (board.last_row, board.last_col)
+        char = Board.ai
+        for (row, col) in line:
+            self.__set(board, row, col, char)
+            char = Board.player if char == Board.ai else Board.ai
+
+        try:
+            is_max_player = len(line) % 2 == 0
+            if not self.pvs:
+                value = self.__minimax(board, max_depth - len(line) + 1, alpha, beta, is_max_player, row, col)
+            elif is_max_player:
+                value = self.__pvs(board, max_depth - len(line) + 1, alpha, beta, True, row, col)
+            else:
+                value = -self.__pvs(board, max_depth - len(line) + 1, -beta, -alpha, False, row, col)
+            self.completed_depth = max_depth
+        except _SearchTimeout:
+            value = None
+
+        self.__unwind(board)
+
+        self.__end_search()
+        return value
+
+    def __root_moves(self, board: Board):
+        all_moves = self.root_moves_func(board)
+        if self.threat_func is not None:
+            # at the root a move has to be returned even when all of them lose
+            _, forced_columns = self.threat_func(board, Board.ai)
+            if forced_columns is not None:
+                all_moves = [move for move in all_moves if move[1] in forced_columns]
+
+        return all_moves
+
+    def __deepen(self, board: Board, all_moves, max_depth: int, deadline: float):
+        # iterative deepening until max_depth or the deadline (perf_counter() time), yields
+        # (best move, move scores) of every completed iteration
+        scores = []   # best score of every completed iteration, for the aspiration windows of PVS
+        best_move = None
+        for depth in range(0, max_depth + 1):
+            if depth > 0:
+                self._deadline = deadline
+
+            # principal variation of the previous iteration is searched first
+            if self._prev_pv:
+                all_moves = BoardGameAI.__move_first(all_moves, self._prev_pv[0])
+
+            try:
+                if self.pvs:
+                    # the window is centered on the score of two iterations before, whose leaves
+                    # are evaluated with the same side to move, so the scores are closer
+                    center = scores[-2] if len(scores) > 1 else None
+                    best_move, move_scores, score = self.__aspiration(board, all_moves, depth, center)
+                    scores.append(score)
+                else:
+                    best_move, move_scores = self.__search_root(board, all_moves, depth)
+            except _SearchTimeout:
+                # take back the pieces the interrupted iteration left on the board
+                self.__unwind(board)
+                if self.trace is not None:
+                    self.trace.iteration(depth, best_move[0], best_move[1], False)
+                return
+
+            self.completed_depth = depth
+            self._prev_pv = self._pv_line[0]
+            if self.trace is not None:
+                self.trace.iteration(depth, best_move[0], best_move[1], True)
+            yield best_move, move_scores
+
+            # no need to go deeper when the game is already won or the time is over
+            if max(move_score for _, move_score in move_scores) == self._pos_inf:
+                return
+            if time.perf_counter() >= deadline or (self.should_stop is not None and self.should_stop()):
+                return
+
+    def __keep_result(self, best_move, move_scores) -> None:
+        # principal variation and score of the move of the deepest completed search
+        self.principal_variation = list(self._prev_pv)
+        self.best_score = next(move_score for move, move_score in move_scores if move == tuple(best_move))
+
+    def __begin_search(self, board: Board) -> None:
+        # resets the state of the search, called at the beginning of think() and evaluate_line()
+        self._deadline = None
+        self._node_count = 0
+        self._base_moves = board.n_moves
+        self._prev_pv = []
+        self._follow_pv = False
+        self.completed_depth = -1
+
+        self._stats = SearchStats()
+        self._stats.nodes[0] = 1
+        if self.tt is not None:
+            self._stats.tt_probes = 0
+            self._stats.tt_hits = 0
+        if self.profile:
+            self._untimed = (self.evaluation_func, self.endgame_func)
+            self.evaluation_func = self.__timed(self.evaluation_func, "eval_time")
+            self.endgame_func = self.__timed(self.endgame_func, "endgame_time")
+        self._start = time.perf_counter()
         
-        all_moves = self.legal_moves_func(board)
+        if self.move_ordering is not None:
+            self.move_ordering.new_search()
+        if self.tt is not None:
+            self.tt.new_search()
+            if self._zobrist is None or self._zobrist.row != board.row or self._zobrist.column != board.column:
+                self._zobrist = ZobristHash(board.row, board.column)
+            self._hash = self._zobrist.hash_board(board)
+
+    def __end_search(self) -> None:
+        self._deadline = None
+        if self.profile:
+            (self.evaluation_func, self.endgame_func) = self._untimed
+
+        self._stats.elapsed = time.perf_counter() - self._start
+        self._stats.completed_depth = self.completed_depth
+        self.last_stats = self._stats
+
+    def __search_root(self, board: Board, all_moves, max_depth: int):
+        # searches all the moves of AI with given depth, returns best move and scores of all moves
+        self._max_depth = max_depth
+        self._pv_line = [[] for _ in range(0, max_depth + 3)]
+        self._follow_pv = len(self._prev_pv) > 0
+        self._stats.grow(max_depth)
+        move_scores = []
+
         best_move = [-1, -1]
         best_evaluation = self._neg_inf
 
         for i in range(0, len(all_moves)):
             row = all_moves[i][0]
             col = all_moves[i][1]
+            if i > 0:
+                self._follow_pv = False
             
-            board.set(row, col, Board.ai)
+            self.__set(board, row, col, Board.ai)
             evaluate_move = self.__minimax(board, max_depth, self._neg_inf, self._pos_inf, False, row, col)
-            board.remove(row, col)
+            self.__remove(board, row, col, Board.ai)
 
             if evaluate_move >= best_evaluation:
                 best_evaluation = evaluate_move
                 best_move[0] = row
                 best_move[1] = col
+                self._pv_line[0] = [(row, col)] + self._pv_line[1]
 
-            print(f"{i + 1}'th move is ({row}, {col}),  minimax value: {evaluate_move}")
+            if self.trace is not None:
+                self.trace.root(i, row, col, evaluate_move)
             move_scores.append([(row, col), evaluate_move])
 
-        print()
-        
-        # print all the moves and their score again
-        print("High Level summary of moves:")
-        for i in range(0, len(move_scores)):
-            print(f"{i + 1}'th move is {move_scores[i][0]}, ",end="")
-
-            val = move_scores[i][1]
-            if val == self._pos_inf:
-                print("its score is +inf")
-            elif val == self._neg_inf:
-                print("its score is -inf")
+        return best_move, move_scores
+
+    def __aspiration(self, board: Board, all_moves, max_depth: int, previous):
+        # searches the root with a window around the score of the previous iteration. When the score
+        # falls out of the window the root is searched again with that side of the window open
+        if previous is None or previous == self._pos_inf or previous == self._neg_inf:
+            alpha, beta = self._neg_inf, self._pos_inf
+        else:
+            alpha, beta = previous - BoardGameAI.ASPIRATION_WINDOW, previous + BoardGameAI.ASPIRATION_WINDOW
+
+        while True:
+            best_move, move_scores, score = self.__search_root_pvs(board, all_moves, max_depth, alpha, beta)
+            if score <= alpha and alpha != self._neg_inf:
+                alpha = self._neg_inf
+            elif score >= beta and beta != self._pos_inf:
+                beta = self._pos_inf
             else:
-                print(f"its score is {val}")
-                
-        return (best_move[0], best_move[1])
+                return best_move, move_scores, score
+            self._stats.researches += 1
+
+    def __search_root_pvs(self, board: Board, all_moves, max_depth: int, alpha, beta):
+        # searches the moves of AI with PVS in the window (alpha, beta), returns best move, scores of
+        # the moves and the best score. Only the score of the best move is exact, the others are
+        # upper bounds (the scouts only prove they are not better)
+        self._max_depth = max_depth
+        self._pv_line = [[] for _ in range(0, max_depth + 3)]
+        self._follow_pv = len(self._prev_pv) > 0
+        self._stats.grow(max_depth)
+        move_scores = []
+
+        best_move = [-1, -1]
+        best_evaluation = self._neg_inf
+
+        for i in range(0, len(all_moves)):
+            row = all_moves[i][0]
+            col = all_moves[i][1]
+            if i > 0:
+                self._follow_pv = False
+
+            self.__set(board, row, col, Board.ai)
+            evaluate_move = self.__pvs_move(board, max_depth, alpha, beta, i == 0, False, row, col)
+            self.__remove(board, row, col, Board.ai)
+
+            if i == 0 or evaluate_move > best_evaluation:
+                best_evaluation = evaluate_move
+                best_move[0] = row
+                best_move[1] = col
+                self._pv_line[0] = [(row, col)] + self._pv_line[1]
+
+            if self.trace is not None:
+                self.trace.root(i, row, col, evaluate_move)
+            move_scores.append([(row, col), evaluate_move])
+
+            # out of the aspiration window, the root is searched again anyway
+            alpha = max(alpha, evaluate_move)
+            if alpha >= beta:
+                break
+
+        return best_move, move_scores, best_evaluation
 
     
     def __minimax(self, board: Board, depth: int, alpha: int, beta: int, is_max_player: bool, lm_row: int, lm_col: int) -> int:
         # returns the value of minimax
 
+        # distance from the root, index of this node's move in the principal variation
+        ply = self._max_depth - depth + 1
+        self._pv_line[ply] = []
+        self._stats.nodes[ply] += 1
+
+        # stop the search when time is over or should_stop() says so, checked once every 1024 nodes
+        self._node_count += 1
+        if self._deadline is not None and not self._node_count & 1023:
+            if time.perf_counter() > self._deadline or (self.should_stop is not None and self.should_stop()):
+                raise _SearchTimeout()
+
         # game ends with a winner
+        self._stats.endgame_calls += 1
         endgame = self.endgame_func(board, lm_row, lm_col)
         if endgame == 1:
             if is_max_player:
@@ -90,82 +471,313 @@ class BoardGameAI:
         
         # max depth reached 
         if depth == 0:
+            self._stats.eval_calls += 1
             return self.evaluation_func(board) 
 
+        # check if this position was already searched
+        tt_move = None
+        if self.tt is not None:
+            key = self._hash if is_max_player else self._hash ^ self._zobrist.side
+            entry = self.tt.probe(key)
+            self._stats.tt_probes += 1
+            if entry is not None:
+                self._stats.tt_hits += 1
+                tt_depth, tt_value, tt_flag, tt_move = entry
+                if tt_depth >= depth:
+                    if tt_flag == EXACT:
+                        return tt_value
+                    if tt_flag == LOWER:
+                        alpha = max(alpha, tt_value)
+                    else:
+                        beta = min(beta, tt_value)
+                    if beta <= alpha:
+                        return tt_value
+
+        # bounds of the window this node is searched with, for deciding the bound type of value
+        alpha_orig = alpha
+        beta_orig = beta
+        best_move = None
+
+        # immediate wins and losses get the value the search would give them, same as at the ends
+        # of the game above: win with the next move, or lose with the next move of the opponent
+        forced_columns = None
+        if self.threat_func is not None:
+            outcome, forced_columns = self.threat_func(board, Board.ai if is_max_player else Board.player)
+            if outcome == 1:
+                self._stats.forced += 1
+                return self._pos_inf - (self._max_depth - depth + 1) if is_max_player else self._neg_inf
+            if outcome == -1:
+                self._stats.forced += 1
+                return self._neg_inf if is_max_player else self._pos_inf - (self._max_depth - depth + 2)
+
+        # generate all the legal moves at this turn. Principal variation of the previous iteration
+        # goes first while we are on it, otherwise best move of the previous search of this position,
+        # then the order of killer moves and history heuristic
+        all_moves = self.legal_moves_func(board)
+        if forced_columns is not None:
+            self._stats.forced += 1
+            all_moves = [move for move in all_moves if move[1] in forced_columns]
+        if self.move_ordering is not None:
+            all_moves = self.move_ordering.order(all_moves, ply, is_max_player)
+        pv_move = None
+        if self._follow_pv:
+            if ply < len(self._prev_pv):
+                pv_move = self._prev_pv[ply]
+                all_moves = self.__move_first(all_moves, pv_move)
+            self._follow_pv = pv_move is not None and len(all_moves) > 0 and tuple(all_moves[0]) == pv_move
+        elif tt_move is not None:
+            all_moves = self.__move_first(all_moves, tt_move)
+
         if is_max_player:
             value = self._neg_inf
-
-            # generate all the legal moves at this turn
-            all_moves = self.legal_moves_func(board)
            
             
             for i in range(0, len(all_moves)):
                 row = all_moves[i][0]
                 col = all_moves[i][1]
+                if i > 0:
+                    self._follow_pv = False
 
-                board.set(row, col, Board.ai)
-                value = max(value, self.__minimax(board, depth - 1, alpha, beta, False, row, col))
-                board.remove(row, col)
+                self.__set(board, row, col, Board.ai)
+                child = self.__minimax(board, depth - 1, alpha, beta, False, row, col)
+                self.__remove(board, row, col, Board.ai)
+                if best_move is None or child > value:
+                    value = child
+                    best_move = (row, col)
+                    self._pv_line[ply] = [best_move] + self._pv_line[ply + 1]
 
                 alpha = max(alpha, value)     
                 if self.pruning:
                     
                     if beta <= alpha:
-                        print(f"Depth {self._max_depth - depth + 1}, Move: ({row}, {col}), Minimax value: ", end="")
-                        # print infinity values in a nice fromat
-                        self.__print_val(value)
-                        print()
-                        print(f"beta is {beta}, alpha is {alpha}")
-                        print(f"Depth {self._max_depth - depth + 1}, {len(all_moves) - i - 1} branches pruned.")
+                        self._stats.cutoffs[ply] += 1
+                        if self.move_ordering is not None:
+                            self.move_ordering.cutoff((row, col), ply, depth, is_max_player)
+                        if self.trace is not None:
+                            self.trace.node(ply, row, col, alpha, beta, value, len(all_moves) - i - 1)
                         
                         break
-                
-                    
-                print(f"Depth {self._max_depth - depth + 1}, Move: ({row}, {col}), Minimax value:", end="")
-                self.__print_val(value)
-                print()
-                print(f"beta is {beta}, alpha is {alpha}")
 
+                if self.trace is not None:
+                    self.trace.node(ply, row, col, alpha, beta, value, 0)
+
+            self.__store(depth, value, alpha_orig, beta_orig, True, best_move)
             return value
         
         else:
             value = self._pos_inf
-            all_moves = self.legal_moves_func(board)
             
             for i in range(0, len(all_moves)):
                 row = all_moves[i][0]
                 col = all_moves[i][1]
+                if i > 0:
+                    self._follow_pv = False
 
-                board.set(row, col, Board.player)
-                value = min(value, self.__minimax(board, depth - 1, alpha, beta, True, row, col))
-                board.remove(row, col)
+                self.__set(board, row, col, Board.player)
+                child = self.__minimax(board, depth - 1, alpha, beta, True, row, col)
+                self.__remove(board, row, col, Board.player)
+                if best_move is None or child < value:
+                    value = child
+                    best_move = (row, col)
+                    self._pv_line[ply] = [best_move] + self._pv_line[ply + 1]
                 beta = min(beta, value)
                 if self.pruning:
                     
                     if beta <= alpha:
-                        print(f"Depth {self._max_depth - depth + 1}, Move: ({row}, {col}), Minimax value: ", end="")
-                        # print infinity values in a nice fromat
-                        self.__print_val(value)
-                        print()
-                        print(f"beta is {beta}, alpha is {alpha}")
-                        print(f"Depth {self._max_depth - depth + 1}, {len(all_moves) - i - 1} branches pruned.")
+                        self._stats.cutoffs[ply] += 1
+                        if self.move_ordering is not None:
+                            self.move_ordering.cutoff((row, col), ply, depth, is_max_player)
+                        if self.trace is not None:
+                            self.trace.node(ply, row, col, alpha, beta, value, len(all_moves) - i - 1)
                         
                         break
-                    
-
-                print(f"Depth {self._max_depth - depth + 1}, Move: ({row}, {col}), Minimax value:", end="")
-                self.__print_val(value)
-                print()
-                print(f"beta is {beta}, alpha is {alpha}")
 
+                if self.trace is not None:
+                    self.trace.node(ply, row, col, alpha, beta, value, 0)
 
+            self.__store(depth, value, alpha_orig, beta_orig, False, best_move)
             return value
-                           
-        
-    def __print_val(self, val: int) -> None:
-        if val == self._pos_inf:
-            print(f"+inf", end="")
-        elif val == self._neg_inf:
-            print(f"-inf", end="")
+
+    def __pvs_move(self, board: Board, depth: int, alpha, beta, first: bool, is_max_player: bool,
+                   lm_row: int, lm_col: int):
+        # value of the move just made for the side that made it. The first move is searched with the
+        # whole window, the others with a null window around alpha (scout) that only tells if the
+        # move is better than alpha, and only the ones that are get searched again with the window
+        if first or alpha == self._neg_inf:
+            return -self.__pvs(board, depth, -beta, -alpha, is_max_player, lm_row, lm_col)
+
+        value = -self.__pvs(board, depth, -alpha - 1, -alpha, is_max_player, lm_row, lm_col)
+        if alpha < value < beta:
+            self._stats.researches += 1
+            value = -self.__pvs(board, depth, -beta, -alpha, is_max_player, lm_row, lm_col)
+        return value
+
+    def __pvs(self, board: Board, depth: int, alpha, beta, is_max_player: bool, lm_row: int, lm_col: int):
+        # negamax version of __minimax for Principal Variation Search: returns the value of the
+        # position for the side to move, alpha and beta are from its point of view too. Values
+        # and bounds in the transposition table are kept as __minimax keeps them (AI's point of view)
+        ply = self._max_depth - depth + 1
+        self._pv_line[ply] = []
+        self._stats.nodes[ply] += 1
+
+        self._node_count += 1
+        if self._deadline is not None and not self._node_count & 1023:
+            if time.perf_counter() > self._deadline or (self.should_stop is not None and self.should_stop()):
+                raise _SearchTimeout()
+
+        # the side that made the last move won
+        self._stats.endgame_calls += 1
+        endgame = self.endgame_func(board, lm_row, lm_col)
+        if endgame == 1:
+            return self._neg_inf
+        if endgame == -1:
+            return 0
+
+        sign = 1 if is_max_player else -1
+        if depth == 0:
+            self._stats.eval_calls += 1
+            return sign * self.evaluation_func(board)
+
+        tt_move = None
+        if self.tt is not None:
+            key = self._hash if is_max_player else self._hash ^ self._zobrist.side
+            entry = self.tt.probe(key)
+            self._stats.tt_probes += 1
+            if entry is not None:
+                self._stats.tt_hits += 1
+                tt_depth, tt_value, tt_flag, tt_move = entry
+                if tt_depth >= depth:
+                    tt_value = sign * tt_value
+                    if tt_flag == EXACT:
+                        return tt_value
+                    # a lower bound of AI is an upper bound of the player
+                    if (tt_flag == LOWER) == is_max_player:
+                        alpha = max(alpha, tt_value)
+                    else:
+                        beta = min(beta, tt_value)
+                    if beta <= alpha:
+                        return tt_value
+
+        alpha_orig = alpha
+        beta_orig = beta
+        best_move = None
+
+        forced_columns = None
+        if self.threat_func is not None:
+            outcome, forced_columns = self.threat_func(board, Board.ai if is_max_player else Board.player)
+            if outcome != 0:
+                self._stats.forced += 1
+                return self._pos_inf if outcome == 1 else self._neg_inf
+
+        all_moves = self.legal_moves_func(board)
+        if forced_columns is not None:
+            self._stats.forced += 1
+            all_moves = [move for move in all_moves if move[1] in forced_columns]
+        if self.move_ordering is not None:
+            all_moves = self.move_ordering.order(all_moves, ply, is_max_player)
+        pv_move = None
+        if self._follow_pv:
+            if ply < len(self._prev_pv):
+                pv_move = self._prev_pv[ply]
+                all_moves = self.__move_first(all_moves, pv_move)
+            self._follow_pv = pv_move is not None and len(all_moves) > 0 and tuple(all_moves[0]) == pv_move
+        elif tt_move is not None:
+            all_moves = self.__move_first(all_moves, tt_move)
+
+        char = Board.ai if is_max_player else Board.player
+        value = self._neg_inf
+        for i in range(0, len(all_moves)):
+            row = all_moves[i][0]
+            col = all_moves[i][1]
+            if i > 0:
+                self._follow_pv = False
+
+            self.__set(board, row, col, char)
+            child = self.__pvs_move(board, depth - 1, alpha, beta, i == 0, not is_max_player, row, col)
+            self.__remove(board, row, col, char)
+            if best_move is None or child > value:
+                value = child
+                best_move = (row, col)
+                self._pv_line[ply] = [best_move] + self._pv_line[ply + 1]
+
+            alpha = max(alpha, value)
+            if beta <= alpha:
+                self._stats.cutoffs[ply] += 1
+                if self.move_ordering is not None:
+                    self.move_ordering.cutoff((row, col), ply, depth, is_max_player)
+                if self.trace is not None:
+                    self.__trace_pvs(ply, row, col, alpha, beta, value, len(all_moves) - i - 1, sign)
+                break
+
+            if self.trace is not None:
+                self.__trace_pvs(ply, row, col, alpha, beta, value, 0, sign)
+
+        if is_max_player:
+            self.__store(depth, value, alpha_orig, beta_orig, True, best_move)
         else:
-            print(f"{val}", end="")
+            self.__store(depth, -value, -beta_orig, -alpha_orig, False, best_move)
+        return value
+
+    def __trace_pvs(self, ply: int, row: int, col: int, alpha, beta, value, pruned: int, sign: int) -> None:
+        # traces the node with AI's point of view values, like __minimax does
+        if sign == 1:
+            self.trace.node(ply, row, col, alpha, beta, value, pruned)
+        else:
+            self.trace.node(ply, row, col, -beta, -alpha, -value, pruned)
+
+    def __set(self, board: Board, row: int, col: int, char: int) -> None:
+        # puts the piece with the board's make_move() and updates the hash of the position
+        # row is where the piece falls to in the column
+        board.make_move(col, char)
+        if self.tt is not None:
+            self._hash ^= self._zobrist.key(row, col, char)
+
+    def __remove(self, board: Board, row: int, col: int, char: int) -> None:
+        board.unmake_move()
+        if self.tt is not None:
+            self._hash ^= self._zobrist.key(row, col, char)
+
+    def __unwind(self, board: Board) -> None:
+        # takes back the moves made by an interrupted search
+        while board.n_moves > self._base_moves:
+            row, col = board.last_row, board.last_col
+            self.__remove(board, row, col, board.get(row, col))
+
+    def __store(self, depth: int, value, alpha, beta, is_max_player: bool, best_move) -> None:
+        # saves the result of the search to the transposition table
+        if self.tt is None:
+            return
+
+        if not self.pruning:
+            flag = EXACT
+        elif value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+
+        key = self._hash if is_max_player else self._hash ^ self._zobrist.side
+        self.tt.store(key, depth, value, flag, best_move)
+
+    def __timed(self, func, stat: str):
+        # wraps func so that the time spent in it is added to the given field of search stats
+        stats = self._stats
+        perf_counter = time.perf_counter
+
+        def timed(*args):
+            start = perf_counter()
+            result = func(*args)
+            setattr(stats, stat, getattr(stats, stat) + perf_counter() - start)
+            return result
+
+        return timed
+
+    @staticmethod
+    def __move_first(all_moves, move):
+        # returns moves with 'move' moved to the front, if it is one of them
+        for i in range(0, len(all_moves)):
+            if all_moves[i][0] == move[0] and all_moves[i][1] == move[1]:
+                return [all_moves[i]] + all_moves[:i] + all_moves[i + 1:]
+
+        return all_moves
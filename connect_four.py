@@ -13,31 +13,339 @@ ai_moves() returns the AI move, takes no argument
 
 is_endgame() ,as the name implies, checks if game ended or not after the last move
 
+Passing bitboard=True when creating the game stores the board in a BitBoard (see bitboard.py)
+instead of the numpy backed Board. Game logic is the same, but gravity and end of game checks
+become constant time operations on the bit masks.
+
+tt_size_mb is the memory cap of the AI's transposition table, 0 turns the table off. The table is
+kept for the whole game, so every ai_move() reuses what the previous ones found.
+
+evaluator chooses how the AI scores positions: "full" rescans the whole board at every leaf
+(evaluation_func), "incremental" keeps the same score up to date while the AI puts and removes
+pieces (see incremental_evaluation.py) and only reads it at the leaves, "numpy" scores all the
+windows of the board with vectorized numpy operations (see numpy_evaluation.py), which is the
+fastest on big boards.
+
+trace is passed to the AI to follow its search (see search_trace.py), by default nothing is traced.
+
+Statistics of every AI search are collected in game_stats (see search_stats.py). stats_hook, if
+given, is called as stats_hook(search_stats, game_stats) after every AI move, e.g. to export them
+to monitoring. profile=True also measures time spent in evaluation and endgame functions.
+
+With move_ordering=True (default) the AI searches center columns first and uses killer moves and
+history heuristic (see move_ordering.py), which makes alpha-beta pruning cut off many more branches.
+
+With threat_analysis=True the AI looks at the threats of both sides before searching the moves of
+a position (see threat_analysis.py): if the side to move can win at once, or the opponent wins
+whatever it plays, the position isn't searched further, if it has to block the opponent only the
+blocking move is searched, and moves that let the opponent win on top of them are not searched.
+Far fewer nodes are searched, but wins and losses are also seen one ply beyond max depth, so the
+AI can choose other moves than without it. It is off by default.
+
+A position and its mirror image are equally good, so when the board is symmetric (e.g. empty) the
+AI doesn't search the moves that are the mirror image of other moves (distinct_moves()). This
+halves the first search of the game on every board size. Opening book and position cache use
+canonical keys (see Board.canonical_key()), so they keep one entry for the two mirror images.
+
+workers > 1 splits the search of every AI move between that many processes (see
+parallel_search.py), by the moves of AI or with split_plies=2 also by the replies of the player.
+With parallel_mode="lazy_smp" instead every process searches the whole position and they share one
+transposition table of tt_size_mb in shared memory (see lazy_smp.py).
+The processes are kept for the whole game, call close() at the end of the game to stop them.
+
+engine="mcts" chooses the moves of AI with Monte Carlo Tree Search (see mcts.py) instead of
+minimax, which plays better on big boards, where minimax can't search deep. It plays
+mcts_iterations random games per move (or as many as fit in seconds_per_move), and with
+workers > 1 plays them in that many processes. difficulty_level is not used then.
+engine="pvs" is minimax with Principal Variation Search (see BoardGameAI): same scores as
+alpha-beta at the same depth, but most moves are only proven not to be better with a null window,
+so far fewer nodes are searched.
+
+opening_book is the file of an opening book (see opening_book.py). AI plays the move from the book
+without searching when the position is in it. A book made for another board size is never used.
+The book is only used when it doesn't make AI play stronger than it is set to: with difficulty_level
+at least the depth of the book, or with seconds_per_move, and not with the mcts engine, whose
+strength is set by its iterations (book_move()).
+
+With solver_pieces, once there are at least that many pieces on the board AI tries to solve the
+position exactly (see solver.py) within solver_seconds and plays the perfect move. If the time is
+not enough it plays the move of the usual search, and tries again at its next move.
+
+position_cache (see position_cache.py) can be shared by many games. AI plays the move from it
+without searching when the position was searched at least to difficulty_level before (exactly
+solved, once the solver is on), and puts the moves it searches into it.
+
+With ponder_workers > 0 AI searches its next move while the player thinks about theirs (see
+pondering.py): ponder() is called after AI's move and searches the position after every player
+move in that many processes, the likely reply of the principal variation first. player_move()
+keeps the search of the move played and stops the others, and ai_move() then plays the move found
+for the position after the player's move, or with seconds_per_move gives the search
+seconds_per_move more to go deeper. Pondering is not done with the mcts engine.
+
+think_iter() gives the move of AI step by step, a better one after every deeper search, so a UI
+can show a move at once and stop the search whenever it wants. For asyncio programs AnytimeSearch
+(see anytime.py) does the same in worker processes, made with ai_factory.
+
+analyze() analyzes positions for hints or offline labeling (see analysis.py): the score of every
+column and the best principal variations of each position. Positions of a batch share the search
+of one AI, and large batches are split between the worker processes.
+
+seconds_per_move can be given instead of difficulty_level. Then the AI searches deeper and deeper
+until the time is over and plays the best move of the deepest completed search.
+
 Other functions are used for deciding the move of AI at each turn 
 """
 
+import functools
+
 import numpy as np
 from board import Board
+from bitboard import BitBoard
 from board_game_AI import BoardGameAI
+from incremental_evaluation import IncrementalEvaluator
+from numpy_evaluation import NumpyEvaluator
+from search_trace import TraceSink
+from search_stats import GameStats
+from move_ordering import MoveOrdering
+from parallel_search import RootParallelSearch
+from lazy_smp import LazySMPSearch
+from opening_book import OpeningBook
+from position_cache import PositionCache
+from solver import Solver
+from threat_analysis import ThreatAnalyzer
+from mcts import MCTSSearch
+from pondering import Ponderer
+from analysis import BatchAnalyzer
 
 
 class ConnectFour:
     
     def __init__(self, p_colour: str, difficulty_level: int=3, n_row: int=6,
-                 n_column: int=7):
-        self.board: Board = Board(row=n_row, column=n_column, p_colour=p_colour)
+                 n_column: int=7, bitboard: bool=False, tt_size_mb: float=16,
+                 seconds_per_move: float=None, evaluator: str="full", trace: TraceSink=None,
+                 profile: bool=False, stats_hook=None, move_ordering: bool=True,
+                 workers: int=1, split_plies: int=1, parallel_mode: str="root",
+                 opening_book: str=None, solver_pieces: int=None, solver_seconds: float=1.0,
+                 position_cache: PositionCache=None, threat_analysis: bool=False, engine: str="minimax",
+                 mcts_iterations: int=2000, ponder_workers: int=0):
+        if bitboard:
+            self.board: Board = BitBoard(row=n_row, column=n_column, p_colour=p_colour)
+        else:
+            self.board: Board = Board(row=n_row, column=n_column, p_colour=p_colour)
+
+        pvs = engine == "pvs"
+        # AIs of the worker processes are made with the same settings
+        ai_factory = functools.partial(ConnectFour.make_ai, evaluator=evaluator, tt_size_mb=tt_size_mb,
+                                       move_ordering=move_ordering, threat_analysis=threat_analysis, pvs=pvs)
+        self.AI = ai_factory(self.board, trace=trace, profile=profile)
+        self.ai_factory = ai_factory
+        # evaluator object behind the evaluation function, None for "full"
+        self.evaluator = getattr(self.AI.evaluation_func, "__self__", None)
+
+        self.parallel = None
+        self.mcts = None
+        if engine == "mcts":
+            # workers run the rollouts, parallel_mode is not used
+            self.mcts = MCTSSearch(ConnectFour.generate_legal_moves, ConnectFour.is_endgame,
+                                   iterations=mcts_iterations, workers=workers)
+        elif engine not in ("minimax", "pvs"):
+            raise ValueError(f"ConnectFour::{engine} engine is not supported")
+        elif workers > 1 and parallel_mode == "root":
+            self.parallel = RootParallelSearch(ai_factory, self.AI.legal_moves_func, ConnectFour.is_endgame,
+                                               workers=workers, split_plies=split_plies,
+                                               board_class=type(self.board),
+                                               root_moves_func=self.AI.root_moves_func,
+                                               threat_func=self.AI.threat_func)
+        elif workers > 1 and parallel_mode == "lazy_smp":
+            # workers get the shared table, so they don't need their own
+            lazy_smp_factory = functools.partial(ConnectFour.make_ai, evaluator=evaluator, tt_size_mb=0,
+                                                 move_ordering=move_ordering, threat_analysis=threat_analysis,
+                                                 pvs=pvs)
+            self.parallel = LazySMPSearch(lazy_smp_factory, workers=workers, tt_size_mb=tt_size_mb,
+                                          board_class=type(self.board))
+        elif parallel_mode not in ("root", "lazy_smp"):
+            raise ValueError(f"ConnectFour::{parallel_mode} parallel mode is not supported")
+
+        self.ponderer = None
+        if ponder_workers > 0 and self.mcts is None:
+            self.ponderer = Ponderer(ai_factory, workers=ponder_workers, board_class=type(self.board))
+
+        # made at the first analyze(), most games never analyze positions
+        self.analyzer = None
+        self.workers = workers
+
+        self.book = OpeningBook(opening_book) if opening_book is not None else None
+
+        self.solver = Solver(n_row, n_column, tt_size_mb=max(tt_size_mb, 1)) if solver_pieces is not None else None
+        self.solver_pieces = solver_pieces
+        self.solver_seconds = solver_seconds
+        self.position_cache = position_cache
+
+        self.max_depth = difficulty_level
+        self.seconds_per_move = seconds_per_move
+
+        self.game_stats = GameStats()
+        self.stats_hook = stats_hook
+        self._pv = []   # principal variation of the last AI move, if its search has one
+
+    @staticmethod
+    def make_ai(board: Board, evaluator: str="full", tt_size_mb: float=16, move_ordering: bool=True,
+                trace: TraceSink=None, profile: bool=False, threat_analysis: bool=False,
+                pvs: bool=False) -> BoardGameAI:
+        # creates the AI for the board, see the description of the arguments at the top of the file
+        evaluation_func = ConnectFour.make_evaluator(board, evaluator)
         
-        self.AI = BoardGameAI(ConnectFour.evaluation_func,
-                              ConnectFour.is_endgame,
-                              ConnectFour.generate_legal_moves)
+        if move_ordering:
+            legal_moves_func = functools.partial(ConnectFour.generate_legal_moves,
+                                                 order=ConnectFour.center_order(board.column))
+            ordering = MoveOrdering()
+        else:
+            legal_moves_func = ConnectFour.generate_legal_moves
+            ordering = None
+
+        threat_func = ThreatAnalyzer(board.row, board.column).forced_moves if threat_analysis else None
         
-        self.max_depth = difficulty_level
+        return BoardGameAI(evaluation_func,
+                           ConnectFour.is_endgame,
+                           legal_moves_func,
+                           tt_size_mb=tt_size_mb,
+                           trace=trace,
+                           profile=profile,
+                           move_ordering=ordering,
+                           root_moves_func=functools.partial(ConnectFour.distinct_moves,
+                                                             legal_moves_func=legal_moves_func),
+                           threat_func=threat_func,
+                           pvs=pvs)
+
+    @staticmethod
+    def make_evaluator(board: Board, evaluator: str="full"):
+        # returns the evaluation function of the board: full, incremental (attached to the board) or numpy
+        if evaluator == "full":
+            return ConnectFour.evaluation_func
+        if evaluator == "incremental":
+            return IncrementalEvaluator(board).attach().evaluate
+        if evaluator == "numpy":
+            return NumpyEvaluator(board.row, board.column).evaluate
+        raise ValueError(f"ConnectFour::{evaluator} evaluator is not supported")
+
+    def book_move(self):
+        # the move of the opening book, None if the position is not in it or the book would play
+        # stronger than AI is set to (see the description at the top of the file)
+        if self.book is None or self.mcts is not None:
+            return None
+        if self.seconds_per_move is None and self.max_depth < self.book.depth:
+            return None
+        return self.book.move(self.board)
 
     def ai_move(self) -> tuple(int, int):
-       [row, col] = self.AI.think(self.board, self.max_depth)
+       self._pv = []
+       move = self.book_move()
+       if move is not None:
+           self.__stop_pondering()
+           self.board.set(move[0], move[1], Board.ai)
+           return move
+
+       solve = self.solver is not None and ConnectFour.count_pieces(self.board) >= self.solver_pieces
+       empty = self.board.row * self.board.column - ConnectFour.count_pieces(self.board)
+       if self.position_cache is not None and self.seconds_per_move is None and self.mcts is None:
+           # once the solver is on only its exact moves are good enough
+           move = self.position_cache.get(self.board, empty if solve else self.max_depth)
+           if move is not None:
+               self.__stop_pondering()
+               self.board.set(move[0], move[1], Board.ai)
+               return move
+
+       move = None
+       if solve:
+           searcher = self.solver
+           move = self.solver.think(self.board, time_limit=self.solver_seconds)
+           if move is not None:
+               self.__stop_pondering()
+
+       if move is None and self.ponderer is not None:
+           # the position may have been searched while the player was thinking
+           searcher = self.ponderer
+           move = self.ponderer.result(self.board, self.seconds_per_move)
+
+       if move is None:
+           searcher = self.AI if self.parallel is None else self.parallel
+           if self.mcts is not None:
+               searcher = self.mcts
+           if self.seconds_per_move is None:
+               move = searcher.think(self.board, self.max_depth)
+           else:
+               # there can't be more moves than empty cells, so it is the max depth
+               max_depth = self.board.row * self.board.column
+               move = searcher.think(self.board, max_depth, time_limit=self.seconds_per_move)
+       [row, col] = move
+       self._pv = getattr(searcher, "principal_variation", [])
+
+       self.game_stats.add(searcher.last_stats)
+       if self.stats_hook is not None:
+           self.stats_hook(searcher.last_stats, self.game_stats)
+
+       if self.position_cache is not None and searcher is not self.mcts:
+           depth = empty if searcher is self.solver else searcher.completed_depth
+           self.position_cache.put(self.board, depth, move)
+
        self.board.set(row, col, Board.ai)
        return (row, col)
 
+    def ponder(self) -> None:
+        # starts searching the next AI move for every player move, call it after ai_move()
+        if self.ponderer is None:
+            return
+
+        order = ConnectFour.center_order(self.board.column)
+        # the reply AI expects is the most likely one, it is searched first
+        if len(self._pv) > 1:
+            order.remove(self._pv[1][1])
+            order.insert(0, self._pv[1][1])
+
+        if self.seconds_per_move is None:
+            self.ponderer.start(self.board, self.max_depth, order)
+        else:
+            self.ponderer.start(self.board, self.board.row * self.board.column, order)
+
+    def __stop_pondering(self) -> None:
+        # the move didn't need a search, the pondering is not needed
+        if self.ponderer is not None:
+            self.ponderer.stop()
+
+    def think_iter(self, max_depth: int=None, time_limit: float=None):
+        # yields better and better AI moves for the current position as ((row, col), score, depth,
+        # nodes), see BoardGameAI.think_iter(). The move is not played, the caller plays the one it
+        # chooses with board.set(row, col, Board.ai). By default difficulty_level and seconds_per_move
+        if time_limit is None:
+            time_limit = self.seconds_per_move
+        if max_depth is None:
+            max_depth = self.max_depth if time_limit is None else self.board.row * self.board.column
+        return self.AI.think_iter(self.board, max_depth, time_limit)
+
+    def analyze(self, positions, depth: int=None, top_k: int=3):
+        # yields the scores of all the columns and the top_k principal variations of every position
+        # (Board.to_bytes() or boards) with AI to move, searched to depth (difficulty_level if not
+        # given). See analysis.py for the format, large batches are analyzed by the workers
+        if depth is None:
+            depth = self.max_depth
+        if self.analyzer is None:
+            self.analyzer = BatchAnalyzer(self.ai_factory, workers=self.workers, board_class=type(self.board))
+        return self.analyzer.analyze(positions, depth, top_k)
+
+    def close(self) -> None:
+        # stops the worker processes of parallel search, pondering and analysis, if there are any,
+        # and closes the book
+        if self.analyzer is not None:
+            self.analyzer.close()
+        if self.ponderer is not None:
+            self.ponderer.close()
+        if self.parallel is not None:
+            self.parallel.close()
+        if self.mcts is not None:
+            self.mcts.close()
+        if self.book is not None:
+            self.book.close()
+
     def player_move(self, col: int) -> tuple(int, int):
         if col < 0 or col >= self.board.column:
             raise ValueError("out of range column\n")
@@ -49,31 +357,67 @@ class ConnectFour:
 
         else:
             self.board.set(row, col, Board.player)
+            if self.ponderer is not None and self.ponderer.active:
+                # only the search of the position after this move is needed now
+                self.ponderer.keep(self.board)
             return (row, col)
 
     @staticmethod
     def gravity(board: Board, col: int) -> int:
         # given a column returns the bottom row which is not occupied
         # if column is full returns -1
-        row = -1
-        for i in range(board.row - 1, -1, -1):
-            if board.get(i, col) == 0:
-                row = i
-                break
-
-        return row
+        return board.gravity(col)
     
     @staticmethod
-    def generate_legal_moves(board: Board) -> List[List[int, int]]:
+    def count_pieces(board: Board) -> int:
+        # returns the number of pieces on the board
+        return board.n_pieces
+
+    @staticmethod
+    def generate_legal_moves(board: Board, order: list[int]=None) -> List[List[int, int]]:
         # returns all the possible moves at each turn
+        # order is the order of columns to check, left to right if not given
+        if order is None:
+            order = range(0, board.column)
+
+        # board keeps the height of every column, no need to look at the cells
+        heights = board.heights
+        top = board.row - 1
         all_moves = []
-        for c in range(0, board.column):
-            row = ConnectFour.gravity(board, c)
-            if row != -1:
-                all_moves.append([row, c])
+        for c in order:
+            if heights[c] <= top:
+                all_moves.append([top - heights[c], c])
                 
         return all_moves
 
+
+    @staticmethod
+    def distinct_moves(board: Board, legal_moves_func=None) -> List[List[int, int]]:
+        # returns the legal moves (of legal_moves_func, generate_legal_moves by default) without
+        # the moves that are the mirror image of a later move, when the board is symmetric
+        if legal_moves_func is None:
+            legal_moves_func = ConnectFour.generate_legal_moves
+        all_moves = legal_moves_func(board)
+        if not board.is_symmetric():
+            return all_moves
+
+        # the later one of the two is kept, the search chooses the last of equally good moves
+        later = set()
+        distinct = []
+        for move in reversed(all_moves):
+            if board.column - 1 - move[1] not in later:
+                distinct.append(move)
+            later.add(move[1])
+
+        distinct.reverse()
+        return distinct
+
+    @staticmethod
+    def center_order(n_column: int) -> list[int]:
+        # columns from the center to the edges, e.g. 3, 2, 4, 1, 5, 0, 6 for 7 columns
+        # pieces in the center are part of more 4 in rows, so these moves are usually better
+        center = (n_column - 1) / 2
+        return sorted(range(0, n_column), key=lambda c: (abs(c - center), c))
     
     @staticmethod
     def evaluation_func(board: Board) -> int:
@@ -326,7 +670,22 @@ class ConnectFour:
 
         # max 4 ending combinations in a horizontal direction, always 1 in a vertical direction (south), max 6 in diagonal directions
         # no need to check North direction, because rows are filled from South towards the North
-        
+
+        # the result of the last make_move() is already known by the board
+        if lm_row == board.last_row and lm_col == board.last_col:
+            if board.winner != Board.empty:
+                return 1
+            if board.is_full():
+                return -1
+            return 0
+
+        # bitboard checks the whole board for the mover at once with a few shifts
+        if isinstance(board, BitBoard):
+            if board.is_win(board.get(lm_row, lm_col)):
+                return 1
+            if board.is_full():
+                return -1
+            return 0
         
         if ConnectFour.check_south(board, lm_row, lm_col):
             return 1
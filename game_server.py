@@ -0,0 +1,335 @@
+# This file contains the implementation of GameServer class
+
+"""
+GameServer hosts many Connect 4 games at the same time over a TCP or Unix socket, with asyncio.
+
+Protocol is line delimited JSON: the client sends one JSON object per line and gets one JSON object
+per line back, in the same order. Requests that have an "id" get it back in the response.
+
+    {"op": "new", "rows": 6, "columns": 7, "difficulty": 5, "ai_first": false}
+        -> {"ok": true, "game": 1, "ai": [5, 3] or null}
+    {"op": "move", "game": 1, "col": 3}
+        -> {"ok": true, "player": [5, 3], "ai": [4, 3] or null, "result": "ongoing",
+            "nodes": 1234, "ai_seconds": 0.05, "budget_left": 29.95}
+    {"op": "close", "game": 1}           -> {"ok": true}
+    {"op": "stats"}                      -> {"ok": true, "games": 10, "pending": 2, ...}
+
+result is "ongoing", "player" (player won), "ai" (AI won) or "draw". Errors are
+{"ok": false, "error": "..."}, and the game stays as it was.
+
+AI moves are searched in a process pool of bounded size (the same way as parallel_search.py, the
+board is sent as Board.to_bytes() and every worker keeps one AI with its transposition table for all
+the moves it searches), so the event loop only reads and writes sockets and the other
+games go on while AI thinks. Opening book moves (see opening_book.py) are played without the pool,
+in games whose difficulty is at least the depth of the book.
+
+Time budget: every game has budget seconds for all its AI moves. A move gets the remaining budget
+divided by the number of AI moves left in the worst case, the search goes as deep as it can in
+that time, up to the difficulty of the game (see BoardGameAI.think()).
+
+Searched moves are kept in a PositionCache of cache_size positions shared by all games (see
+position_cache.py), a position searched at least to the difficulty of the game before is answered
+from it without the pool. cache_size=0 turns it off.
+
+Backpressure: at most max_pending AI moves can be waiting for or running in the pool. A connection
+whose move doesn't fit waits for a free place and doesn't read its next request meanwhile, so the
+client is slowed down by TCP. If it waits longer than busy_timeout it gets {"error": "busy"} back.
+Responses are written with drain(), so a client that doesn't read its responses is not served
+either.
+
+Usage: python3 -m game_server [-p port | -u unix socket path] [-w workers] [-q max pending]
+       then e.g. python3 -m load_generator to measure it
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+from connect_four import ConnectFour
+from position_cache import PositionCache
+
+# state of a worker process, set by _init_worker()
+_worker_ai_factory = None
+_worker_board = None   # board of the worker's AI, made at the first task, every task loads its position
+_worker_ai = None
+
+
+def _init_worker(ai_factory) -> None:
+    global _worker_ai_factory
+    _worker_ai_factory = ai_factory
+
+
+def _think_task(data: bytes, max_depth: int, time_limit: float):
+    # searches the AI move in a worker, returns (row, col, nodes, completed depth)
+    global _worker_board, _worker_ai
+    position = Board.from_bytes(data)
+    if _worker_board is None or position.row != _worker_board.row or position.column != _worker_board.column:
+        # the first task or a game of another board size, the AI of this one is made again
+        _worker_board = Board(Board.red, position.row, position.column)
+        _worker_ai = _worker_ai_factory(_worker_board)
+    board = _worker_board
+    board.load(position)
+    ai = _worker_ai
+    row, col = ai.think(board, max_depth, time_limit=time_limit)
+    return row, col, ai.last_stats.total_nodes, ai.completed_depth
+
+
+class _Session:
+    # one game hosted by the server
+
+    def __init__(self, game: ConnectFour, difficulty: int, budget: float):
+        self.game = game
+        self.difficulty = difficulty
+        self.budget_left = budget
+        self.result = "ongoing"
+        self.lock = asyncio.Lock()   # moves of a game are made one by one
+
+
+class GameServer:
+
+    def __init__(self, workers: int=None, max_pending: int=None, budget: float=60.0,
+                 busy_timeout: float=10.0, evaluator: str="incremental", opening_book: str=None,
+                 max_difficulty: int=10, cache_size: int=100000):
+        self.workers = workers if workers is not None else multiprocessing.cpu_count()
+        self.max_pending = max_pending if max_pending is not None else 4 * self.workers
+        self.budget = budget
+        self.busy_timeout = busy_timeout
+        self.opening_book = opening_book
+        self.max_difficulty = max_difficulty
+
+        self._ai_factory = functools.partial(ConnectFour.make_ai, evaluator=evaluator, tt_size_mb=4)
+        self._pool = None
+        self._slots = None
+        self._server = None
+        self._sessions = {}
+        self._next_id = 1
+        self.cache = PositionCache(cache_size) if cache_size > 0 else None
+
+        self.pending = 0        # AI moves waiting for or running in the pool
+        self.moves = 0
+        self.busy = 0           # requests rejected because the pool was full
+
+    async def start(self, host: str="127.0.0.1", port: int=8765, path: str=None) -> None:
+        # listens on the Unix socket path if given, on host:port otherwise
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self._ai_factory,))
+        self._slots = asyncio.Semaphore(self.max_pending)
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self.__serve, path=path)
+        else:
+            self._server = await asyncio.start_server(self.__serve, host, port)
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        for session in self._sessions.values():
+            session.game.close()
+        self._sessions = {}
+
+    async def handle(self, request: dict) -> dict:
+        # answers one request, see the protocol at the top of the file
+        op = request.get("op")
+        if op == "new":
+            return await self.__new_game(request)
+        if op == "move":
+            return await self.__move(request)
+        if op == "close":
+            session = self.__session(request)
+            if session is None:
+                return {"ok": False, "error": "unknown game"}
+            del self._sessions[request["game"]]
+            session.game.close()
+            return {"ok": True}
+        if op == "stats":
+            return {"ok": True, "games": len(self._sessions), "pending": self.pending,
+                    "moves": self.moves, "busy": self.busy, "workers": self.workers,
+                    "max_pending": self.max_pending,
+                    "cache_hits": self.cache.hits if self.cache is not None else 0}
+
+        return {"ok": False, "error": f"unknown op {op}"}
+
+    async def __serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # serves one connection, its requests one after another
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be an object")
+                except ValueError as e:
+                    response = {"ok": False, "error": f"bad request: {e}"}
+                else:
+                    response = await self.handle(request)
+                    if "id" in request:
+                        response["id"] = request["id"]
+
+                writer.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def __new_game(self, request: dict) -> dict:
+        try:
+            n_row = int(request.get("rows", 6))
+            n_column = int(request.get("columns", 7))
+            difficulty = int(request.get("difficulty", 5))
+        except (TypeError, ValueError):
+            return {"ok": False, "error": "rows, columns and difficulty must be numbers"}
+        if not 4 <= n_row <= 30 or not 4 <= n_column <= 30:
+            return {"ok": False, "error": "rows and columns must be between [4-30]"}
+        if not 0 <= difficulty <= self.max_difficulty:
+            return {"ok": False, "error": f"difficulty must be between [0-{self.max_difficulty}]"}
+
+        book = self.opening_book if (n_row, n_column) == (6, 7) else None
+        game = ConnectFour(Board.red, difficulty_level=difficulty, n_row=n_row, n_column=n_column,
+                           tt_size_mb=0, opening_book=book)
+        session = _Session(game, difficulty, self.budget)
+        game_id = self._next_id
+        self._next_id += 1
+        self._sessions[game_id] = session
+
+        response = {"ok": True, "game": game_id, "ai": None}
+        if request.get("ai_first", False):
+            async with session.lock:
+                ai = await self.__ai_move(session)
+            if ai is None:
+                del self._sessions[game_id]
+                game.close()
+                return {"ok": False, "error": "busy"}
+            response["ai"] = list(ai[0])
+
+        return response
+
+    def __session(self, request: dict):
+        # session of the game of the request, None if there isn't one. Ids are ints, anything else
+        # (e.g. a list, which can't be looked up in a dict) is an unknown game
+        game_id = request.get("game")
+        if not isinstance(game_id, int) or isinstance(game_id, bool):
+            return None
+        return self._sessions.get(game_id)
+
+    async def __move(self, request: dict) -> dict:
+        session = self.__session(request)
+        if session is None:
+            return {"ok": False, "error": "unknown game"}
+
+        async with session.lock:
+            if session.result != "ongoing":
+                return {"ok": False, "error": "game is over"}
+
+            game = session.game
+            try:
+                row, col = game.player_move(int(request.get("col")))
+            except (TypeError, ValueError) as e:
+                return {"ok": False, "error": f"bad move: {str(e).strip()}"}
+
+            response = {"ok": True, "player": [row, col], "ai": None}
+            endgame = ConnectFour.is_endgame(game.board, row, col)
+            if endgame != 0:
+                session.result = "player" if endgame == 1 else "draw"
+            else:
+                ai = await self.__ai_move(session)
+                if ai is None:
+                    # the move of the player is taken back, the client can send it again later
+                    game.board.remove(row, col)
+                    return {"ok": False, "error": "busy"}
+
+                (ai_row, ai_col), nodes, seconds = ai
+                response.update({"ai": [ai_row, ai_col], "nodes": nodes, "ai_seconds": seconds})
+                endgame = ConnectFour.is_endgame(game.board, ai_row, ai_col)
+                if endgame != 0:
+                    session.result = "ai" if endgame == 1 else "draw"
+
+            response["result"] = session.result
+            response["budget_left"] = session.budget_left
+            return response
+
+    async def __ai_move(self, session: _Session):
+        # makes the AI move, returns ((row, col), nodes, seconds) or None if the pool stayed full
+        game = session.game
+        move = game.book_move()
+        if move is not None:
+            game.board.set(move[0], move[1], Board.ai)
+            self.moves += 1
+            return move, 0, 0.0
+        if self.cache is not None:
+            move = self.cache.get(game.board, session.difficulty)
+            if move is not None:
+                game.board.set(move[0], move[1], Board.ai)
+                self.moves += 1
+                return move, 0, 0.0
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.busy_timeout)
+        except asyncio.TimeoutError:
+            self.busy += 1
+            return None
+
+        # the worst case number of AI moves left is half of the empty cells
+        board = game.board
+        moves_left = max(1, (board.row * board.column - board.n_pieces + 1) // 2)
+        time_limit = max(0.01, session.budget_left / moves_left)
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            row, col, nodes, depth = await loop.run_in_executor(self._pool, _think_task, board.to_bytes(),
+                                                         session.difficulty, time_limit)
+        finally:
+            self.pending -= 1
+            self._slots.release()
+
+        seconds = time.perf_counter() - start
+        session.budget_left = max(0.0, session.budget_left - seconds)
+        if self.cache is not None:
+            self.cache.put(board, depth, (row, col))
+        board.set(row, col, Board.ai)
+        self.moves += 1
+        return (row, col), nodes, seconds
+
+
+async def _main(args) -> None:
+    server = GameServer(args.workers, args.max_pending, args.budget, opening_book=args.opening_book,
+                        cache_size=args.cache_size)
+    await server.start(args.host, args.port, args.unix)
+    print(f"serving on {args.unix or f'{args.host}:{args.port}'}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-H", "--host", type=str, help="host to listen on", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, help="TCP port to listen on", default=8765)
+    parser.add_argument("-u", "--unix", type=str, help="Unix socket path to listen on instead of TCP", default=None)
+    parser.add_argument("-w", "--workers", type=int, help="number of AI processes", default=multiprocessing.cpu_count())
+    parser.add_argument("-q", "--max_pending", type=int, help="AI moves waiting or running at most, 4 per worker by default", default=None)
+    parser.add_argument("-b", "--budget", type=float, help="seconds of AI thinking per game", default=60.0)
+    parser.add_argument("-ob", "--opening_book", type=str, help="opening book file for 6x7 games", default=None)
+    parser.add_argument("-cs", "--cache_size", type=int, help="positions kept in the cache of searched moves, 0 turns it off", default=100000)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
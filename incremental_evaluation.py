@@ -0,0 +1,173 @@
+# This file contains the implementation of IncrementalEvaluator class
+
+"""
+IncrementalEvaluator gives the same scores as ConnectFour.evaluation_func, but instead of scanning
+the whole board at every leaf of the search, it keeps the score up to date while pieces are put
+and removed. It is attached to the board as an observer (see Board.attach()), so every set() and
+remove() calls on_change() which updates only the parts of the score touched by the changed cell.
+evaluate() then just returns the stored score.
+
+ConnectFour.evaluation_func gives +1 to AI for every (AI piece, window of 4 cells containing it
+with no player pieces) pair, and -1 for every such pair of player's pieces. Grouping the pairs by
+window: a horizontal or vertical window with A AI pieces and P player pieces adds A if P == 0
+and subtracts P if A == 0. Per-window piece counts are kept for every horizontal and vertical
+window, and the (at most 8) windows containing the changed cell are updated.
+
+Diagonal loops of evaluation_func start 3 cells before the piece but do not stop after passing it,
+so a piece also scores the open windows further down along its diagonal. To give identical scores
+a diagonal window counts all the pieces on its diagonal up to the end of the window, not only the
+ones inside it. Changing a cell changes the counts of every window after it on the diagonal, so
+for diagonals the whole line (at most 30 cells) through the changed cell is rescored.
+"""
+
+from board import Board
+
+class IncrementalEvaluator:
+
+    def __init__(self, board: Board):
+        self.board = board
+        self.score = 0
+
+        row = board.row
+        col = board.column
+
+        # horizontal and vertical windows, each is a list of 4 cells
+        self._windows = []
+        for i in range(0, row):
+            for j in range(0, col - 3):
+                self._windows.append([(i, j + k) for k in range(0, 4)])
+        for i in range(0, row - 3):
+            for j in range(0, col):
+                self._windows.append([(i + k, j) for k in range(0, 4)])
+
+        # ids of the windows containing each cell
+        self._cell_windows = [[[] for _ in range(0, col)] for _ in range(0, row)]
+        for w in range(0, len(self._windows)):
+            for (i, j) in self._windows[w]:
+                self._cell_windows[i][j].append(w)
+
+        # diagonal lines, cells are ordered the same way as evaluation_func walks them:
+        # diagonal1 from top left to bottom right, diagonal2 from top right to bottom left
+        self._lines = []
+        for start in [(0, j) for j in range(0, col)] + [(i, 0) for i in range(1, row)]:
+            self._lines.append(IncrementalEvaluator.__walk(start, 1, 1, row, col))
+        for start in [(0, j) for j in range(0, col)] + [(i, col - 1) for i in range(1, row)]:
+            self._lines.append(IncrementalEvaluator.__walk(start, 1, -1, row, col))
+
+        # ids of the two diagonal lines going through each cell
+        self._cell_lines = [[[] for _ in range(0, col)] for _ in range(0, row)]
+        for l in range(0, len(self._lines)):
+            for (i, j) in self._lines[l]:
+                self._cell_lines[i][j].append(l)
+
+        self.sync()
+
+    def sync(self) -> None:
+        # recomputes everything from the board, used when the board was changed while detached
+        board = self.board
+        self._cells = [[int(board.get(i, j)) for j in range(0, board.column)] for i in range(0, board.row)]
+
+        self._ai_count = [0] * len(self._windows)
+        self._player_count = [0] * len(self._windows)
+        self.score = 0
+        for w in range(0, len(self._windows)):
+            for (i, j) in self._windows[w]:
+                if self._cells[i][j] == Board.ai:
+                    self._ai_count[w] += 1
+                elif self._cells[i][j] == Board.player:
+                    self._player_count[w] += 1
+            self.score += self.__window_score(w)
+
+        self._line_scores = [self.__line_score(l) for l in range(0, len(self._lines))]
+        self.score += sum(self._line_scores)
+
+    def attach(self) -> "IncrementalEvaluator":
+        # start following the board
+        self.sync()
+        self.board.attach(self)
+        return self
+
+    def detach(self) -> None:
+        self.board.detach(self)
+
+    def evaluate(self, board: Board=None) -> int:
+        # same signature as ConnectFour.evaluation_func, so it can be passed to BoardGameAI
+        return self.score
+
+    def on_change(self, row: int, col: int, old: int, new: int) -> None:
+        if old == new:
+            return
+
+        self._cells[row][col] = new
+        ai_count = self._ai_count
+        player_count = self._player_count
+
+        for w in self._cell_windows[row][col]:
+            self.score -= self.__window_score(w)
+            if old == Board.ai:
+                ai_count[w] -= 1
+            elif old == Board.player:
+                player_count[w] -= 1
+            if new == Board.ai:
+                ai_count[w] += 1
+            elif new == Board.player:
+                player_count[w] += 1
+            self.score += self.__window_score(w)
+
+        for l in self._cell_lines[row][col]:
+            line_score = self.__line_score(l)
+            self.score += line_score - self._line_scores[l]
+            self._line_scores[l] = line_score
+
+    def __window_score(self, w: int) -> int:
+        if self._player_count[w] == 0:
+            return self._ai_count[w]
+        if self._ai_count[w] == 0:
+            return -self._player_count[w]
+        return 0
+
+    def __line_score(self, l: int) -> int:
+        # score of all the windows on a diagonal line, see the explanation at the top of the file
+        cells = self._cells
+        line = self._lines[l]
+        score = 0
+        ai_total = 0       # pieces on the line up to the end of current window
+        player_total = 0
+        ai_window = 0      # pieces inside current window
+        player_window = 0
+
+        for k in range(0, len(line)):
+            (i, j) = line[k]
+            if cells[i][j] == Board.ai:
+                ai_total += 1
+                ai_window += 1
+            elif cells[i][j] == Board.player:
+                player_total += 1
+                player_window += 1
+
+            if k >= 4:
+                (i, j) = line[k - 4]
+                if cells[i][j] == Board.ai:
+                    ai_window -= 1
+                elif cells[i][j] == Board.player:
+                    player_window -= 1
+
+            if k >= 3:
+                if player_window == 0:
+                    score += ai_total
+                if ai_window == 0:
+                    score -= player_total
+
+        return score
+
+    @staticmethod
+    def __walk(start, d_row: int, d_col: int, row: int, col: int):
+        # cells from start in the given direction until the edge of the board
+        cells = []
+        (i, j) = start
+        while 0 <= i < row and 0 <= j < col:
+            cells.append((i, j))
+            i += d_row
+            j += d_col
+
+        return cells
@@ -0,0 +1,126 @@
+# This file contains the implementation of LazySMPSearch class
+
+"""
+LazySMPSearch is a parallel version of BoardGameAI.think() in the style of "Lazy SMP": instead of
+dividing the work, every worker process searches the whole position, and they help each other
+only through one SharedTranspositionTable (see shared_transposition_table.py). A worker that
+reaches a position already searched by another one takes the result from the table, and the
+best moves stored by others change its move order, so the workers drift apart and cover different
+parts of the tree. More workers fill the table faster, so the required depth is reached sooner.
+
+Workers search with iterative deepening; even numbered workers aim at the requested depth, odd
+numbered ones one ply deeper, so that they fill the table with deeper results for the others.
+Without a time limit the search ends as soon as any worker completes the requested depth, the
+others are stopped through a shared stop flag. With a time limit all of them search until the
+time is over. The move of the worker that completed the deepest search is returned (the one with
+lower number when equal), so unlike RootParallelSearch the result is not deterministic.
+
+Workers build their AI with ai_factory(board) (must be picklable, see parallel_search.py) and
+replace its transposition table with the shared one.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from board import Board
+from search_stats import SearchStats
+from shared_transposition_table import SharedTranspositionTable
+
+# state of a worker process, set by _init_worker()
+_worker_ai_factory = None
+_worker_tt = None
+_worker_stop = None
+_worker_board_class = Board
+
+
+def _init_worker(ai_factory, tt_name: str, stop, board_class) -> None:
+    global _worker_ai_factory, _worker_tt, _worker_stop, _worker_board_class
+    _worker_ai_factory = ai_factory
+    _worker_tt = SharedTranspositionTable(name=tt_name)
+    _worker_stop = stop
+    _worker_board_class = board_class
+
+
+def _search_task(data: bytes, max_depth: int, time_limit: float, search_id: int):
+    # searches the position with iterative deepening, returns (move, completed depth, nodes per depth,
+    # endgame calls)
+    board = _worker_board_class.from_bytes(data)
+    ai = _worker_ai_factory(board)
+    ai.tt = _worker_tt
+    ai.should_stop = lambda: _worker_stop.value == search_id
+
+    move = ai.think(board, max_depth, time_limit=time_limit)
+    return move, ai.completed_depth, ai.last_stats.nodes, ai.last_stats.endgame_calls
+
+
+class LazySMPSearch:
+
+    # time limit of the workers when the search has no time limit, they are stopped by the flag
+    NO_TIME_LIMIT = 365 * 24 * 3600.0
+
+    def __init__(self, ai_factory, workers: int=None, tt_size_mb: float=64, board_class=Board):
+        self.ai_factory = ai_factory
+        self.workers = workers if workers is not None else multiprocessing.cpu_count()
+        self.tt_size_mb = tt_size_mb
+        self.board_class = board_class
+
+        self.completed_depth = -1
+        self.last_stats = None
+
+        self.tt = None
+        self._pool = None
+        self._stop = None
+        self._search_id = 0
+
+    def think(self, board: Board, max_depth: int=3, time_limit: float=None) -> tuple[int, int]:
+        start = time.perf_counter()
+        if self._pool is None:
+            self.tt = SharedTranspositionTable(self.tt_size_mb)
+            self._stop = multiprocessing.Value("q", 0)
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.ai_factory, self.tt.name, self._stop, self.board_class))
+
+        self.tt.new_search()
+        self._search_id += 1
+        data = board.to_bytes()
+        futures = {}
+        for i in range(0, self.workers):
+            depth = max_depth + (i & 1)
+            future = self._pool.submit(_search_task, data, depth,
+                                       time_limit if time_limit is not None else LazySMPSearch.NO_TIME_LIMIT,
+                                       self._search_id)
+            futures[future] = i
+
+        results = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future]] = future.result()
+                # without time limit the first worker reaching the depth ends the search
+                if time_limit is None and results[futures[future]][1] >= max_depth:
+                    self._stop.value = self._search_id
+
+        # deepest completed search wins, lower worker number when equal
+        best = max(results, key=lambda i: (results[i][1], -i))
+        best_move, self.completed_depth, _, _ = results[best]
+
+        self.last_stats = SearchStats()
+        self.last_stats.nodes[0] = 1
+        for _, _, nodes, endgame_calls in results.values():
+            self.last_stats.grow(len(nodes))
+            for d in range(1, len(nodes)):
+                self.last_stats.nodes[d] += nodes[d]
+            self.last_stats.endgame_calls += endgame_calls
+        self.last_stats.elapsed = time.perf_counter() - start
+        self.last_stats.completed_depth = self.completed_depth
+
+        return best_move
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+            self.tt.unlink()
+            self.tt = None
@@ -0,0 +1,134 @@
+# This file measures the move latency of GameServer under load
+
+"""
+Opens many connections to a running GameServer (see game_server.py) at the same time. Every
+connection plays games one after another, with random legal moves for the player, and measures the
+time from sending a move to getting the response (which includes the AI's answer). At the end it
+prints the number of moves, moves per second and the 50th/99th percentile and max latency.
+
+Moves come from random.Random(seed + connection number), so the load is the same in every run.
+
+Usage: python3 -m load_generator [-p port | -u unix socket path] [-c connections] [-g games per connection]
+                                 [-d difficulty] [-r rows] [-cols columns]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+
+class _Connection:
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, request: dict) -> dict:
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+
+def percentile(values: list[float], p: float) -> float:
+    # p-th percentile (0-100) with the nearest rank method
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def _play(connection: _Connection, n_games: int, difficulty: int, n_row: int, n_column: int,
+                rng: random.Random, latencies: list[float], errors: dict) -> None:
+    for _ in range(0, n_games):
+        response = await connection.request({"op": "new", "rows": n_row, "columns": n_column,
+                                             "difficulty": difficulty, "ai_first": rng.random() < 0.5})
+        if not response["ok"]:
+            errors[response["error"]] = errors.get(response["error"], 0) + 1
+            continue
+
+        game = response["game"]
+        heights = [0] * n_column
+        if response["ai"] is not None:
+            heights[response["ai"][1]] += 1
+
+        result = "ongoing"
+        while result == "ongoing":
+            col = rng.choice([c for c in range(0, n_column) if heights[c] < n_row])
+            start = time.perf_counter()
+            response = await connection.request({"op": "move", "game": game, "col": col})
+            latency = time.perf_counter() - start
+            if not response["ok"]:
+                errors[response["error"]] = errors.get(response["error"], 0) + 1
+                if response["error"] == "busy":
+                    continue
+                break
+
+            latencies.append(latency)
+            heights[col] += 1
+            if response["ai"] is not None:
+                heights[response["ai"][1]] += 1
+            result = response["result"]
+
+        await connection.request({"op": "close", "game": game})
+
+
+async def run(host: str="127.0.0.1", port: int=8765, path: str=None, connections: int=16,
+              games: int=4, difficulty: int=3, n_row: int=6, n_column: int=7, seed: int=0) -> dict:
+    # plays the games and returns the results
+    latencies = []
+    errors = {}
+    streams = []
+    for _ in range(0, connections):
+        if path is not None:
+            streams.append(_Connection(*await asyncio.open_unix_connection(path)))
+        else:
+            streams.append(_Connection(*await asyncio.open_connection(host, port)))
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(_play(c, games, difficulty, n_row, n_column, random.Random(seed + i),
+                                     latencies, errors)
+                               for i, c in enumerate(streams)))
+    finally:
+        for connection in streams:
+            connection.writer.close()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "moves": len(latencies),
+        "seconds": elapsed,
+        "moves_per_second": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+        "errors": errors,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-H", "--host", type=str, help="host of the server", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, help="TCP port of the server", default=8765)
+    parser.add_argument("-u", "--unix", type=str, help="Unix socket path of the server instead of TCP", default=None)
+    parser.add_argument("-c", "--connections", type=int, help="number of connections at the same time", default=16)
+    parser.add_argument("-g", "--games", type=int, help="games played on every connection", default=4)
+    parser.add_argument("-d", "--difficulty_level", type=int, help="difficulty of the games", default=3)
+    parser.add_argument("-r", "--n_rows", type=int, help="number of rows in board", default=6)
+    parser.add_argument("-cols", "--n_columns", type=int, help="number of columns in board", default=7)
+    parser.add_argument("-sd", "--seed", type=int, help="seed of the random moves", default=0)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.host, args.port, args.unix, args.connections, args.games,
+                              args.difficulty_level, args.n_rows, args.n_columns, args.seed))
+
+    print(f"moves: {results['moves']} in {results['seconds']:.2f} s, {results['moves_per_second']:.1f} moves/s")
+    print(f"latency p50: {1000 * results['p50']:.1f} ms, p99: {1000 * results['p99']:.1f} ms, "
+          f"max: {1000 * results['max']:.1f} ms")
+    if results["errors"]:
+        print(f"errors: {results['errors']}")
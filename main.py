@@ -1,7 +1,10 @@
 # This file executes the Connect4 game
 
 from connect_four import ConnectFour
+from search_trace import make_trace
+from position_cache import PositionCache
 import argparse
+import os
 import sys
 
 def game_loop(game: ConnectFour, player_turn: int=1) -> None:
@@ -33,6 +36,10 @@ def game_loop(game: ConnectFour, player_turn: int=1) -> None:
              
         game.board.display()
         endgame = ConnectFour.is_endgame(game.board, row, col)
+
+        # AI thinks about its next move while the player is thinking
+        if not player_turn and endgame == 0:
+            game.ponder()
         
         if endgame == 1:
             flag = False
@@ -54,6 +61,8 @@ parser =  argparse.ArgumentParser()
 
 parser.add_argument("-d", "--difficulty_level", type=int, help="difficulty level of the game. between [0-15]",
                     default = 5)
+parser.add_argument("-s", "--seconds", type=float, help="seconds AI can think per move, used instead of difficulty level. between (0-600]",
+                    default = None)
 parser.add_argument("-c", "--colour", type=str, help="colour of the player's tiles. r for red, b for blue",
                     default = 'r')
 parser.add_argument("-t", "--turn", type=int, help="1 for taking first turn, 0 for not taking first turn",
@@ -62,6 +71,38 @@ parser.add_argument("-r", "--n_rows", type=int, help="number of rows in a board.
                     default = 6)
 parser.add_argument("-cols", "--n_columns", type=int, help="number of rows in a board. must be between [4-30]",
                     default = 7)
+parser.add_argument("-bb", "--bitboard", type=int, help="1 for bitboard backed board (faster AI), 0 for numpy board",
+                    default = 0)
+parser.add_argument("-e", "--evaluator", type=str, help="how AI scores positions: full (rescan the board), incremental or numpy",
+                    default = "full")
+parser.add_argument("-tt", "--tt_size", type=int, help="memory of AI's transposition table in MB, 0 turns it off. between [0-4096]",
+                    default = 16)
+parser.add_argument("-tr", "--trace", type=str, help="trace AI's search: off, print, counters, or a file name ending with .jsonl or .bin",
+                    default = "off")
+parser.add_argument("-st", "--stats", type=str, help="file to write AI search statistics to after every AI move, in Prometheus text format",
+                    default = None)
+parser.add_argument("-mo", "--move_ordering", type=int, help="1 for searching the most promising moves first (faster AI), 0 for left to right",
+                    default = 1)
+parser.add_argument("-w", "--workers", type=int, help="number of processes AI searches with. between [1-256]",
+                    default = 1)
+parser.add_argument("-pm", "--parallel_mode", type=str, help="how workers share the search: root (split the moves) or lazy_smp (shared transposition table)",
+                    default = "root")
+parser.add_argument("-ob", "--opening_book", type=str, help="opening book file, auto for the book of the board size in books/ if there is one, or off",
+                    default = "auto")
+parser.add_argument("-sv", "--solver", type=int, help="number of pieces on the board from which AI tries to solve the game exactly, 0 turns it off. e.g. 22 for the 6x7 board",
+                    default = 0)
+parser.add_argument("-svs", "--solver_seconds", type=float, help="time AI tries to solve the game for at each turn. between (0-600]",
+                    default = 2.0)
+parser.add_argument("-en", "--engine", type=str, help="how AI chooses its moves: minimax, pvs (Principal Variation Search, same moves faster) or mcts (Monte Carlo Tree Search, better on big boards)",
+                    default = "minimax")
+parser.add_argument("-mi", "--mcts_iterations", type=int, help="random games MCTS plays per move, used instead of difficulty level. between [1-1000000]",
+                    default = 2000)
+parser.add_argument("-ta", "--threat_analysis", type=int, help="1 for not searching moves that lose at once or when a move is forced (faster AI), 0 for searching all moves",
+                    default = 0)
+parser.add_argument("-po", "--ponder", type=int, help="number of processes AI searches its next move with during the player's turn, 0 turns it off. between [0-256]",
+                    default = 0)
+parser.add_argument("-pc", "--position_cache", type=str, help="file of the moves AI searched in earlier games, used and updated by this game",
+                    default = None)
 
 args = parser.parse_args()
 
@@ -70,6 +111,10 @@ if args.difficulty_level < 0 or args.difficulty_level > 15:
     print(f"difficulty level must be between [0-15]. You entered {args.difficulty_level}")
     sys.exit(1)
 
+if args.seconds is not None and (args.seconds <= 0 or args.seconds > 600):
+    print(f"seconds per move must be between (0-600]. You entered {args.seconds}")
+    sys.exit(1)
+
 if args.colour != 'r' and args.colour != 'b':
     print(f"colour must be either r or b. You entered {args.colour}")
     sys.exit(1)
@@ -86,8 +131,101 @@ if args.n_columns < 4 or args.n_columns > 30:
     print(f"number of columns must be between [4-30]. You entered {args.n_columns}")
     sys.exit(1)
 
+if args.bitboard != 1 and args.bitboard != 0:
+    print(f"bitboard must be set to either 1 or 0. You entered {args.bitboard}")
+    sys.exit(1)
+
+if args.evaluator not in ("full", "incremental", "numpy"):
+    print(f"evaluator must be one of full, incremental or numpy. You entered {args.evaluator}")
+    sys.exit(1)
+
+if args.move_ordering != 1 and args.move_ordering != 0:
+    print(f"move ordering must be set to either 1 or 0. You entered {args.move_ordering}")
+    sys.exit(1)
+
+if args.engine not in ("minimax", "pvs", "mcts"):
+    print(f"engine must be one of minimax, pvs or mcts. You entered {args.engine}")
+    sys.exit(1)
+
+if args.mcts_iterations < 1 or args.mcts_iterations > 1000000:
+    print(f"MCTS iterations must be between [1-1000000]. You entered {args.mcts_iterations}")
+    sys.exit(1)
+
+if args.threat_analysis != 1 and args.threat_analysis != 0:
+    print(f"threat analysis must be set to either 1 or 0. You entered {args.threat_analysis}")
+    sys.exit(1)
+
+if args.workers < 1 or args.workers > 256:
+    print(f"number of workers must be between [1-256]. You entered {args.workers}")
+    sys.exit(1)
+
+if args.ponder < 0 or args.ponder > 256:
+    print(f"number of ponder processes must be between [0-256]. You entered {args.ponder}")
+    sys.exit(1)
+
+if args.parallel_mode not in ("root", "lazy_smp"):
+    print(f"parallel mode must be either root or lazy_smp. You entered {args.parallel_mode}")
+    sys.exit(1)
+
+if args.solver < 0:
+    print(f"number of pieces for the solver can't be negative. You entered {args.solver}")
+    sys.exit(1)
+
+if args.solver_seconds <= 0 or args.solver_seconds > 600:
+    print(f"solver seconds must be between (0-600]. You entered {args.solver_seconds}")
+    sys.exit(1)
+
+if args.tt_size < 0 or args.tt_size > 4096:
+    print(f"transposition table size must be between [0-4096]. You entered {args.tt_size}")
+    sys.exit(1)
+
+opening_book = None
+if args.opening_book == "auto":
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "books", f"{args.n_rows}x{args.n_columns}.bin")
+    if os.path.exists(path):
+        opening_book = path
+elif args.opening_book != "off":
+    if not os.path.exists(args.opening_book):
+        print(f"opening book must be auto, off or an existing file. You entered {args.opening_book}")
+        sys.exit(1)
+    opening_book = args.opening_book
+
+position_cache = None
+if args.position_cache is not None:
+    position_cache = PositionCache()
+    if os.path.exists(args.position_cache):
+        try:
+            position_cache.load(args.position_cache)
+        except ValueError:
+            print(f"position cache must be a position cache file or a new file name. You entered {args.position_cache}")
+            sys.exit(1)
+
+try:
+    trace = make_trace(args.trace)
+except ValueError:
+    print(f"trace must be off, print, counters, or a file name ending with .jsonl or .bin. You entered {args.trace}")
+    sys.exit(1)
     
 # run the game
 connect4 = ConnectFour(difficulty_level=args.difficulty_level, n_row=args.n_rows,
-                       n_column=args.n_columns, p_colour=args.colour)
+                       n_column=args.n_columns, p_colour=args.colour,
+                       bitboard=bool(args.bitboard), tt_size_mb=args.tt_size,
+                       seconds_per_move=args.seconds, evaluator=args.evaluator,
+                       trace=trace, move_ordering=bool(args.move_ordering),
+                       workers=args.workers, parallel_mode=args.parallel_mode,
+                       opening_book=opening_book, solver_pieces=args.solver if args.solver > 0 else None,
+                       solver_seconds=args.solver_seconds, position_cache=position_cache,
+                       threat_analysis=bool(args.threat_analysis), engine=args.engine,
+                       mcts_iterations=args.mcts_iterations, ponder_workers=args.ponder)
+
+if args.stats is not None:
+    connect4.stats_hook = lambda search_stats, game_stats: game_stats.write_prometheus(args.stats)
+
 game_loop(connect4, args.turn)
+connect4.close()
+
+if position_cache is not None:
+    position_cache.save(args.position_cache)
+
+if trace is not None:
+    trace.close()
@@ -0,0 +1,310 @@
+# This file contains the implementation of MCTSSearch class
+
+"""
+MCTSSearch chooses the move of AI with Monte Carlo Tree Search instead of minimax. It doesn't need
+an evaluation function and its cost doesn't grow with the depth, so it plays much better than a
+depth 2-3 minimax on big boards (up to 30x30), where minimax can't go deeper in reasonable time.
+think() has the same contract as BoardGameAI.think(): think(board, max_depth, time_limit) returns
+the (row, col) move of AI, and the statistics of the search are in last_stats.
+
+Every iteration goes down the tree from the root choosing the child with the highest UCT value
+(win rate + exploration * sqrt(ln(visits of parent) / visits of child)), adds one new child at the
+first node that still has untried moves, plays a random game (rollout) from there until the end,
+and adds the result to every node on the way back up: 1 for a win, 0.5 for a draw, 0 for a loss,
+from the point of view of the side that made the move into the node. Moves that end the game are
+not rolled out, their result is known. The move played is the most visited child of the root.
+
+Rollouts choose moves at random from legal_moves_func and stop when endgame_func says the game is
+over, so for ConnectFour they use generate_legal_moves and is_endgame (whose fast path reads the
+winner make_move() found, see board.py).
+
+Budget: iterations (rollouts) per think(), or with time_limit as many as fit in the time.
+max_depth is not used, it is there for the same contract.
+
+Tree reuse: the tree is kept after think(). At the next think() the node of the new position (the
+AI move played and the reply of the player) becomes the root, with all the statistics below it.
+
+With workers > 1 rollouts run in a process pool: batch_size leaves are rolled out at the same time,
+each leaf position is sent as Board.to_bytes() and rolled out rollouts_per_leaf times in a worker.
+As soon as a task finishes its results are added to the tree and a new leaf is selected, so the
+workers don't wait for each other. A selected path gets "virtual losses" (visits without wins)
+until its results come back, so the leaves being rolled out at the same time are different. The
+pool is created at the first search and kept until close(), like in parallel_search.py.
+"""
+
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from board import Board
+from bitboard import BitBoard
+from search_stats import SearchStats
+
+# state of a worker process, set by _init_worker()
+_worker_legal_moves_func = None
+_worker_endgame_func = None
+
+
+def _init_worker(legal_moves_func, endgame_func) -> None:
+    global _worker_legal_moves_func, _worker_endgame_func
+    _worker_legal_moves_func = legal_moves_func
+    _worker_endgame_func = endgame_func
+
+
+def _rollout(board: Board, char: int, legal_moves_func, endgame_func, rng: random.Random):
+    # plays random moves from the position with char to move, returns (the winner or Board.empty
+    # for a draw, number of endgame_func calls). The moves are taken back, the board is the same
+    # as before
+    start = board.n_moves
+    winner = Board.empty
+    endgame_calls = 0
+    while True:
+        moves = legal_moves_func(board)
+        if not moves:
+            break
+        row, col = moves[rng.randrange(len(moves))]
+        board.make_move(col, char)
+        endgame_calls += 1
+        endgame = endgame_func(board, row, col)
+        if endgame == 1:
+            winner = char
+            break
+        if endgame == -1:
+            break
+        char = Board.player if char == Board.ai else Board.ai
+
+    while board.n_moves > start:
+        board.unmake_move()
+    return winner, endgame_calls
+
+
+def _rollout_task(data: bytes, char: int, n_rollouts: int, seed: int):
+    # rolls out the position in a worker, returns (AI wins, player wins, endgame calls)
+    board = BitBoard.from_bytes(data)
+    rng = random.Random(seed)
+    wins = {Board.ai: 0, Board.player: 0, Board.empty: 0}
+    endgame_calls = 0
+    for _ in range(0, n_rollouts):
+        winner, calls = _rollout(board, char, _worker_legal_moves_func, _worker_endgame_func, rng)
+        wins[winner] += 1
+        endgame_calls += calls
+
+    return wins[Board.ai], wins[Board.player], endgame_calls
+
+
+class _Node:
+    # position after 'move' made by 'char', the statistics are from char's point of view
+
+    __slots__ = ("move", "char", "parent", "children", "untried", "visits", "wins", "result")
+
+    def __init__(self, move, char: int, parent):
+        self.move = move          # (row, col), None for the root
+        self.char = char          # who made the move, the other side is to move in the node
+        self.parent = parent
+        self.children = []
+        self.untried = None       # moves not expanded yet, None until the node is first visited
+        self.visits = 0
+        self.wins = 0.0
+        self.result = None        # winner (or Board.empty for a draw) if the game is over here
+
+
+class MCTSSearch:
+
+    def __init__(self, legal_moves_func, endgame_func, iterations: int=2000, exploration: float=1.41,
+                 workers: int=1, batch_size: int=None, rollouts_per_leaf: int=4, seed: int=None):
+        self.legal_moves_func = legal_moves_func
+        self.endgame_func = endgame_func
+        self.iterations = iterations
+        self.exploration = exploration
+        self.workers = workers
+        self.batch_size = batch_size if batch_size is not None else 4 * workers
+        # one rollout per leaf without a pool, several per task otherwise to pay for the sending
+        self.rollouts_per_leaf = rollouts_per_leaf if workers > 1 else 1
+        self.rng = random.Random(seed)
+
+        self.completed_depth = -1
+        self.last_stats = None
+        self.move_scores = []     # [(row, col), win rate] of root moves in the last search
+
+        self._pool = None
+        self._root = None
+        self._root_board = None   # BitBoard of the root position, for finding it at the next think()
+
+    def think(self, board: Board, max_depth: int=None, time_limit: float=None) -> tuple[int, int]:
+        # returns the most visited move of AI after the iterations or time_limit seconds
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else None
+        self.last_stats = SearchStats()
+        self.completed_depth = 0
+        work = BitBoard.from_bytes(board.to_bytes())
+
+        root = self.__reuse(work)
+        if root is None:
+            root = _Node(None, Board.player, None)
+        root.parent = None
+        self._root = root
+        self._root_board = work
+
+        if self.workers <= 1:
+            self.__search(work, deadline)
+        else:
+            self.__search_parallel(work, deadline)
+
+        best = max(root.children, key=lambda child: child.visits)
+        self.move_scores = [[child.move, child.wins / child.visits if child.visits else 0.0]
+                            for child in root.children]
+
+        self.last_stats.elapsed = time.perf_counter() - start
+        self.last_stats.completed_depth = self.completed_depth
+        return best.move
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __search(self, board: BitBoard, deadline: float) -> None:
+        # iterations one by one, rollouts in this process
+        iterations = 0
+        while not self.__done(iterations, deadline):
+            node, to_move = self.__leaf(board, 1)
+            if node.result is not None:
+                self.__backpropagate(node, {node.result: 1})
+            else:
+                winner, endgame_calls = _rollout(board, to_move, self.legal_moves_func, self.endgame_func,
+                                                 self.rng)
+                self.__backpropagate(node, {winner: 1})
+                self.last_stats.eval_calls += 1
+                self.last_stats.endgame_calls += endgame_calls
+            self.__unwind(board)
+            iterations += 1
+
+    def __search_parallel(self, board: BitBoard, deadline: float) -> None:
+        # keeps batch_size rollout tasks in the pool, a new leaf is selected when one finishes
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.legal_moves_func, self.endgame_func))
+
+        n_rollouts = self.rollouts_per_leaf
+        iterations = 0
+        pending = {}
+        while True:
+            while len(pending) < self.batch_size and not self.__done(iterations, deadline):
+                node, to_move = self.__leaf(board, n_rollouts)
+                if node.result is not None:
+                    self.__backpropagate(node, {node.result: n_rollouts})
+                else:
+                    future = self._pool.submit(_rollout_task, board.to_bytes(), to_move, n_rollouts,
+                                               self.rng.getrandbits(32))
+                    pending[future] = node
+                self.__unwind(board)
+                iterations += n_rollouts
+
+            if not pending:
+                break
+            # the results of all the tasks are added, also after the budget is over
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                ai_wins, player_wins, endgame_calls = future.result()
+                self.__backpropagate(pending.pop(future), {Board.ai: ai_wins, Board.player: player_wins,
+                                                           Board.empty: n_rollouts - ai_wins - player_wins})
+                self.last_stats.eval_calls += n_rollouts
+                self.last_stats.endgame_calls += endgame_calls
+
+    def __done(self, iterations: int, deadline: float) -> bool:
+        # budget is over, or there is only one move and nothing to think about
+        root = self._root
+        if len(root.children) == 1 and not root.untried and root.untried is not None:
+            return True
+        if deadline is None:
+            return iterations >= self.iterations
+        return iterations > 0 and time.perf_counter() >= deadline
+
+    def __leaf(self, board: BitBoard, n_rollouts: int):
+        # selects the node to roll out, returns (node, char to move in it). Visits of the path are
+        # counted now and wins only when the results are known (virtual loss)
+        node = self.__select(board)
+        walk = node
+        while walk is not None:
+            walk.visits += n_rollouts
+            walk = walk.parent
+
+        return node, Board.player if node.char == Board.ai else Board.ai
+
+    def __select(self, board: BitBoard) -> _Node:
+        # goes down from the root with UCT making the moves on the board, expands one new node
+        node = self._root
+        depth = 0
+        while True:
+            if node.result is not None:
+                return node
+
+            if node.untried is None:
+                node.untried = self.legal_moves_func(board)
+                self.rng.shuffle(node.untried)
+
+            char = Board.player if node.char == Board.ai else Board.ai
+            if node.untried:
+                row, col = node.untried.pop()
+                child = _Node((row, col), char, node)
+                node.children.append(child)
+                board.make_move(col, char)
+                self.last_stats.endgame_calls += 1
+                endgame = self.endgame_func(board, row, col)
+                if endgame != 0:
+                    child.result = char if endgame == 1 else Board.empty
+
+                depth += 1
+                self.last_stats.grow(depth)
+                self.last_stats.nodes[depth] += 1
+                self.completed_depth = max(self.completed_depth, depth)
+                return child
+
+            if not node.children:
+                # no moves and the game didn't end, can only happen with a full board
+                node.result = Board.empty
+                return node
+
+            log_visits = math.log(node.visits)
+            exploration = self.exploration
+            node = max(node.children,
+                       key=lambda c: c.wins / c.visits + exploration * math.sqrt(log_visits / c.visits)
+                       if c.visits else float("inf"))
+            board.make_move(node.move[1], node.char)
+            depth += 1
+
+    def __backpropagate(self, node: _Node, results: dict) -> None:
+        # results is {winner: number of games}, Board.empty for draws. Visits were already added
+        while node is not None:
+            node.wins += results.get(node.char, 0) + 0.5 * results.get(Board.empty, 0)
+            node = node.parent
+
+    def __unwind(self, board: BitBoard) -> None:
+        # takes back the moves of the selection, the root position has no moves on the stack
+        while board.n_moves > 0:
+            board.unmake_move()
+
+    def __reuse(self, board: BitBoard):
+        # returns the node of board among the children and grandchildren of the old root, or None
+        if self._root is None or self._root_board is None:
+            return None
+        old = self._root_board
+        if old.row != board.row or old.column != board.column:
+            return None
+
+        key = board.key()
+        if old.key() == key:
+            return self._root
+        for child in self._root.children:
+            old.make_move(child.move[1], child.char)
+            for grandchild in child.children:
+                old.make_move(grandchild.move[1], grandchild.char)
+                found = old.key() == key
+                old.unmake_move()
+                if found:
+                    old.unmake_move()
+                    return grandchild
+            old.unmake_move()
+
+        return None
@@ -0,0 +1,68 @@
+# This file contains the implementation of MoveOrdering class
+
+"""
+Alpha-beta pruning cuts off the most when the best move is searched first. The game can already
+give its moves in a good static order (e.g. center columns first in Connect 4), MoveOrdering adds
+dynamic ordering that learns from the cutoffs of the current search:
+
+killer moves - for every depth (ply) the last 2 moves that caused a cutoff at that depth. A move
+    that refuted one position is likely to refute its siblings too, so they are tried first.
+history heuristic - every move that causes a cutoff gets depth^2 points for the side that played
+    it. Moves with more points are tried earlier. Points are halved at every new search, so old
+    information fades away but is not lost between the moves of a game.
+
+Killers go before other moves, the rest is sorted by history points. Sorting is stable, so moves
+with the same points keep the static order of the game. BoardGameAI puts principal variation and
+transposition table moves in front of what order() returns.
+"""
+
+class MoveOrdering:
+
+    def __init__(self, killers: bool=True, history: bool=True):
+        self.killers = killers
+        self.history = history
+
+        self._killer_moves = []   # ply -> [most recent killer, previous killer]
+        self._history = {}        # (is_max_player, row, col) -> points
+
+    def new_search(self) -> None:
+        self._killer_moves = []
+        for key in self._history:
+            self._history[key] //= 2
+
+    def order(self, all_moves, ply: int, is_max_player: bool):
+        # returns the moves in the order they should be searched
+        if not self.killers and not self.history:
+            return all_moves
+
+        killers = ()
+        if self.killers and ply < len(self._killer_moves):
+            killers = self._killer_moves[ply]
+
+        history = self._history if self.history else None
+
+        def sort_key(move):
+            key = (move[0], move[1])
+            # killers go first, the most recent one before the older one
+            rank = 0
+            if key in killers:
+                rank = 2 if killers[0] == key else 1
+            points = history.get((is_max_player, key[0], key[1]), 0) if history is not None else 0
+            return (rank, points)
+
+        return sorted(all_moves, key=sort_key, reverse=True)
+
+    def cutoff(self, move, ply: int, depth: int, is_max_player: bool) -> None:
+        # called when 'move' caused a beta/alpha cutoff at given ply with given remaining depth
+        move = (move[0], move[1])
+        if self.killers:
+            while len(self._killer_moves) <= ply:
+                self._killer_moves.append([])
+            killers = self._killer_moves[ply]
+            if not killers or killers[0] != move:
+                killers.insert(0, move)
+                del killers[2:]
+
+        if self.history:
+            key = (is_max_player, move[0], move[1])
+            self._history[key] = self._history.get(key, 0) + depth * depth
@@ -0,0 +1,116 @@
+# This file contains the implementation of OpeningBook class
+
+"""
+OpeningBook gives the precomputed move of AI in early positions of the game, so they don't have
+to be searched. At the start the board is almost empty and every column is a legal move, so these
+are the most expensive searches of the game, while the same few positions come back in every game.
+The book is made offline by opening_book_generator.py.
+
+The book file is made of a 12 byte header and sorted fixed size records:
+
+    header: b"C4OB", version, number of rows, number of columns, key bytes, number of records
+    record: key (key bytes, big endian), column of the move (1 byte)
+
+The key of a position is Board.key(), it is exact, there are no collisions. A position and its
+left-right mirror image have the same best move mirrored, so only the one with the smaller key
+(canonical) is stored. position_key() returns the canonical key and whether the board had to be
+mirrored for it (Board.canonical_key()).
+
+The file is memory-mapped and searched with binary search, so opening it is instant and it is not
+read into memory. A book is made for one board size, move() returns None for boards of other sizes
+and for positions that are not in the book, then AI searches as usual.
+
+The moves of a book are as good as a search to the depth it was made with (BOOK_DEPTH by default,
+the file doesn't record it), depth tells ConnectFour which settings play weaker than the book.
+"""
+
+import mmap
+import struct
+
+from board import Board
+
+_HEADER = struct.Struct("<4sBBBBI")
+_MAGIC = b"C4OB"
+_VERSION = 1
+
+# depth of the searches of the books made by opening_book_generator.py by default, like books/6x7.bin
+BOOK_DEPTH = 8
+
+
+def key_bytes(n_row: int, n_column: int) -> int:
+    # number of bytes of a key on the board of given size
+    return (n_column * (n_row + 1) + 7) // 8
+
+
+def position_key(board: Board) -> tuple[int, bool]:
+    # returns (canonical key, True if it is the key of the mirrored board)
+    return board.canonical_key()
+
+
+def write_book(path: str, n_row: int, n_column: int, moves: dict) -> None:
+    # writes the book file, moves is {canonical key: column of the move on the canonical board}
+    n_bytes = key_bytes(n_row, n_column)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, n_row, n_column, n_bytes, len(moves)))
+        for key in sorted(moves):
+            f.write(key.to_bytes(n_bytes, "big") + bytes([moves[key]]))
+
+
+class OpeningBook:
+
+    def __init__(self, path: str, depth: int=BOOK_DEPTH):
+        self.depth = depth   # depth the moves of the book were searched to
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"OpeningBook::{path} is not an opening book")
+        magic, version, self.row, self.column, self._key_bytes, self.size = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"OpeningBook::{path} is not an opening book")
+
+        self._record_bytes = self._key_bytes + 1
+        if len(self._map) != _HEADER.size + self.size * self._record_bytes:
+            raise ValueError(f"OpeningBook::{path} is truncated")
+
+    def move(self, board: Board):
+        # returns the (row, col) move of AI from the book, None if the position is not in the book
+        if board.row != self.row or board.column != self.column:
+            return None
+
+        key, mirrored = position_key(board)
+        col = self.__find(key.to_bytes(self._key_bytes, "big"))
+        if col is None:
+            return None
+
+        if mirrored:
+            col = board.column - 1 - col
+
+        # a book for another game (e.g. corrupted file) must not make an illegal move
+        for row in range(board.row - 1, -1, -1):
+            if board.get(row, col) == Board.empty:
+                return (row, col)
+        return None
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __find(self, key: bytes):
+        # binary search of the key in the sorted records, returns the column or None
+        low = 0
+        high = self.size
+        while low < high:
+            middle = (low + high) // 2
+            offset = _HEADER.size + middle * self._record_bytes
+            record_key = self._map[offset:offset + self._key_bytes]
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                return self._map[offset + self._key_bytes]
+
+        return None
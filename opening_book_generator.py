@@ -0,0 +1,99 @@
+# This file makes opening book files for OpeningBook
+
+"""
+Finds every position of the first plies of the game where AI is to move, both when AI moves first
+and when the player does, searches each of them with the AI and writes the best moves to a book
+file (see opening_book.py). Positions that are the mirror image of each other are searched once.
+Searches are done in a process pool, in the same way as parallel_search.py.
+
+Usage: python3 -m opening_book_generator [-r rows] [-cols columns] [-p plies] [-d depth] [-w workers] [-o file]
+"""
+
+import argparse
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+from bitboard import BitBoard
+from connect_four import ConnectFour
+from opening_book import BOOK_DEPTH, position_key, write_book
+
+# state of a worker process, set by _init_worker()
+_worker_ai_factory = None
+_worker_depth = 0
+
+
+def _init_worker(ai_factory, depth: int) -> None:
+    global _worker_ai_factory, _worker_depth
+    _worker_ai_factory = ai_factory
+    _worker_depth = depth
+
+
+def _search_task(data: bytes) -> int:
+    # returns the column of the best move in the position
+    board = BitBoard.from_bytes(data)
+    ai = _worker_ai_factory(board)
+    return ai.think(board, _worker_depth)[1]
+
+
+def find_positions(n_row: int, n_column: int, plies: int) -> dict:
+    # returns {canonical key: canonical board} of the positions with AI to move and at most plies pieces
+    positions = {}
+
+    def visit(board: BitBoard, char: int, n_pieces: int) -> None:
+        if char == Board.ai:
+            key, _ = position_key(board)
+            if key in positions:
+                return
+            positions[key] = board.to_bytes(canonical=True)
+
+        if n_pieces == plies:
+            return
+
+        other = Board.player if char == Board.ai else Board.ai
+        for row, col in ConnectFour.generate_legal_moves(board):
+            board.set(row, col, char)
+            if ConnectFour.is_endgame(board, row, col) == 0:
+                visit(board, other, n_pieces + 1)
+            board.remove(row, col)
+
+    visit(BitBoard(Board.red, n_row, n_column), Board.ai, 0)
+    visit(BitBoard(Board.red, n_row, n_column), Board.player, 0)
+    return positions
+
+
+def generate(path: str, n_row: int=6, n_column: int=7, plies: int=4, depth: int=BOOK_DEPTH, ai_factory=None,
+             workers: int=None) -> int:
+    # searches the positions and writes the book, returns the number of positions in it
+    if ai_factory is None:
+        ai_factory = functools.partial(ConnectFour.make_ai, evaluator="incremental")
+
+    positions = find_positions(n_row, n_column, plies)
+    keys = list(positions)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(ai_factory, depth)) as pool:
+        columns = pool.map(_search_task, [positions[key] for key in keys], chunksize=8)
+        moves = dict(zip(keys, columns))
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_book(path, n_row, n_column, moves)
+    return len(moves)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--n_rows", type=int, help="number of rows in board", default=6)
+    parser.add_argument("-cols", "--n_columns", type=int, help="number of columns in board", default=7)
+    parser.add_argument("-p", "--plies", type=int, help="positions with at most this many pieces are in the book", default=4)
+    parser.add_argument("-d", "--depth", type=int, help="depth of the search of every position", default=BOOK_DEPTH)
+    parser.add_argument("-w", "--workers", type=int, help="number of processes", default=multiprocessing.cpu_count())
+    parser.add_argument("-o", "--output", type=str, help="book file", default=None)
+    args = parser.parse_args()
+
+    output = args.output or f"books/{args.n_rows}x{args.n_columns}.bin"
+    start = time.perf_counter()
+    n = generate(output, args.n_rows, args.n_columns, args.plies, args.depth, workers=args.workers)
+    print(f"{n} positions written to {output} in {time.perf_counter() - start:.1f} seconds")
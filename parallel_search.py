@@ -0,0 +1,240 @@
+# This file contains the implementation of RootParallelSearch class
+
+"""
+RootParallelSearch does the same search as BoardGameAI.think(), but splits it between processes.
+The moves of AI at the root (and with split_plies=2 also the replies of the player to each of
+them) are searched as separate tasks in a concurrent.futures process pool, and the results are
+combined with minimax in the main process.
+
+Each task is sent as the board in the compact Board.to_bytes() form plus the line of moves leading
+to the position, not as pickled Board/numpy objects. Workers build their AI with
+ai_factory(board), which must be picklable (a module level function or functools.partial of it),
+e.g. functools.partial(ConnectFour.make_ai, evaluator="incremental").
+
+Every worker makes one AI when it starts, and keeps it (with its transposition table and move
+ordering) for all its tasks, in this search and the next ones, like the AI of a game keeps its
+table between moves. The position of a task is loaded into the board of that AI with Board.load(),
+only the columns that changed.
+
+With split_plies=1 the best score found so far is shared between the workers: a task starting
+later searches with alpha just below it, so moves that can't be better are cut off early. Moves
+that are as good as the best one are still searched exactly, so without a transposition table the
+best move doesn't depend on which worker finished first: it is the same move think() would return
+(the last of the best moves in the order of legal moves). With a table, like think() after earlier
+searches, a score can also come from an entry stored by an earlier task of the worker.
+Scores of the moves worse than the best one may be upper bounds instead of exact values.
+
+With a time limit every task gets the deadline of the search, not the time that is left when it is
+submitted, so tasks waiting for a free worker don't make the search take longer.
+
+threat_func must be the one of the AIs (see BoardGameAI): the split moves are only the forced ones
+when it gives forced columns, the same moves BoardGameAI searches at these plies.
+
+The pool is created at the first search and kept until close(), so the processes are not started
+again at every move.
+"""
+
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from board import Board
+from search_stats import SearchStats
+
+# state of a worker process, set by _init_worker()
+_worker_ai_factory = None
+_worker_best = None
+_worker_board_class = Board
+_worker_board = None   # board of the worker's AI, every task loads its position into it
+_worker_ai = None
+
+
+def _init_worker(ai_factory, best, board_class, n_row: int, n_column: int) -> None:
+    global _worker_ai_factory, _worker_best, _worker_board_class, _worker_board, _worker_ai
+    _worker_ai_factory = ai_factory
+    _worker_best = best
+    _worker_board_class = board_class
+    _worker_board = board_class(Board.red, n_row, n_column)
+    _worker_ai = ai_factory(_worker_board)
+
+
+def _search_task(data: bytes, line, max_depth: int, search_id: int, share_alpha: bool, deadline: float):
+    # searches one line in a worker, returns (value, nodes per depth, endgame calls). deadline is a
+    # time.time() time, so tasks waiting for a worker don't get the whole time again
+    # _worker_best is [id of the search, best score], tasks of an older search must not use it
+    global _worker_board, _worker_ai
+    position = _worker_board_class.from_bytes(data)
+    if position.row != _worker_board.row or position.column != _worker_board.column:
+        # a search of another board size, the AI of this one is made again
+        _worker_board = _worker_board_class(Board.red, position.row, position.column)
+        _worker_ai = _worker_ai_factory(_worker_board)
+    board = _worker_board
+    board.load(position)
+    ai = _worker_ai
+
+    alpha = float("-inf")
+    if share_alpha:
+        with _worker_best.get_lock():
+            if _worker_best[0] == search_id:
+                # just below the best score so far, so moves with the same score are searched exactly
+                alpha = math.nextafter(_worker_best[1], float("-inf"))
+
+    time_limit = None if deadline is None else max(deadline - time.time(), 0.0)
+    value = ai.evaluate_line(board, line, max_depth, alpha=alpha, time_limit=time_limit)
+
+    if share_alpha and value is not None:
+        with _worker_best.get_lock():
+            if _worker_best[0] == search_id and value > _worker_best[1]:
+                _worker_best[1] = value
+
+    return value, ai.last_stats.nodes, ai.last_stats.endgame_calls
+
+
+class RootParallelSearch:
+
+    def __init__(self, ai_factory, legal_moves_func, endgame_func, workers: int=None, split_plies: int=1,
+                 board_class=Board, root_moves_func=None, threat_func=None):
+        if split_plies not in (1, 2):
+            raise ValueError("RootParallelSearch::split_plies must be 1 or 2")
+
+        self.ai_factory = ai_factory
+        self.legal_moves_func = legal_moves_func
+        self.root_moves_func = root_moves_func if root_moves_func is not None else legal_moves_func
+        self.endgame_func = endgame_func
+        self.threat_func = threat_func   # the one of the AIs, see BoardGameAI
+        self.workers = workers if workers is not None else multiprocessing.cpu_count()
+        self.split_plies = split_plies
+        self.board_class = board_class   # Board or BitBoard, the workers rebuild the board with it
+
+        self.completed_depth = -1
+        self.last_stats = None
+        self.move_scores = []     # [(row, col), value] of root moves in the last search
+
+        self._pool = None
+        self._best = None
+        self._search_id = 0
+
+    def think(self, board: Board, max_depth: int=3, time_limit: float=None) -> tuple[int, int]:
+        # same as BoardGameAI.think(), with time_limit the depth is increased until time is over
+        start = time.perf_counter()
+        self.last_stats = SearchStats()
+        self.last_stats.nodes[0] = 1
+
+        if time_limit is None:
+            best_move = self.__search(board, max_depth, None)
+            self.completed_depth = max_depth
+        else:
+            # time.time(), the clock the workers compare it with
+            deadline = time.time() + time_limit
+            best_move = self.__search(board, 0, None)
+            self.completed_depth = 0
+            for depth in range(1, max_depth + 1):
+                if max(value for _, value in self.move_scores) == float("inf"):
+                    break
+                if time.time() >= deadline:
+                    break
+
+                move_scores = self.move_scores
+                move = self.__search(board, depth, deadline)
+                if move is None:
+                    self.move_scores = move_scores
+                    break
+                best_move = move
+                self.completed_depth = depth
+
+        self.last_stats.elapsed = time.perf_counter() - start
+        self.last_stats.completed_depth = self.completed_depth
+        return best_move
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __search(self, board: Board, max_depth: int, deadline: float):
+        # one fixed depth search, returns the best move or None if time was over at deadline
+        if self._pool is None:
+            self._best = multiprocessing.Array("d", 2)
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.ai_factory, self._best, self.board_class,
+                                                       board.row, board.column))
+
+        # lines of moves to search, they can be shorter than split_plies if the game ends
+        split = min(self.split_plies, max_depth + 1)
+        tree = []  # [(move, [reply, ...] or None)]
+        lines = []
+        for move in self.__forced(board, self.root_moves_func(board), Board.ai):
+            move = (move[0], move[1])
+            replies = None
+            board.make_move(move[1], Board.ai)
+            if split > 1:
+                self.last_stats.endgame_calls += 1
+                if self.endgame_func(board, move[0], move[1]) == 0:
+                    # leaving out replies as good as other replies doesn't change their minimum
+                    replies = [(reply[0], reply[1])
+                               for reply in self.__forced(board, self.root_moves_func(board), Board.player)]
+            board.unmake_move()
+
+            tree.append((move, replies))
+            if replies is None:
+                lines.append((move,))
+            else:
+                lines.extend((move, reply) for reply in replies)
+                # position after the move is not searched by any task
+                self.last_stats.grow(1)
+                self.last_stats.nodes[1] += 1
+
+        data = board.to_bytes()
+        share_alpha = split == 1
+        self._search_id += 1
+        with self._best.get_lock():
+            self._best[0] = self._search_id
+            self._best[1] = float("-inf")
+        futures = {self._pool.submit(_search_task, data, line, max_depth, self._search_id, share_alpha,
+                                     deadline): line
+                   for line in lines}
+
+        values = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                value, nodes, endgame_calls = future.result()
+                if value is None:
+                    for f in pending:
+                        f.cancel()
+                    return None
+
+                values[futures[future]] = value
+                self.last_stats.endgame_calls += endgame_calls
+                # nodes[0] of a task is the root, which is counted only once
+                self.last_stats.grow(len(nodes))
+                for d in range(1, len(nodes)):
+                    self.last_stats.nodes[d] += nodes[d]
+
+        # minimax over the split part of the tree, same tie breaking as BoardGameAI.think()
+        best_move = None
+        best_value = float("-inf")
+        self.move_scores = []
+        for move, replies in tree:
+            if replies is None:
+                value = values[(move,)]
+            else:
+                value = min((values[(move, reply)] for reply in replies), default=0)
+
+            if best_move is None or value >= best_value:
+                best_value = value
+                best_move = move
+            self.move_scores.append([move, value])
+
+        return best_move
+
+    def __forced(self, board: Board, all_moves, char: int):
+        # only the forced moves of char, like BoardGameAI does at the root. A move is returned even
+        # when all of them lose
+        if self.threat_func is not None:
+            _, forced_columns = self.threat_func(board, char)
+            if forced_columns is not None:
+                all_moves = [move for move in all_moves if move[1] in forced_columns]
+        return all_moves
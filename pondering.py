@@ -0,0 +1,188 @@
+# This file contains the implementation of Ponderer class
+
+"""
+Ponderer searches the next AI move while the player is still thinking about theirs ("pondering").
+After AI moves, start() sends one task per possible player move to a process pool: the position
+after that player move is searched as the AI would search it at its next turn. The most likely
+replies go first (e.g. the reply AI expected in its principal variation), so with fewer workers
+than columns the likely ones are searched before the others.
+
+When the player has moved, keep() keeps the task of the move that was played and stops all the
+others at once, so the kept one gets all the workers. result() returns its move (it calls keep()
+if it wasn't called). If the task is finished its move is returned at once, otherwise result()
+waits for it, it has had all the player's thinking time as head start. With time_limit the kept
+task is stopped time_limit seconds after result() is called and the move of its deepest completed
+iteration is returned, so it searches deeper than a search started only after the player's move.
+
+Tasks are searched with BoardGameAI.think() with iterative deepening (up to max_depth) and stopped
+through its should_stop hook, reading a small shared array: [id of the pondering, column that is
+kept (-1 until the player moves), time to stop at (0 for no limit)]. A task stops when it doesn't
+belong to the current pondering, when another column is kept, or when the time is over.
+
+Positions are sent as Board.to_bytes(). Every worker builds one AI with ai_factory(board) and keeps
+it, with its transposition table, for all its tasks, like in parallel_search.py. last_stats, completed_depth and principal_variation are the ones of the
+kept task.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+
+# state of a worker process, set by _init_worker()
+_worker_ai_factory = None
+_worker_state = None
+_worker_board_class = Board
+_worker_board = None   # board of the worker's AI, made at the first task, every task loads its position
+_worker_ai = None
+
+
+def _init_worker(ai_factory, state, board_class) -> None:
+    global _worker_ai_factory, _worker_state, _worker_board_class
+    _worker_ai_factory = ai_factory
+    _worker_state = state
+    _worker_board_class = board_class
+
+
+def _should_stop(ponder_id: int, col: int) -> bool:
+    ponder, kept, stop_at = _worker_state[:]
+    if ponder != ponder_id or (kept >= 0 and kept != col):
+        return True
+    return stop_at > 0 and time.time() >= stop_at
+
+
+def _ponder_task(data: bytes, col: int, max_depth: int, ponder_id: int):
+    # searches the AI move after the player's move to col, returns (move, completed depth, stats, PV)
+    global _worker_board, _worker_ai
+    position = _worker_board_class.from_bytes(data)
+    if _worker_board is None or position.row != _worker_board.row or position.column != _worker_board.column:
+        # the first task or a board of another size, the AI of this one is made again
+        _worker_board = _worker_board_class(Board.red, position.row, position.column)
+        _worker_ai = _worker_ai_factory(_worker_board)
+    board = _worker_board
+    board.load(position)
+
+    board.make_move(col, Board.player)
+    try:
+        if board.winner != Board.empty or board.is_full():
+            return None
+        ai = _worker_ai
+        ai.should_stop = lambda: _should_stop(ponder_id, col)
+        move = ai.think(board, max_depth, time_limit=Ponderer.NO_TIME_LIMIT)
+        return move, ai.completed_depth, ai.last_stats, ai.principal_variation
+    finally:
+        board.unmake_move()
+
+
+class Ponderer:
+
+    # time limit of the tasks, they are stopped through the shared array
+    NO_TIME_LIMIT = 365 * 24 * 3600.0
+
+    def __init__(self, ai_factory, workers: int=1, board_class=Board):
+        self.ai_factory = ai_factory
+        self.workers = workers
+        self.board_class = board_class   # Board or BitBoard, the workers rebuild the board with it
+
+        self.completed_depth = -1
+        self.last_stats = None
+        self.principal_variation = []
+
+        self._pool = None
+        self._state = None
+        self._ponder_id = 0
+        self._tasks = {}     # key of the position after the player's move -> (column, future)
+        self._kept = None    # (key, column, future) of the task kept by keep()
+
+    @property
+    def active(self) -> bool:
+        return len(self._tasks) > 0 or self._kept is not None
+
+    def start(self, board: Board, max_depth: int, order: list[int]=None) -> None:
+        # starts searching the AI replies to every player move on board, in the order of columns
+        self.stop()
+        if self._pool is None:
+            self._state = multiprocessing.Array("d", 3)
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.ai_factory, self._state, self.board_class))
+
+        self._ponder_id += 1
+        with self._state.get_lock():
+            self._state[0] = self._ponder_id
+            self._state[1] = -1
+            self._state[2] = 0
+
+        if order is None:
+            order = range(0, board.column)
+        work = self.board_class.from_bytes(board.to_bytes())
+        data = work.to_bytes()
+        for col in order:
+            if work.heights[col] == work.row:
+                continue
+            work.make_move(col, Board.player)
+            key = work.key()
+            work.unmake_move()
+            self._tasks[key] = (col, self._pool.submit(_ponder_task, data, col, max_depth, self._ponder_id))
+
+    def keep(self, board: Board) -> bool:
+        # keeps the task of board (after the player's move) and stops the others, False if it
+        # wasn't pondered (then all the tasks are stopped)
+        key = board.key()
+        if self._kept is not None:
+            return self._kept[0] == key
+
+        task = self._tasks.get(key)
+        if task is None:
+            self.stop()
+            return False
+
+        col, future = task
+        with self._state.get_lock():
+            self._state[1] = col
+        for other, other_future in self._tasks.values():
+            if other != col:
+                other_future.cancel()
+        self._tasks = {}
+        self._kept = (key, col, future)
+        return True
+
+    def result(self, board: Board, time_limit: float=None):
+        # returns the pondered AI move for board (after the player's move), None if it wasn't pondered
+        if not self.keep(board):
+            self.stop()
+            return None
+
+        _, _, future = self._kept
+        self._kept = None
+        if time_limit is not None:
+            with self._state.get_lock():
+                self._state[2] = time.time() + time_limit
+
+        # a task that was cancelled before it started, or failed, is searched again by the caller
+        try:
+            pondered = future.result()
+        except Exception:
+            return None
+        if pondered is None:
+            return None
+
+        # without time_limit the kept task is never stopped, it searched to max_depth (or found a win)
+        move, self.completed_depth, self.last_stats, self.principal_variation = pondered
+        return move
+
+    def stop(self) -> None:
+        # stops all the tasks of the current pondering
+        if self._tasks or self._kept is not None:
+            with self._state.get_lock():
+                self._state[0] = -1
+            for _, future in self._tasks.values():
+                future.cancel()
+            self._tasks = {}
+            self._kept = None
+
+    def close(self) -> None:
+        self.stop()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
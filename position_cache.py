@@ -0,0 +1,123 @@
+# This file contains the implementation of PositionCache class
+
+"""
+PositionCache remembers the moves AI chose in positions it searched, so the same position is not
+searched again in later games. The transposition table belongs to one AI and keeps every node of
+its searches, the cache keeps only the moves AI played, can be shared by many games (e.g. of a
+GameServer) and can be saved to a file and loaded in the next session.
+
+Positions are identified by Board.canonical_key(), so a position and its mirror image share one
+entry. Every entry is (depth, column): the depth the position was searched to and the best column
+on the canonical board, mirrored back for the mirrored board.
+
+get(board, depth) returns the move only if the position was searched at least to depth, a deeper
+search is at least as good. Exact results (e.g. of the solver) are put with the number of empty
+cells as depth, so they are used at any depth.
+
+The cache holds at most max_entries positions. When it is full the least recently used one is
+dropped (LRU), get() and put() both count as use.
+
+File format: 9 byte header (b"C4PC", version, number of entries) followed by variable size records
+(number of rows, number of columns, number of key bytes, key (big endian), depth, column), oldest
+first, so load() restores the order of use too.
+"""
+
+import struct
+from collections import OrderedDict
+
+from board import Board
+
+_HEADER = struct.Struct("<4sBI")
+_RECORD = struct.Struct("<BBB")
+_VALUE = struct.Struct("<HB")
+_MAGIC = b"C4PC"
+_VERSION = 1
+
+
+class PositionCache:
+
+    def __init__(self, max_entries: int=100000):
+        if max_entries <= 0:
+            raise ValueError("PositionCache::max_entries must be positive")
+
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # (row, column, canonical key) -> (depth, column)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, board: Board, depth: int):
+        # returns the (row, col) move for the board if it was searched at least to depth, else None
+        key, mirrored = board.canonical_key()
+        entry = self._entries.get((board.row, board.column, key))
+        if entry is None or entry[0] < depth:
+            self.misses += 1
+            return None
+
+        col = board.column - 1 - entry[1] if mirrored else entry[1]
+        # a stale or corrupted file must not make an illegal move
+        if not 0 <= col < board.column or board.gravity(col) == -1:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end((board.row, board.column, key))
+        self.hits += 1
+        return board.gravity(col), col
+
+    def put(self, board: Board, depth: int, move) -> None:
+        # remembers the move of the board searched to depth, keeps the deeper one of two results
+        key, mirrored = board.canonical_key()
+        entry_key = (board.row, board.column, key)
+        old = self._entries.get(entry_key)
+        if old is not None and old[0] > depth:
+            self._entries.move_to_end(entry_key)
+            return
+
+        col = board.column - 1 - move[1] if mirrored else move[1]
+        self._entries[entry_key] = (depth, col)
+        self._entries.move_to_end(entry_key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(self._entries)))
+            for (row, column, key), (depth, col) in self._entries.items():
+                n_bytes = (column * (row + 1) + 7) // 8
+                f.write(_RECORD.pack(row, column, n_bytes) + key.to_bytes(n_bytes, "big")
+                        + _VALUE.pack(depth, col))
+
+    def load(self, path: str) -> None:
+        # adds the entries of the file, as the most recently used ones
+        with open(path, "rb") as f:
+            data = f.read()
+
+        if len(data) < _HEADER.size:
+            raise ValueError(f"PositionCache::{path} is not a position cache")
+        magic, version, size = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"PositionCache::{path} is not a position cache")
+
+        offset = _HEADER.size
+        for _ in range(0, size):
+            if offset + _RECORD.size > len(data):
+                raise ValueError(f"PositionCache::{path} is truncated")
+            row, column, n_bytes = _RECORD.unpack_from(data, offset)
+            offset += _RECORD.size
+            if offset + n_bytes + _VALUE.size > len(data):
+                raise ValueError(f"PositionCache::{path} is truncated")
+            key = int.from_bytes(data[offset:offset + n_bytes], "big")
+            depth, col = _VALUE.unpack_from(data, offset + n_bytes)
+            offset += n_bytes + _VALUE.size
+
+            self._entries[(row, column, key)] = (depth, col)
+            self._entries.move_to_end((row, column, key))
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
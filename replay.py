@@ -0,0 +1,284 @@
+# This file replays archived games, for checking game logs and labeling their positions
+
+"""
+Reads game logs, replays every game on a board and checks it: every move must be in a column of
+the board that is not full and must not come after the end of the game, and the result must be the
+one the log says. Optionally every position is scored with an evaluator (see
+ConnectFour.make_evaluator()), from the point of view of the side that moved first.
+
+Logs have one game per line:
+
+- .jsonl records of self_play.py, or any JSON object with "moves" (list of columns) and optionally
+  "rows", "columns", "winner" and "first_mover" (self_play's winner is a side, first_mover tells
+  which side moved first),
+- .csv files of self_play.py (header line, moves space separated),
+- any other file: plain move sequences, columns separated by spaces or commas ("3 3 4 2"), or one
+  digit per column without separators ("3342"). The board size is the one given to run().
+
+Boards are between 4x4 and 30x30 like in the game, games of other sizes are invalid.
+
+Results are "first" (the side that moved first won), "second", "draw", or None for a game that
+didn't end.
+
+Files are memory-mapped and read line by line, a game is parsed only when it is replayed. Games
+are replayed on one board per board size that is reused for every game: moves are made with
+make_move() and taken back with unmake_move() at the end, no board is created or copied per game
+or per position. The incremental evaluator is attached to that board, so scoring a position costs
+almost nothing.
+
+With workers > 1 the file is split into chunks of about chunk_bytes (at line ends), and the chunks
+are replayed in a process pool, at most 2 * workers chunks at a time; every worker maps the file
+and reads its own chunk, only the results are sent back. Results of the chunks are written to
+output in the order of the file as they come, so memory use doesn't depend on the size of the
+archive.
+
+output (.jsonl) gets one record per game: game index (line of the game, not counting the csv
+header), number of moves, result, error (None for valid games) and with an evaluator the score of
+the position after every move. At the end the totals are returned (and printed with -m replay).
+
+Usage: python3 -m replay file [-w workers] [-r rows] [-cols columns] [-e full|incremental|numpy]
+                              [-o output.jsonl] [-cb chunk bytes]
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+from bitboard import BitBoard
+from connect_four import ConnectFour
+
+# boards of this process by (rows, columns, evaluator): (board, evaluation function or None)
+_boards = {}
+
+
+def read_games(path: str, n_row: int=6, n_column: int=7, start: int=0, end: int=None, fieldnames=None):
+    # yields (rows, columns, moves, result of the log or None) of every game between the byte
+    # offsets start and end (start must be at the beginning of a line). moves is None when the
+    # line can't be read. fieldnames are the columns of a csv file, read from its header if not given
+    if os.path.getsize(path) == 0:
+        return
+    is_csv = path.endswith(".csv")
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = len(mm) if end is None else end
+        mm.seek(start)
+        if is_csv and fieldnames is None:
+            fieldnames = next(csv.reader([mm.readline().decode()]))
+
+        while mm.tell() < end:
+            line = mm.readline()
+            if not line.strip():
+                continue
+            try:
+                line = line.decode().strip()
+                if is_csv:
+                    yield _parse_record(dict(zip(fieldnames, next(csv.reader([line])))), n_row, n_column)
+                elif line.startswith("{"):
+                    yield _parse_record(json.loads(line), n_row, n_column)
+                else:
+                    yield n_row, n_column, _parse_moves(line), None
+            except (ValueError, KeyError, TypeError, OverflowError):
+                yield n_row, n_column, None, None
+
+
+def _parse_record(record: dict, n_row: int, n_column: int):
+    # game of a self_play record (or a JSON object like it)
+    moves = record["moves"]
+    moves = _parse_moves(moves) if isinstance(moves, str) else [int(col) for col in moves]
+
+    result = record.get("winner")
+    first_mover = record.get("first_mover")
+    if result not in (None, "draw") and first_mover is not None:
+        result = "first" if result == first_mover else "second"
+
+    return int(record.get("rows", n_row)), int(record.get("columns", n_column)), moves, result
+
+
+def _parse_moves(line: str) -> list[int]:
+    line = line.replace(",", " ")
+    if " " in line.strip() or not line.isdigit():
+        return [int(col) for col in line.split()]
+    # one digit per column
+    return [int(col) for col in line]
+
+
+def replay_game(board: Board, moves: list[int], evaluate=None):
+    # plays the moves on the empty board and takes them back at the end, returns (result, error,
+    # scores after every move or None without evaluate). The first move is Board.ai's
+    scores = [] if evaluate is not None else None
+    result = None
+    error = None
+    char = Board.ai
+    try:
+        for i, col in enumerate(moves):
+            if result is not None:
+                error = f"move {i} is after the end of the game"
+                break
+            if col < 0 or col >= board.column:
+                error = f"move {i}: column {col} is out of range"
+                break
+            if board.heights[col] == board.row:
+                error = f"move {i}: column {col} is full"
+                break
+
+            board.make_move(col, char)
+            if scores is not None:
+                scores.append(evaluate(board))
+            if board.winner != Board.empty:
+                result = "first" if char == Board.ai else "second"
+            elif board.is_full():
+                result = "draw"
+            char = Board.player if char == Board.ai else Board.ai
+    finally:
+        while board.n_moves > 0:
+            board.unmake_move()
+
+    return result, error, scores
+
+
+def _replay_chunk(path: str, start: int, end: int, config: dict) -> list:
+    # replays the games of the chunk, returns [(number of moves, result, error, scores)]
+    results = []
+    for n_row, n_column, moves, expected in read_games(path, config["n_row"], config["n_column"], start, end,
+                                                       config["fieldnames"]):
+        if moves is None:
+            results.append((0, None, "unreadable record", None))
+            continue
+        # same limits as the game, a board is kept for every size
+        if not 4 <= n_row <= 30 or not 4 <= n_column <= 30:
+            results.append((0, None, f"board size {n_row}x{n_column} is not supported", None))
+            continue
+
+        board, evaluate = _board(n_row, n_column, config["evaluator"])
+        result, error, scores = replay_game(board, moves, evaluate)
+        if error is None and expected is not None and expected != result:
+            error = f"result is {result}, the log says {expected}"
+        results.append((len(moves), result, error, scores))
+
+    return results
+
+
+def _board(n_row: int, n_column: int, evaluator: str):
+    # board of the size for this process, created at its first game
+    key = (n_row, n_column, evaluator)
+    if key not in _boards:
+        board = BitBoard(Board.red, n_row, n_column)
+        _boards[key] = (board, ConnectFour.make_evaluator(board, evaluator) if evaluator is not None else None)
+    return _boards[key]
+
+
+def _chunks(path: str, chunk_bytes: int):
+    # (start, end) byte offsets of the chunks of the file, ending at line ends, and the csv header
+    size = os.path.getsize(path)
+    if size == 0:
+        return [], None
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        fieldnames = None
+        if path.endswith(".csv"):
+            fieldnames = next(csv.reader([mm.readline().decode()]))
+            start = mm.tell()
+
+        chunks = []
+        while start < size:
+            end = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+            end = size if end == -1 else end + 1
+            chunks.append((start, end))
+            start = end
+
+    return chunks, fieldnames
+
+
+def run(path: str, workers: int=None, output: str=None, n_row: int=6, n_column: int=7,
+        evaluator: str=None, chunk_bytes: int=1 << 20) -> dict:
+    # replays the games of the file, writes the records to output (if given) and returns the totals
+    if evaluator not in (None, "full", "incremental", "numpy"):
+        raise ValueError(f"replay::{evaluator} evaluator is not supported")
+    if output is not None and not output.endswith(".jsonl"):
+        raise ValueError("replay::output must end with .jsonl")
+    if chunk_bytes <= 0:
+        raise ValueError("replay::chunk_bytes must be positive")
+    if not 4 <= n_row <= 30 or not 4 <= n_column <= 30:
+        raise ValueError("replay::rows and columns must be between [4-30]")
+
+    workers = workers if workers is not None else multiprocessing.cpu_count()
+    chunks, fieldnames = _chunks(path, chunk_bytes)
+    config = {"n_row": n_row, "n_column": n_column, "evaluator": evaluator, "fieldnames": fieldnames}
+
+    totals = {"games": 0, "valid": 0, "invalid": 0, "positions": 0, "first": 0, "second": 0, "draw": 0,
+              "unfinished": 0, "errors": []}
+    f = open(output, "w") if output is not None else None
+    start = time.perf_counter()
+    try:
+        for results in _results(path, chunks, config, workers):
+            for n_moves, result, error, scores in results:
+                if f is not None:
+                    record = {"game": totals["games"], "n_moves": n_moves, "result": result, "error": error}
+                    if scores is not None:
+                        record["scores"] = scores
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+                totals["games"] += 1
+                if error is not None:
+                    totals["invalid"] += 1
+                    # only the first ones, the others are in output
+                    if len(totals["errors"]) < 10:
+                        totals["errors"].append((totals["games"] - 1, error))
+                    continue
+                totals["valid"] += 1
+                totals["positions"] += n_moves
+                totals[result if result is not None else "unfinished"] += 1
+    finally:
+        if f is not None:
+            f.close()
+
+    totals["seconds"] = time.perf_counter() - start
+    totals["games_per_second"] = totals["games"] / totals["seconds"] if totals["seconds"] > 0 else 0.0
+    totals["positions_per_second"] = totals["positions"] / totals["seconds"] if totals["seconds"] > 0 else 0.0
+    return totals
+
+
+def _results(path: str, chunks, config: dict, workers: int):
+    # yields the results of the chunks in the order of the file
+    if workers <= 1 or len(chunks) <= 1:
+        for start, end in chunks:
+            yield _replay_chunk(path, start, end, config)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for start, end in chunks:
+            pending.append(pool.submit(_replay_chunk, path, start, end, config))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=str, help="game log: .jsonl or .csv of self_play, or move sequences")
+    parser.add_argument("-w", "--workers", type=int, help="number of processes", default=multiprocessing.cpu_count())
+    parser.add_argument("-r", "--n_rows", type=int, help="number of rows of games without board size", default=6)
+    parser.add_argument("-cols", "--n_columns", type=int, help="number of columns of games without board size", default=7)
+    parser.add_argument("-e", "--evaluator", type=str, help="score every position: full, incremental or numpy", default=None)
+    parser.add_argument("-o", "--output", type=str, help="file to write the result of every game to, ending with .jsonl", default=None)
+    parser.add_argument("-cb", "--chunk_bytes", type=int, help="bytes of the log replayed by one task", default=1 << 20)
+    args = parser.parse_args()
+
+    totals = run(args.path, args.workers, args.output, args.n_rows, args.n_columns, args.evaluator,
+                 args.chunk_bytes)
+
+    print(f"games: {totals['games']} (valid {totals['valid']}, invalid {totals['invalid']})")
+    print(f"first won {totals['first']}, second won {totals['second']}, draw {totals['draw']}, "
+          f"unfinished {totals['unfinished']}")
+    for game, error in totals["errors"]:
+        print(f"game {game}: {error}")
+    print(f"positions: {totals['positions']}, time: {totals['seconds']:.2f} s")
+    print(f"{totals['games_per_second']:.1f} games/s, {totals['positions_per_second']:.1f} positions/s")
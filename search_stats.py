@@ -0,0 +1,158 @@
+# This file contains SearchStats and GameStats classes
+
+"""
+SearchStats describes one call of BoardGameAI.think(): how many nodes were visited and how many
+alpha-beta cutoffs happened at each depth (depth 1 is the first reply of the opponent), how many
+times the evaluation and endgame functions were called, transposition table hits, how many nodes
+threat analysis decided or narrowed down (see threat_analysis.py), how many times Principal
+Variation Search had to search a move or the root again with a wider window, and how long the
+search took. BoardGameAI keeps the stats of its last search in last_stats.
+
+Times spent in the evaluation and endgame functions are measured only when the AI is created with
+profile=True, because timing every call slows down the search noticeably. Call counts are always
+collected.
+
+GameStats aggregates SearchStats of all the AI moves of a game. It can be exported as Prometheus
+text format with to_prometheus() / write_prometheus(), e.g. for node_exporter's textfile collector.
+Counters are named with the _total suffix (e.g. connect4_ai_nodes_total,
+connect4_ai_eval_time_seconds_total), gauges without it.
+"""
+
+import os
+
+class SearchStats:
+
+    def __init__(self):
+        self.nodes = [0]         # nodes[d] is the number of nodes visited at depth d
+        self.cutoffs = [0]       # cutoffs[d] is the number of alpha-beta cutoffs at depth d
+        self.eval_calls = 0
+        self.eval_time = 0.0
+        self.endgame_calls = 0
+        self.endgame_time = 0.0
+        self.tt_probes = None    # None when there is no transposition table
+        self.tt_hits = None
+        self.forced = 0          # nodes decided or narrowed down by threat analysis
+        self.researches = 0      # re-searches of PVS scouts and aspiration windows that failed
+        self.completed_depth = -1
+        self.elapsed = 0.0
+
+    def grow(self, max_depth: int) -> None:
+        # makes room for depths up to max_depth + 1, lists are extended in place
+        missing = max_depth + 2 - len(self.nodes)
+        if missing > 0:
+            self.nodes.extend([0] * missing)
+            self.cutoffs.extend([0] * missing)
+
+    @property
+    def total_nodes(self) -> int:
+        return sum(self.nodes)
+
+    @property
+    def total_cutoffs(self) -> int:
+        return sum(self.cutoffs)
+
+    @property
+    def max_depth_reached(self) -> int:
+        for d in range(len(self.nodes) - 1, -1, -1):
+            if self.nodes[d] > 0:
+                return d
+        return 0
+
+    @property
+    def effective_branching_factor(self) -> float:
+        # b such that b^depth = number of nodes
+        depth = self.max_depth_reached
+        if depth == 0:
+            return 0.0
+        return self.total_nodes ** (1.0 / depth)
+
+    @property
+    def nodes_per_second(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.total_nodes / self.elapsed
+
+    def to_dict(self) -> dict:
+        return {
+            "nodes": self.total_nodes,
+            "nodes_per_depth": list(self.nodes),
+            "cutoffs_per_depth": list(self.cutoffs),
+            "effective_branching_factor": self.effective_branching_factor,
+            "eval_calls": self.eval_calls,
+            "eval_time": self.eval_time,
+            "endgame_calls": self.endgame_calls,
+            "endgame_time": self.endgame_time,
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "forced": self.forced,
+            "researches": self.researches,
+            "completed_depth": self.completed_depth,
+            "elapsed": self.elapsed,
+            "nodes_per_second": self.nodes_per_second,
+        }
+
+
+class GameStats:
+
+    def __init__(self):
+        self.searches = []
+
+    def add(self, stats: SearchStats) -> None:
+        self.searches.append(stats)
+
+    @property
+    def total_nodes(self) -> int:
+        return sum(s.total_nodes for s in self.searches)
+
+    @property
+    def total_time(self) -> float:
+        return sum(s.elapsed for s in self.searches)
+
+    def totals(self) -> dict:
+        tt_probes = [s.tt_probes for s in self.searches if s.tt_probes is not None]
+        tt_hits = [s.tt_hits for s in self.searches if s.tt_hits is not None]
+        total_time = self.total_time
+        return {
+            "searches": len(self.searches),
+            "nodes": self.total_nodes,
+            "cutoffs": sum(s.total_cutoffs for s in self.searches),
+            "eval_calls": sum(s.eval_calls for s in self.searches),
+            "eval_time": sum(s.eval_time for s in self.searches),
+            "endgame_calls": sum(s.endgame_calls for s in self.searches),
+            "endgame_time": sum(s.endgame_time for s in self.searches),
+            "tt_probes": sum(tt_probes) if tt_probes else None,
+            "tt_hits": sum(tt_hits) if tt_hits else None,
+            "forced": sum(s.forced for s in self.searches),
+            "researches": sum(s.researches for s in self.searches),
+            "time": total_time,
+            "nodes_per_second": self.total_nodes / total_time if total_time > 0 else 0.0,
+            "max_time": max((s.elapsed for s in self.searches), default=0.0),
+        }
+
+    def to_prometheus(self, prefix: str="connect4_ai") -> str:
+        # totals of the game in Prometheus text exposition format
+        lines = []
+        kinds = {"searches": "counter", "nodes": "counter", "cutoffs": "counter",
+                 "eval_calls": "counter", "eval_time": "counter", "endgame_calls": "counter",
+                 "endgame_time": "counter", "tt_probes": "counter", "tt_hits": "counter",
+                 "forced": "counter", "researches": "counter", "time": "counter",
+                 "nodes_per_second": "gauge", "max_time": "gauge"}
+        for name, value in self.totals().items():
+            if value is None:
+                continue
+            metric = f"{prefix}_{name}"
+            if name.endswith("time"):
+                metric += "_seconds"
+            if kinds[name] == "counter":
+                metric += "_total"
+            lines.append(f"# TYPE {metric} {kinds[name]}")
+            lines.append(f"{metric} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str="connect4_ai") -> None:
+        # written to a temporary file and renamed, so readers never see a half written file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(tmp_path, path)
@@ -0,0 +1,176 @@
+# This file contains the trace sinks of BoardGameAI
+
+"""
+BoardGameAI does not print anything while searching. Instead it reports what happens to a trace
+sink given with trace=..., and when no sink is given (the default) tracing costs nothing but one
+'is None' check per searched move.
+
+Sinks receive the following events:
+    node(depth, row, col, alpha, beta, value, pruned) - a move at given depth (1 is the first
+        reply of the opponent) was searched, value is the minimax value of the node so far and
+        pruned is the number of sibling moves cut off by alpha-beta after it (0 if none)
+    root(index, row, col, value) - one of AI's moves at the root was searched
+    iteration(depth, row, col, completed) - one iteration of iterative deepening ended
+    summary(move_scores) - search finished, move_scores is a list of [(row, col), value]
+
+Available sinks:
+    TraceSink    - base class, ignores every event
+    PrintTrace   - human readable output to the terminal (what the search used to print)
+    CounterTrace - only counts nodes, cutoffs and pruned branches per depth
+    JsonlTrace   - one compact JSON object per event in a file
+    BinaryTrace  - fixed size binary records in a file, see BinaryTrace.RECORD for the layout
+
+make_trace() creates a sink from a short text specification (used by main.py).
+"""
+
+import json
+import math
+import struct
+
+class TraceSink:
+
+    def node(self, depth: int, row: int, col: int, alpha, beta, value, pruned: int) -> None:
+        pass
+
+    def root(self, index: int, row: int, col: int, value) -> None:
+        pass
+
+    def iteration(self, depth: int, row: int, col: int, completed: bool) -> None:
+        pass
+
+    def summary(self, move_scores) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class PrintTrace(TraceSink):
+
+    def node(self, depth, row, col, alpha, beta, value, pruned):
+        print(f"Depth {depth}, Move: ({row}, {col}), Minimax value: {PrintTrace.__val(value)}")
+        print(f"beta is {beta}, alpha is {alpha}")
+        if pruned:
+            print(f"Depth {depth}, {pruned} branches pruned.")
+
+    def root(self, index, row, col, value):
+        print(f"{index + 1}'th move is ({row}, {col}),  minimax value: {value}")
+
+    def iteration(self, depth, row, col, completed):
+        if completed:
+            print(f"Depth {depth} completed, best move: ({row}, {col})")
+        else:
+            print(f"Time is up, depth {depth} was not completed")
+
+    def summary(self, move_scores):
+        print()
+        print("High Level summary of moves:")
+        for i in range(0, len(move_scores)):
+            print(f"{i + 1}'th move is {move_scores[i][0]}, its score is {PrintTrace.__val(move_scores[i][1])}")
+
+    @staticmethod
+    def __val(val) -> str:
+        # print infinity values in a nice format
+        if val == float("inf"):
+            return "+inf"
+        if val == float("-inf"):
+            return "-inf"
+        return f"{val}"
+
+
+class CounterTrace(TraceSink):
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.nodes = {}      # depth -> number of searched moves
+        self.cutoffs = {}    # depth -> number of alpha-beta cutoffs
+        self.pruned = {}     # depth -> number of moves skipped thanks to cutoffs
+        self.root_moves = 0
+
+    def node(self, depth, row, col, alpha, beta, value, pruned):
+        self.nodes[depth] = self.nodes.get(depth, 0) + 1
+        if pruned:
+            self.cutoffs[depth] = self.cutoffs.get(depth, 0) + 1
+            self.pruned[depth] = self.pruned.get(depth, 0) + pruned
+
+    def root(self, index, row, col, value):
+        self.root_moves += 1
+
+    def total_nodes(self) -> int:
+        return sum(self.nodes.values()) + self.root_moves
+
+
+class JsonlTrace(TraceSink):
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", buffering=1 << 20)
+
+    def node(self, depth, row, col, alpha, beta, value, pruned):
+        self.__write({"e": "n", "d": depth, "m": [row, col], "a": alpha, "b": beta, "v": value, "p": pruned})
+
+    def root(self, index, row, col, value):
+        self.__write({"e": "r", "i": index, "m": [row, col], "v": value})
+
+    def iteration(self, depth, row, col, completed):
+        self.__write({"e": "i", "d": depth, "m": [row, col], "c": completed})
+
+    def summary(self, move_scores):
+        self.__write({"e": "s", "s": [[list(move), value] for move, value in move_scores]})
+
+    def close(self):
+        self._file.close()
+
+    def __write(self, event) -> None:
+        # infinities are written as Infinity/-Infinity, which python's json reads back
+        self._file.write(json.dumps(event, separators=(",", ":")))
+        self._file.write("\n")
+
+
+class BinaryTrace(TraceSink):
+
+    # event type, depth, row, column, pruned (index for root), alpha, beta, value - 33 bytes,
+    # little endian. Fields that don't apply to the event are NaN
+    RECORD = struct.Struct("<BHhhHddd")
+    NODE = 0
+    ROOT = 1
+    ITERATION = 2
+
+    def __init__(self, path: str):
+        self._file = open(path, "ab", buffering=1 << 20)
+        self._pack = BinaryTrace.RECORD.pack
+
+    def node(self, depth, row, col, alpha, beta, value, pruned):
+        self._file.write(self._pack(BinaryTrace.NODE, depth, row, col, pruned, alpha, beta, value))
+
+    def root(self, index, row, col, value):
+        self._file.write(self._pack(BinaryTrace.ROOT, 0, row, col, index, math.nan, math.nan, value))
+
+    def iteration(self, depth, row, col, completed):
+        self._file.write(self._pack(BinaryTrace.ITERATION, depth, row, col, int(completed), math.nan, math.nan, math.nan))
+
+    def close(self):
+        self._file.close()
+
+    @staticmethod
+    def read(path: str):
+        # yields the records of a binary trace file as tuples, in the order of RECORD
+        with open(path, "rb") as f:
+            yield from BinaryTrace.RECORD.iter_unpack(f.read())
+
+
+def make_trace(spec: str) -> TraceSink:
+    # "off", "print", "counters", or a file name ending with .jsonl or .bin
+    if spec == "off":
+        return None
+    if spec == "print":
+        return PrintTrace()
+    if spec == "counters":
+        return CounterTrace()
+    if spec.endswith(".jsonl"):
+        return JsonlTrace(spec)
+    if spec.endswith(".bin"):
+        return BinaryTrace(spec)
+
+    raise ValueError(f"search_trace.py::{spec} trace is not supported")
@@ -0,0 +1,186 @@
+# This file plays many games without a human, for benchmarking and tuning the AI
+
+"""
+Plays games of AI against another AI or against random moves, spread over a process pool, and
+writes one record per game to a .jsonl or .csv file as the games finish. At the end it prints the
+throughput: games per second and moves per second.
+
+Sides are called "first" and "second": first is ConnectFour's AI with difficulty, second is
+another ConnectFour's AI with difficulty2 (opponent="ai") or random legal moves
+(opponent="random"). Every side keeps its own ConnectFour (and board, on which its own pieces are
+Board.ai), every move is put on both boards. The side that moves first alternates between games.
+
+AI against AI plays the same game again and again from the same position, so the first
+random_moves moves of every game are random. Random moves come from random.Random(seed + game
+index), so the games are the same in every run.
+
+A record has: game index, board size, side that moved first, winner ("first", "second" or
+"draw"), columns of the moves, time of every move in seconds (rounded to microseconds) and the
+nodes searched for it (0 for random and opening book moves).
+
+Usage: python3 -m self_play [-n games] [-w workers] [-r rows] [-cols columns] [-d difficulty]
+                            [-d2 difficulty of second] [-op ai|random] [-rm random moves] [-o file]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from board import Board
+from connect_four import ConnectFour
+
+CSV_FIELDS = ["game", "rows", "columns", "first_mover", "winner", "n_moves", "moves", "seconds", "nodes"]
+
+
+def play_game(index: int, config: dict) -> dict:
+    # plays one game, config has the arguments of run() except n_games, workers and output
+    rng = random.Random(config["seed"] + index)
+    n_row = config["n_row"]
+    n_column = config["n_column"]
+
+    games = {"first": ConnectFour(Board.red, difficulty_level=config["difficulty"], n_row=n_row,
+                                  n_column=n_column, bitboard=config["bitboard"],
+                                  evaluator=config["evaluator"], opening_book=config["opening_book"])}
+    if config["opponent"] == "ai":
+        games["second"] = ConnectFour(Board.blue, difficulty_level=config["difficulty2"], n_row=n_row,
+                                      n_column=n_column, bitboard=config["bitboard"],
+                                      evaluator=config["evaluator"], opening_book=config["opening_book"])
+
+    # every board has the pieces of its own side as Board.ai
+    boards = {side: game.board for side, game in games.items()}
+    if config["opponent"] == "random":
+        boards["second"] = Board(Board.blue, n_row, n_column)
+
+    side = "first" if index % 2 == 0 else "second"
+    first_mover = side
+    moves = []
+    seconds = []
+    nodes = []
+    winner = "draw"
+    try:
+        while True:
+            start = time.perf_counter()
+            if side in games and len(moves) >= config["random_moves"]:
+                searches = len(games[side].game_stats.searches)
+                row, col = games[side].ai_move()
+                searched = games[side].game_stats.searches[searches:]
+                nodes.append(searched[0].total_nodes if searched else 0)
+            else:
+                row, col = rng.choice(ConnectFour.generate_legal_moves(boards[side]))
+                boards[side].set(row, col, Board.ai)
+                nodes.append(0)
+            seconds.append(round(time.perf_counter() - start, 6))
+            moves.append(col)
+
+            other = "second" if side == "first" else "first"
+            boards[other].set(row, col, Board.player)
+
+            endgame = ConnectFour.is_endgame(boards[side], row, col)
+            if endgame == 1:
+                winner = side
+                break
+            if endgame == -1:
+                break
+            side = other
+    finally:
+        for game in games.values():
+            game.close()
+
+    return {
+        "game": index,
+        "rows": n_row,
+        "columns": n_column,
+        "first_mover": first_mover,
+        "winner": winner,
+        "n_moves": len(moves),
+        "moves": moves,
+        "seconds": seconds,
+        "nodes": nodes,
+    }
+
+
+def _write_record(writer, output: str, record: dict) -> None:
+    if output.endswith(".csv"):
+        row = dict(record)
+        # lists are written as space separated values to keep one game in one row
+        for key in ("moves", "seconds", "nodes"):
+            row[key] = " ".join(str(v) for v in record[key])
+        writer.writerow(row)
+    else:
+        writer.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def run(n_games: int, workers: int=None, output: str=None, n_row: int=6, n_column: int=7,
+        difficulty: int=3, difficulty2: int=3, opponent: str="ai", random_moves: int=2,
+        bitboard: bool=True, evaluator: str="incremental", opening_book: str=None, seed: int=0) -> dict:
+    # plays the games, writes the records to output (if given) and returns the totals
+    if opponent not in ("ai", "random"):
+        raise ValueError(f"self_play::{opponent} opponent is not supported")
+    if output is not None and not output.endswith((".jsonl", ".csv")):
+        raise ValueError("self_play::output must end with .jsonl or .csv")
+
+    config = {
+        "n_row": n_row, "n_column": n_column, "difficulty": difficulty, "difficulty2": difficulty2,
+        "opponent": opponent, "random_moves": random_moves, "bitboard": bitboard,
+        "evaluator": evaluator, "opening_book": opening_book, "seed": seed,
+    }
+
+    totals = {"games": 0, "moves": 0, "nodes": 0, "first": 0, "second": 0, "draw": 0}
+    f = open(output, "w", newline="") if output is not None else None
+    try:
+        writer = None
+        if f is not None:
+            if output.endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                writer.writeheader()
+            else:
+                writer = f
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(play_game, i, config) for i in range(0, n_games)]
+            for future in as_completed(futures):
+                record = future.result()
+                totals["games"] += 1
+                totals["moves"] += record["n_moves"]
+                totals["nodes"] += sum(record["nodes"])
+                totals[record["winner"]] += 1
+                if writer is not None:
+                    _write_record(writer, output, record)
+        totals["seconds"] = time.perf_counter() - start
+    finally:
+        if f is not None:
+            f.close()
+
+    totals["games_per_second"] = totals["games"] / totals["seconds"] if totals["seconds"] > 0 else 0.0
+    totals["moves_per_second"] = totals["moves"] / totals["seconds"] if totals["seconds"] > 0 else 0.0
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--n_games", type=int, help="number of games", default=100)
+    parser.add_argument("-w", "--workers", type=int, help="number of processes", default=multiprocessing.cpu_count())
+    parser.add_argument("-r", "--n_rows", type=int, help="number of rows in board", default=6)
+    parser.add_argument("-cols", "--n_columns", type=int, help="number of columns in board", default=7)
+    parser.add_argument("-d", "--difficulty_level", type=int, help="depth of the first AI", default=3)
+    parser.add_argument("-d2", "--difficulty_level2", type=int, help="depth of the second AI", default=3)
+    parser.add_argument("-op", "--opponent", type=str, help="second side: ai or random", default="ai")
+    parser.add_argument("-rm", "--random_moves", type=int, help="number of random moves at the start of every game", default=2)
+    parser.add_argument("-e", "--evaluator", type=str, help="evaluator of the AIs: full, incremental or numpy", default="incremental")
+    parser.add_argument("-ob", "--opening_book", type=str, help="opening book file of the AIs", default=None)
+    parser.add_argument("-sd", "--seed", type=int, help="seed of the random moves", default=0)
+    parser.add_argument("-o", "--output", type=str, help="file to write the games to, ending with .jsonl or .csv", default=None)
+    args = parser.parse_args()
+
+    totals = run(args.n_games, args.workers, args.output, args.n_rows, args.n_columns,
+                 args.difficulty_level, args.difficulty_level2, args.opponent, args.random_moves,
+                 evaluator=args.evaluator, opening_book=args.opening_book, seed=args.seed)
+
+    print(f"games: {totals['games']} (first won {totals['first']}, second won {totals['second']}, draw {totals['draw']})")
+    print(f"moves: {totals['moves']}, nodes: {totals['nodes']}, time: {totals['seconds']:.2f} s")
+    print(f"{totals['games_per_second']:.2f} games/s, {totals['moves_per_second']:.1f} moves/s")
@@ -0,0 +1,145 @@
+# This file contains the implementation of SharedTranspositionTable class
+
+"""
+SharedTranspositionTable is a TranspositionTable (see transposition_table.py) that lives in a
+multiprocessing.shared_memory buffer, so several processes searching at the same time share what
+they find. It has the same probe()/store()/new_search() interface, so it can be given to
+BoardGameAI as its tt.
+
+The buffer is a fixed size array of 16 byte entries (two unsigned 64 bit words) after a 16 byte
+header (generation, number of entries). An entry is stored as:
+
+    word 0: key ^ data
+    word 1: data
+
+where data packs the entry: value (32 bits, +-inf are the largest/smallest values), depth (10 bits),
+bound type (2 bits), whether there is a best move (1 bit), its row and column (6 bits each) and
+generation (7 bits). There are no locks: two processes can write the same entry at the same time
+and leave one word of each. probe() recomputes word 0 ^ word 1 and accepts the entry only if it
+equals the key, so such torn entries are simply treated as missing.
+
+Values are stored as integers, which is what ConnectFour's evaluators return.
+
+The process that creates the table owns it: only its new_search() increments the generation, and
+unlink() frees the memory. Other processes attach to it with SharedTranspositionTable(name=...).
+"""
+
+from multiprocessing import shared_memory
+
+_MASK64 = (1 << 64) - 1
+_VALUE_MAX = (1 << 31) - 2
+
+
+class SharedTranspositionTable:
+
+    ENTRY_BYTES = 16
+
+    def __init__(self, size_mb: float=16, name: str=None):
+        if name is None:
+            self.size = max(1, int(size_mb * 1024 * 1024) // SharedTranspositionTable.ENTRY_BYTES)
+            self._shm = shared_memory.SharedMemory(create=True, size=(self.size + 1) * SharedTranspositionTable.ENTRY_BYTES)
+            self._owner = True
+            self._words = self._shm.buf.cast("Q")
+            self._words[0] = 0
+            self._words[1] = self.size
+            self.clear()
+        else:
+            self._shm = SharedTranspositionTable.__attach(name)
+            self._owner = False
+            self._words = self._shm.buf.cast("Q")
+            self.size = self._words[1]
+
+        self.name = self._shm.name
+
+    @property
+    def generation(self) -> int:
+        return self._words[0]
+
+    def new_search(self) -> None:
+        # only the owner ages the entries, the other processes join its searches
+        if self._owner:
+            self._words[0] = self._words[0] + 1
+
+    def clear(self) -> None:
+        header = SharedTranspositionTable.ENTRY_BYTES
+        self._shm.buf[header:] = bytes(len(self._shm.buf) - header)
+
+    def probe(self, key: int):
+        # returns (depth, value, bound type, best move) or None if position is not in the table
+        i = 2 + 2 * (key % self.size)
+        data = self._words[i + 1]
+        if self._words[i] ^ data != key or data == 0:
+            return None
+
+        return SharedTranspositionTable.__unpack(data)[:4]
+
+    def store(self, key: int, depth: int, value, flag: int, move) -> None:
+        i = 2 + 2 * (key % self.size)
+        generation = self._words[0] & 127
+
+        old_data = self._words[i + 1]
+        if old_data != 0 and self._words[i] ^ old_data != key:
+            old_depth, _, _, _, old_generation = SharedTranspositionTable.__unpack(old_data)
+            if old_generation == generation and old_depth > depth:
+                # keep the deeper entry of the current search
+                return
+
+        data = SharedTranspositionTable.__pack(depth, value, flag, move, generation)
+        self._words[i + 1] = data
+        self._words[i] = (key ^ data) & _MASK64
+
+    def close(self) -> None:
+        self._words.release()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        # frees the shared memory, called by the owner when no process uses the table anymore
+        self.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __len__(self) -> int:
+        words = self._words
+        return sum(1 for i in range(2, 2 * self.size + 2, 2) if words[i + 1] != 0)
+
+    @staticmethod
+    def __pack(depth: int, value, flag: int, move, generation: int) -> int:
+        if value == float("inf"):
+            v = (1 << 32) - 1
+        elif value == float("-inf"):
+            v = 0
+        else:
+            v = max(-_VALUE_MAX, min(_VALUE_MAX, int(value))) + (1 << 31)
+
+        data = v | (min(depth, 1023) << 32) | (flag << 42) | (generation << 57)
+        if move is not None:
+            data |= (1 << 44) | (move[0] << 45) | (move[1] << 51)
+
+        return data
+
+    @staticmethod
+    def __unpack(data: int):
+        # returns (depth, value, bound type, best move, generation)
+        v = data & 0xFFFFFFFF
+        if v == (1 << 32) - 1:
+            value = float("inf")
+        elif v == 0:
+            value = float("-inf")
+        else:
+            value = v - (1 << 31)
+
+        move = None
+        if data >> 44 & 1:
+            move = (data >> 45 & 63, data >> 51 & 63)
+
+        return data >> 32 & 1023, value, data >> 42 & 3, move, data >> 57
+
+    @staticmethod
+    def __attach(name: str) -> shared_memory.SharedMemory:
+        try:
+            # python 3.13+: don't let this process's resource tracker unlink the owner's memory
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # older versions register it again, processes started by multiprocessing share the
+            # resource tracker of the owner, so this is the same registration
+            return shared_memory.SharedMemory(name=name)
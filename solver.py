@@ -0,0 +1,266 @@
+# This file contains the implementation of Solver class
+
+"""
+Solver finds the exact result of a Connect 4 position with perfect play from both sides, instead of
+the heuristic score of BoardGameAI. It is meant for the standard 6x7 board, where a position becomes
+solvable in a short time once enough pieces are on the board, but works for any size.
+
+Score of a position is from the point of view of the side to move: 0 is a draw, a positive score
+means it wins and a negative one that it loses. The faster the win, the bigger the score: winning
+with the k-th own piece from now gives (number of empty cells + 1) / 2 - k + 1 (integer division),
+so the best move (the one with the highest score) wins as fast as possible, or loses as late as
+possible.
+
+The search is negamax with alpha-beta pruning on bitboards with the same layout as BitBoard (see
+bitboard.py), position = pieces of the side to move, mask = all pieces. On top of it:
+
+- immediate threats: before searching a position, the moves that win at once are checked. If the
+  opponent threatens to win in a column, it is the only move to consider (two threats = lost), and
+  moves that play right below an opponent's threat are never considered, since they lose at once.
+- score bounds: a game can't be won faster than it has moves left, so alpha and beta are narrowed
+  to the possible range before searching.
+- null-window search: solve() doesn't search with the full window. It tests "is the score > x?"
+  with window (x, x + 1), which cuts off much more, and binary searches the score (like MTD(f)).
+- transposition table (see transposition_table.py) of lower and upper bounds, kept between searches.
+- move ordering: center columns first, moves that make more new threats before the others.
+
+With time_limit the search raises an exception inside and think() returns None when time is over,
+the caller then falls back to the heuristic search (see ConnectFour.ai_move()).
+"""
+
+import time
+
+from board import Board
+from bitboard import BitBoard
+from search_stats import SearchStats
+from transposition_table import TranspositionTable, LOWER, UPPER
+
+
+class _SolverTimeout(Exception):
+    pass
+
+
+class Solver:
+
+    def __init__(self, row: int=6, column: int=7, tt_size_mb: float=64):
+        self.row = row
+        self.column = column
+        self.tt = TranspositionTable(tt_size_mb)
+
+        self._h1 = row + 1
+        self._cells = row * column
+        self._bottom = sum(1 << (c * self._h1) for c in range(0, column))
+        self._board_mask = self._bottom * ((1 << row) - 1)
+        self._column_masks = [((1 << row) - 1) << (c * self._h1) for c in range(0, column)]
+        # center columns first, like ConnectFour.center_order()
+        self._order = sorted(range(0, column), key=lambda c: (abs(c - (column - 1) / 2), c))
+
+        self._deadline = None
+        self._node_count = 0
+        self._root_moves = 0
+        self.last_stats = None
+        self.completed_depth = -1
+
+    def solve(self, board: Board, time_limit: float=None):
+        # returns the score of the position for AI to move, None if time was over
+        position, mask, moves = self.__masks(board)
+        self.__begin_search(time_limit, moves)
+        try:
+            if self.__winning(position, mask) & self.__possible(mask):
+                return (self._cells + 1 - moves) // 2
+            return self.__solve(position, mask, moves)
+        except _SolverTimeout:
+            return None
+        finally:
+            self.__end_search(moves)
+
+    def think(self, board: Board, max_depth: int=None, time_limit: float=None):
+        # returns the (row, col) move of AI with the best score, None if time was over
+        # max_depth is not used, the position is always searched to the end of the game
+        position, mask, moves = self.__masks(board)
+        self.__begin_search(time_limit, moves)
+        try:
+            best_col, self.best_score = self.__best_move(position, mask, moves)
+        except _SolverTimeout:
+            return None
+        finally:
+            self.__end_search(moves)
+
+        return (self.row - 1 - self.__popcount(mask & self._column_masks[best_col]), best_col)
+
+    def __begin_search(self, time_limit: float, moves: int) -> None:
+        self._stats = SearchStats()
+        self._stats.grow(self._cells - moves)
+        self._stats.tt_probes = 0
+        self._stats.tt_hits = 0
+        self._start = time.perf_counter()
+        self._deadline = self._start + time_limit if time_limit is not None else None
+        self._root_moves = moves
+        self.completed_depth = -1
+
+    def __end_search(self, moves: int) -> None:
+        self._stats.elapsed = time.perf_counter() - self._start
+        self._stats.completed_depth = self.completed_depth
+        self.last_stats = self._stats
+
+    def __masks(self, board: Board):
+        # returns (pieces of AI, all pieces, number of pieces) in the bitboard layout
+        if not isinstance(board, BitBoard):
+            board = BitBoard.from_bytes(board.to_bytes())
+        return board._ai_mask, board._ai_mask | board._player_mask, board.n_pieces
+
+    def __best_move(self, position: int, mask: int, moves: int):
+        # returns (column, score) of the best move, columns with the same score in center first order
+        possible = self.__possible(mask)
+        winning = self.__winning(position, mask) & possible
+        if winning:
+            for col in self._order:
+                if winning & self._column_masks[col]:
+                    self.completed_depth = 1
+                    return col, (self._cells + 1 - moves) // 2
+
+        candidates = self.__non_losing_moves(position, mask)
+        if not candidates:
+            # opponent wins with the next move whatever AI plays
+            for col in self._order:
+                if possible & self._column_masks[col]:
+                    self.completed_depth = 2
+                    return col, -((self._cells - moves) // 2)
+
+        best_col = None
+        best_score = None
+        for col in self._order:
+            move = candidates & self._column_masks[col]
+            if not move:
+                continue
+            # the child position is always solved, even after a loss was found
+            score = -self.__solve(position ^ mask, mask | move, moves + 1)
+            if best_score is None or score > best_score:
+                best_col = col
+                best_score = score
+
+        self.completed_depth = self._cells - moves
+        return best_col, best_score
+
+    def __solve(self, position: int, mask: int, moves: int) -> int:
+        # score of a position where the side to move can't win at once, by null-window searches
+        low = -((self._cells - moves) // 2)
+        high = (self._cells + 1 - moves) // 2
+        while low < high:
+            middle = low + (high - low) // 2
+            # tests around 0 first and then halves, faster than a plain binary search
+            if middle <= 0 and int(low / 2) < middle:
+                middle = int(low / 2)
+            elif middle >= 0 and high // 2 > middle:
+                middle = high // 2
+
+            score = self.__negamax(position, mask, moves, middle, middle + 1)
+            if score <= middle:
+                high = score
+            else:
+                low = score
+
+        return low
+
+    def __negamax(self, position: int, mask: int, moves: int, alpha: int, beta: int) -> int:
+        # score of the position within (alpha, beta), the side to move can't win at once
+        ply = moves - self._root_moves
+        self._stats.nodes[ply] += 1
+
+        # stop the search when time is over, checked once every 1024 nodes
+        self._node_count += 1
+        if self._deadline is not None and not self._node_count & 1023:
+            if time.perf_counter() > self._deadline:
+                raise _SolverTimeout()
+
+        candidates = self.__non_losing_moves(position, mask)
+        if not candidates:
+            # opponent wins with the next move
+            return -((self._cells - moves) // 2)
+
+        if moves >= self._cells - 2:
+            # no one can win with the remaining 2 pieces
+            return 0
+
+        # opponent can't win with the next move, so the score is at least this
+        low = -((self._cells - 2 - moves) // 2)
+        if alpha < low:
+            alpha = low
+            if alpha >= beta:
+                return alpha
+
+        # can't win with the next move (checked by the caller), so the score is at most this
+        high = (self._cells - 1 - moves) // 2
+        key = position + mask
+        self._stats.tt_probes += 1
+        entry = self.tt.probe(key)
+        if entry is not None:
+            self._stats.tt_hits += 1
+            _, value, flag, _ = entry
+            if flag == UPPER:
+                high = min(high, value)
+            elif flag == LOWER and alpha < value:
+                alpha = value
+                if alpha >= beta:
+                    return alpha
+
+        if beta > high:
+            beta = high
+            if alpha >= beta:
+                return beta
+
+        # moves that make more threats first, center first when equal
+        ordered = []
+        for col in self._order:
+            move = candidates & self._column_masks[col]
+            if move:
+                ordered.append((self.__popcount(self.__winning(position | move, mask)), move))
+        ordered.sort(key=lambda item: item[0], reverse=True)
+
+        for _, move in ordered:
+            score = -self.__negamax(position ^ mask, mask | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                self._stats.cutoffs[ply] += 1
+                self.tt.store(key, self._cells - moves, score, LOWER, None)
+                return score
+            if score > alpha:
+                alpha = score
+
+        self.tt.store(key, self._cells - moves, alpha, UPPER, None)
+        return alpha
+
+    def __possible(self, mask: int) -> int:
+        # cells where a piece can be put, the lowest empty cell of every column
+        return (mask + self._bottom) & self._board_mask
+
+    def __non_losing_moves(self, position: int, mask: int) -> int:
+        # possible moves that don't let the opponent win at once
+        possible = self.__possible(mask)
+        opponent_win = self.__winning(position ^ mask, mask)
+        forced = possible & opponent_win
+        if forced:
+            if forced & (forced - 1):
+                # opponent has two threats, only one of them can be blocked
+                return 0
+            possible = forced
+
+        # don't play below a cell where the opponent would win
+        return possible & ~(opponent_win >> 1)
+
+    def __winning(self, position: int, mask: int) -> int:
+        # empty cells that would complete four in a row for the pieces in position
+        r = (position << 1) & (position << 2) & (position << 3)
+
+        for s in (self._h1, self._h1 - 1, self._h1 + 1):
+            p = (position << s) & (position << 2 * s)
+            r |= p & (position << 3 * s)
+            r |= p & (position >> s)
+            p = (position >> s) & (position >> 2 * s)
+            r |= p & (position << s)
+            r |= p & (position >> 3 * s)
+
+        return r & (self._board_mask ^ mask)
+
+    @staticmethod
+    def __popcount(x: int) -> int:
+        return bin(x).count("1")
@@ -0,0 +1,22 @@
+# Checks that ConnectFour makes its BatchAnalyzer only when positions are analyzed
+
+from board import Board
+from bitboard import BitBoard
+from connect_four import ConnectFour
+
+
+def test_analyzer_is_made_at_the_first_analyze():
+    game = ConnectFour(Board.red, difficulty_level=3, bitboard=True)
+    try:
+        assert game.analyzer is None
+
+        board = BitBoard(Board.red)
+        board.make_move(3, Board.player)
+        [result] = list(game.analyze([board], top_k=2))
+        assert game.analyzer is not None
+
+        # the best line is the one of the best column
+        best = max(score for score in result["scores"] if score is not None)
+        assert len(result["pvs"]) == 2 and result["pvs"][0][0] == best
+    finally:
+        game.close()
@@ -0,0 +1,57 @@
+# Checks that leaving the updates of AnytimeSearch stops its search at once, and that the workers
+# keep their AI between searches
+
+import asyncio
+import functools
+import multiprocessing
+
+import anytime
+from anytime import AnytimeSearch, _FIELDS
+from bitboard import BitBoard
+from board import Board
+from connect_four import ConnectFour
+
+
+def test_break_stops_the_search():
+    search = AnytimeSearch(functools.partial(ConnectFour.make_ai, evaluator="incremental"), workers=1,
+                           board_class=BitBoard)
+    board = BitBoard(Board.red, 6, 7)
+
+    async def run():
+        # without time limit the search to depth 20 would run for a very long time
+        async with search.updates(board, 20) as updates:
+            async for move, score, depth, nodes in updates:
+                break
+
+        # the stop flag is set when the block is left, updates is still referenced so it isn't
+        # garbage collected
+        stopped = [search._state[slot * _FIELDS] for slot in range(0, search._n_slots)]
+        assert 1 in stopped
+        assert updates is not None
+
+        # the only worker is free again, so another search completes
+        return await asyncio.wait_for(search.think(board, 2), 10)
+
+    try:
+        move, _, depth, _ = asyncio.run(run())
+        assert depth == 2
+        assert 0 <= move[1] < board.column
+    finally:
+        search.close()
+
+
+def test_worker_keeps_its_table():
+    # the searches are run in this process, like in a worker
+    anytime._init_worker(functools.partial(ConnectFour.make_ai, evaluator="incremental"),
+                         multiprocessing.Array("d", _FIELDS), BitBoard)
+    board = BitBoard(Board.red)
+    for col, char in ((3, Board.ai), (3, Board.player), (2, Board.ai), (4, Board.player)):
+        board.make_move(col, char)
+
+    first = anytime._search_task(board.to_bytes(), 5, None, 0)
+    ai = anytime._worker_ai
+    # the same search again finds the positions of the first one in the table
+    second = anytime._search_task(board.to_bytes(), 5, None, 0)
+    assert anytime._worker_ai is ai
+    assert second[:3] == first[:3]
+    assert second[3] < first[3] / 2
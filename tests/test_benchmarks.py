@@ -0,0 +1,16 @@
+# Checks that the searches of the benchmark suite visit the nodes and choose the moves of the
+# committed baseline, see benchmarks/suite.py
+
+import json
+
+from benchmarks import suite
+
+
+def test_searches_match_the_baseline():
+    with open(suite.DEFAULT_BASELINE) as f:
+        baseline = json.load(f)["results"]
+    results = suite.run("search")
+
+    assert set(results) == set(baseline)
+    for name, result in results.items():
+        assert (result["nodes"], result["moves"]) == (baseline[name]["nodes"], baseline[name]["moves"]), name
@@ -0,0 +1,40 @@
+# Checks BoardGameAI on positions without moves and on empty lines
+
+import pytest
+
+from board import Board
+from bitboard import BitBoard
+from connect_four import ConnectFour
+
+
+def full_board() -> BitBoard:
+    # 4x4 board full without four in a row: columns of two and two, every other column swapped
+    board = BitBoard(Board.red, 4, 4)
+    for col in range(0, 4):
+        for h in range(0, 4):
+            first = (h < 2) == (col % 2 == 0)
+            board.set(3 - h, col, Board.ai if first else Board.player)
+    return board
+
+
+@pytest.mark.parametrize("pvs", [False, True])
+def test_think_on_a_full_board(pvs):
+    board = full_board()
+    assert board.is_full() and not board.is_win(Board.ai) and not board.is_win(Board.player)
+
+    ai = ConnectFour.make_ai(board, pvs=pvs)
+    assert ai.think(board, 3) == (-1, -1)
+    assert ai.think(board, 3, time_limit=1.0) == (-1, -1)
+    assert ai.best_score is None and ai.principal_variation == []
+    assert list(ai.think_iter(board, 3)) == []
+
+
+def test_evaluate_empty_line():
+    # the position itself, with AI to move: the value of its best move
+    board = BitBoard(Board.red)
+    board.make_move(3, Board.ai)
+    board.make_move(3, Board.player)
+    ai = ConnectFour.make_ai(board, tt_size_mb=0)
+    ai.think(board, 3)
+    assert ai.evaluate_line(board, [], 3) == ai.best_score
+    assert ai.evaluate_line(board, [], 3, last_move=(4, 3)) == ai.best_score
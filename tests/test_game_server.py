@@ -0,0 +1,47 @@
+# Checks that requests with a bad game id get an error instead of closing the connection, and that
+# the workers keep their AI between moves
+
+import asyncio
+import functools
+
+import pytest
+
+import game_server
+from board import Board
+from connect_four import ConnectFour
+from game_server import GameServer
+
+
+@pytest.mark.parametrize("game", [[1], {"id": 1}, "1", 1.5, True, None, 12345])
+def test_bad_game_id(game):
+    async def run():
+        server = GameServer(workers=1)
+        try:
+            new = await server.handle({"op": "new", "difficulty": 1})
+            assert new["ok"] and new["game"] == 1
+            for op in ("move", "close"):
+                response = await server.handle({"op": op, "game": game, "col": 3})
+                assert response == {"ok": False, "error": "unknown game"}
+            # the game is still there
+            assert (await server.handle({"op": "stats"}))["games"] == 1
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+
+
+def test_worker_keeps_its_ai():
+    # the task is run in this process, like in a worker
+    ai_factory = functools.partial(ConnectFour.make_ai, tt_size_mb=0)
+    game_server._init_worker(ai_factory)
+    board = Board(Board.red)
+    for col, char in ((3, Board.ai), (3, Board.player), (4, Board.ai), (2, Board.player)):
+        board.make_move(col, char)
+        row, col, _, depth = game_server._think_task(board.to_bytes(), 3, None)
+        ai = game_server._worker_ai
+        assert (row, col, depth) == (*ai_factory(board).think(board, 3), 3)
+    assert game_server._worker_ai is ai
+
+    # a game of another size gets its own AI
+    game_server._think_task(Board(Board.red, 5, 5).to_bytes(), 1, None)
+    assert game_server._worker_ai is not ai and game_server._worker_board.column == 5
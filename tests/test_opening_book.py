@@ -0,0 +1,33 @@
+# Checks that the opening book is used only when AI isn't set to play weaker than the book
+
+import pytest
+
+from board import Board
+from connect_four import ConnectFour
+from opening_book import BOOK_DEPTH, position_key, write_book
+
+
+@pytest.fixture
+def book(tmp_path):
+    # the move of the empty board is column 0, which the search wouldn't play
+    path = tmp_path / "6x7.bin"
+    write_book(str(path), 6, 7, {position_key(Board(Board.red))[0]: 0})
+    return str(path)
+
+
+@pytest.mark.parametrize("settings, used", [
+    ({"difficulty_level": BOOK_DEPTH}, True),
+    ({"difficulty_level": 1, "seconds_per_move": 0.1}, True),
+    ({"difficulty_level": BOOK_DEPTH - 1}, False),
+    ({"difficulty_level": 1}, False),
+    ({"difficulty_level": BOOK_DEPTH, "engine": "mcts", "mcts_iterations": 50}, False),
+])
+def test_book_is_used_by_strong_enough_settings(book, settings, used):
+    game = ConnectFour(Board.red, opening_book=book, bitboard=True, **settings)
+    try:
+        assert (game.book_move() == (5, 0)) == used
+        if not used and "engine" not in settings:
+            # the search plays a center column
+            assert game.ai_move() != (5, 0)
+    finally:
+        game.close()
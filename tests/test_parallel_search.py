@@ -0,0 +1,69 @@
+# Checks that the workers of RootParallelSearch keep their AI and transposition table between tasks,
+# and that the time limit holds when tasks wait for a worker
+
+import functools
+
+import pytest
+
+from board import Board
+from bitboard import BitBoard
+from connect_four import ConnectFour
+from parallel_search import RootParallelSearch
+
+
+def make_search(tt_size_mb: float):
+    ai_factory = functools.partial(ConnectFour.make_ai, evaluator="incremental", tt_size_mb=tt_size_mb)
+    ai = ai_factory(BitBoard(Board.red))
+    return ai_factory, RootParallelSearch(ai_factory, ai.legal_moves_func, ConnectFour.is_endgame, workers=1,
+                                          board_class=BitBoard, root_moves_func=ai.root_moves_func)
+
+
+def position() -> BitBoard:
+    board = BitBoard(Board.red)
+    for col, char in ((3, Board.ai), (3, Board.player), (2, Board.ai), (4, Board.player)):
+        board.make_move(col, char)
+    return board
+
+
+def test_table_is_kept_between_searches():
+    _, parallel = make_search(16)
+    try:
+        board = position()
+        first = parallel.think(board, 5)
+        first_nodes = parallel.last_stats.total_nodes
+        # the same search again finds the positions of the first one in the table of the worker
+        assert parallel.think(board, 5) == first
+        assert parallel.last_stats.total_nodes < first_nodes / 2
+    finally:
+        parallel.close()
+
+
+def test_same_moves_as_think_after_other_positions():
+    ai_factory, parallel = make_search(0)
+    try:
+        board = position()
+        for col, char in ((2, Board.player), (5, Board.ai), (1, Board.player)):
+            # the board of the worker is loaded with every position, whatever it had before
+            board.make_move(col, char)
+            assert parallel.think(board, 4) == ai_factory(board).think(board, 4)
+    finally:
+        parallel.close()
+
+
+@pytest.mark.parametrize("split_plies", [1, 2])
+def test_time_limit_counts_the_tasks_waiting_for_a_worker(split_plies):
+    ai_factory = functools.partial(ConnectFour.make_ai, evaluator="incremental")
+    ai = ai_factory(BitBoard(Board.red))
+    parallel = RootParallelSearch(ai_factory, ai.legal_moves_func, ConnectFour.is_endgame, workers=1,
+                                  split_plies=split_plies, board_class=BitBoard,
+                                  root_moves_func=ai.root_moves_func)
+    try:
+        board = BitBoard(Board.red)
+        # the pool is started, so its start isn't counted
+        parallel.think(board, 1)
+        # seven root moves (and their replies) for one worker, the search can't reach depth 30
+        parallel.think(board, 30, time_limit=1.0)
+        assert parallel.completed_depth < 30
+        assert parallel.last_stats.elapsed < 1.15
+    finally:
+        parallel.close()
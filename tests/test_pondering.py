@@ -0,0 +1,79 @@
+# Checks that the player's move keeps the pondered search of its position and stops the others, and
+# that the workers keep their AI between tasks
+
+import functools
+import multiprocessing
+
+import pondering
+from bitboard import BitBoard
+from board import Board
+from connect_four import ConnectFour
+
+
+def test_player_move_keeps_the_matching_search():
+    max_depth = 9   # deep enough that no task finishes before the player moves
+    game = ConnectFour(Board.red, difficulty_level=max_depth, bitboard=True, ponder_workers=1)
+    try:
+        game.board.set(5, 3, Board.ai)
+        game.ponder()
+        tasks = dict(game.ponderer._tasks)
+        assert len(tasks) == game.board.column
+
+        # the column searched last, so its task is still waiting when the player moves
+        col = ConnectFour.center_order(game.board.column)[-1]
+        game.player_move(col)
+        kept = game.board.key()
+        assert kept in tasks
+        assert game.ponderer._tasks == {}
+        assert game.ponderer._kept[0] == kept
+        assert game.ponderer._state[1] == col
+
+        # the other tasks are cancelled before they start, or stop before completing max_depth
+        for key, (_, future) in tasks.items():
+            if key == kept:
+                assert not future.cancelled()
+            else:
+                assert future.cancelled() or future.result()[1] < max_depth
+    finally:
+        game.close()
+
+
+def test_pondered_move_is_the_searched_move():
+    game = ConnectFour(Board.red, difficulty_level=3, bitboard=True, ponder_workers=1)
+    fresh = ConnectFour(Board.red, difficulty_level=3, bitboard=True)
+    try:
+        for g in (game, fresh):
+            g.board.set(5, 3, Board.ai)
+        game.ponder()
+        for g in (game, fresh):
+            g.player_move(2)
+
+        move = game.ai_move()
+        assert game.ponderer.completed_depth == 3
+        assert move == fresh.ai_move()
+    finally:
+        game.close()
+        fresh.close()
+
+
+def test_worker_keeps_its_ai():
+    # the tasks are run in this process, like in a worker
+    ai_factory = functools.partial(ConnectFour.make_ai, evaluator="incremental", tt_size_mb=0)
+    state = multiprocessing.Array("d", [1, -1, 0])
+    pondering._init_worker(ai_factory, state, BitBoard)
+    board = BitBoard(Board.red)
+    board.make_move(3, Board.ai)
+    data = board.to_bytes()
+
+    for col in (3, 2, 6):
+        move, depth, _, _ = pondering._ponder_task(data, col, 3, 1)
+        ai = pondering._worker_ai
+        # the board of the worker is left as the position it was loaded with
+        assert pondering._worker_board.n_pieces == 1
+
+        board.make_move(col, Board.player)
+        fresh = ai_factory(board)
+        assert move == fresh.think(board, 3, time_limit=pondering.Ponderer.NO_TIME_LIMIT)
+        assert depth == fresh.completed_depth == 3
+        board.unmake_move()
+    assert pondering._worker_ai is ai
@@ -0,0 +1,22 @@
+# Checks that PositionCache doesn't return moves to columns that are full or not on the board
+
+import pytest
+
+from board import Board
+from position_cache import PositionCache
+
+
+@pytest.mark.parametrize("col", [3, 7])
+def test_entry_of_illegal_move(col):
+    board = Board(Board.red)
+    for i in range(0, board.row):
+        board.make_move(3, Board.ai if i % 2 == 0 else Board.player)
+    cache = PositionCache()
+    # like an entry of a stale or corrupted file
+    cache.put(board, 5, (-1, col))
+
+    assert cache.get(board, 5) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    cache.put(board, 5, (5, 2))
+    assert cache.get(board, 5) == (5, 2)
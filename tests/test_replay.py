@@ -0,0 +1,31 @@
+# Checks the games replay.py finds invalid, and that records can't make it allocate huge boards
+
+import json
+
+import replay
+
+
+def test_invalid_games(tmp_path):
+    path = tmp_path / "games.txt"
+    # not UTF-8, and a number too big for an int
+    path.write_bytes(b"3 3 4 4 5 5 6\n3,3,4\n0000000\n3 3 4 4 5 5 6 1\n9 1\nabc\n\xff\xfe 3\n"
+                     b'{"moves": [1e400]}\n{"rows": 1e400, "moves": [3]}\n3344556\n')
+    totals = replay.run(str(path), workers=1)
+
+    assert (totals["games"], totals["valid"], totals["first"], totals["unfinished"]) == (10, 3, 2, 1)
+    assert [game for game, _ in totals["errors"]] == [2, 3, 4, 5, 6, 7, 8]
+    assert [error for _, error in totals["errors"]][4:] == ["unreadable record"] * 3
+
+
+def test_board_size_is_limited(tmp_path):
+    path = tmp_path / "games.jsonl"
+    records = [{"rows": 100000, "columns": 7, "moves": [3]}, {"rows": 6, "columns": 31, "moves": [3]},
+               {"rows": 30, "columns": 30, "moves": [3, 3]}]
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    replay._boards.clear()
+    totals = replay.run(str(path), workers=1)
+
+    assert [error for _, error in totals["errors"]] == ["board size 100000x7 is not supported",
+                                                        "board size 6x31 is not supported"]
+    assert totals["valid"] == 1
+    assert [key[:2] for key in replay._boards] == [(30, 30)]
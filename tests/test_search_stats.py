@@ -0,0 +1,64 @@
+# Checks the endgame call counts of the searches and the names of the exported Prometheus metrics
+
+import functools
+
+import pytest
+
+from board import Board
+from bitboard import BitBoard
+from board_game_AI import BoardGameAI
+from connect_four import ConnectFour
+from mcts import MCTSSearch
+from search_stats import GameStats
+
+
+class CountingEndgame:
+    # ConnectFour.is_endgame that counts its calls
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, board: Board, row: int, col: int) -> int:
+        self.calls += 1
+        return ConnectFour.is_endgame(board, row, col)
+
+
+def position() -> BitBoard:
+    board = BitBoard(Board.red)
+    for col, char in ((3, Board.ai), (3, Board.player), (2, Board.ai)):
+        board.make_move(col, char)
+    return board
+
+
+@pytest.mark.parametrize("pvs, time_limit", [(False, None), (True, None), (False, 10.0)])
+def test_endgame_calls_are_counted(pvs, time_limit):
+    board = position()
+    endgame = CountingEndgame()
+    legal_moves_func = functools.partial(ConnectFour.generate_legal_moves,
+                                         order=ConnectFour.center_order(board.column))
+    ai = BoardGameAI(ConnectFour.evaluation_func, endgame, legal_moves_func, tt_size_mb=1, pvs=pvs)
+    ai.think(board, 4, time_limit=time_limit)
+    assert ai.last_stats.endgame_calls == endgame.calls > 0
+
+
+def test_mcts_endgame_calls_are_counted():
+    endgame = CountingEndgame()
+    mcts = MCTSSearch(ConnectFour.generate_legal_moves, endgame, iterations=200, seed=1)
+    mcts.think(position())
+    assert mcts.last_stats.endgame_calls == endgame.calls > 0
+
+
+def test_prometheus_counters_end_with_total():
+    board = position()
+    ai = ConnectFour.make_ai(board)
+    ai.think(board, 3)
+    stats = GameStats()
+    stats.add(ai.last_stats)
+
+    lines = stats.to_prometheus().splitlines()
+    types = dict(line.split()[2:4] for line in lines if line.startswith("# TYPE"))
+    for metric, kind in types.items():
+        assert metric.endswith("_total") == (kind == "counter"), metric
+    assert "connect4_ai_nodes_total" in types
+    assert "connect4_ai_eval_time_seconds_total" in types
+    assert types["connect4_ai_nodes_per_second"] == "gauge"
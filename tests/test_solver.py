@@ -0,0 +1,85 @@
+# Checks the exact scores of Solver against a plain minimax to the end of the game on small boards
+
+import random
+
+import pytest
+
+from board import Board
+from bitboard import BitBoard
+from solver import Solver
+
+
+def brute_force(board: BitBoard, char: int, memo: dict) -> int:
+    # score of the position for char to move, same scale as Solver: winning with the k-th own piece
+    # from now gives (number of empty cells + 1) // 2 - k + 1
+    key = board.key()
+    if key in memo:
+        return memo[key]
+
+    cells = board.row * board.column
+    other = Board.player if char == Board.ai else Board.ai
+    best = None
+    for col in range(0, board.column):
+        if board.heights[col] == board.row:
+            continue
+        board.make_move(col, char)
+        if board.winner == char:
+            score = (cells + 1 - board.n_pieces + 1) // 2
+        elif board.is_full():
+            score = 0
+        else:
+            score = -brute_force(board, other, memo)
+        board.unmake_move()
+        if best is None or score > best:
+            best = score
+
+    memo[key] = best
+    return best
+
+
+def random_positions(n_row: int, n_column: int, n_pieces: int, count: int, seed: int):
+    # positions with n_pieces random moves (AI first, so AI is to move) where the game isn't over
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = BitBoard(Board.red, n_row, n_column)
+        char = Board.ai
+        for _ in range(0, n_pieces):
+            col = rng.choice([c for c in range(0, n_column) if board.heights[c] < n_row])
+            board.make_move(col, char)
+            if board.winner != Board.empty:
+                break
+            char = Board.player if char == Board.ai else Board.ai
+        else:
+            positions.append(board)
+    return positions
+
+
+@pytest.mark.parametrize("n_row, n_column, n_pieces", [(4, 4, 0), (4, 4, 4), (4, 5, 6), (5, 4, 6)])
+def test_solve_is_exact(n_row, n_column, n_pieces):
+    solver = Solver(n_row, n_column, tt_size_mb=1)
+    memo = {}
+    for board in random_positions(n_row, n_column, n_pieces, 1 if n_pieces == 0 else 10, seed=n_pieces):
+        assert solver.solve(board) == brute_force(board, Board.ai, memo)
+
+
+@pytest.mark.parametrize("n_row, n_column, n_pieces", [(4, 4, 4), (4, 5, 6)])
+def test_think_plays_a_best_move(n_row, n_column, n_pieces):
+    solver = Solver(n_row, n_column, tt_size_mb=1)
+    memo = {}
+    for board in random_positions(n_row, n_column, n_pieces, 10, seed=n_pieces + 1):
+        best = brute_force(board, Board.ai, memo)
+        row, col = solver.think(board)
+        assert solver.best_score == best
+
+        # the move the solver plays has the score it says
+        board.make_move(col, Board.ai)
+        cells = n_row * n_column
+        if board.winner == Board.ai:
+            score = (cells + 1 - board.n_pieces + 1) // 2
+        elif board.is_full():
+            score = 0
+        else:
+            score = -brute_force(board, Board.player, memo)
+        board.unmake_move()
+        assert score == best
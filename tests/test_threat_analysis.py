@@ -0,0 +1,86 @@
+# Checks that threat analysis finds the same results as the plain search with fewer nodes, and that
+# the parallel search plays the same moves as the sequential one with it
+
+import functools
+import random
+
+from board import Board
+from bitboard import BitBoard
+from connect_four import ConnectFour
+from parallel_search import RootParallelSearch
+from solver import Solver
+
+
+def random_position(n_row: int, n_column: int, n_pieces: int, seed: int) -> BitBoard:
+    # position after n_pieces random moves (AI first, so AI is to move) where the game isn't over
+    rng = random.Random(seed)
+    while True:
+        board = BitBoard(Board.red, n_row, n_column)
+        char = Board.ai
+        for _ in range(0, n_pieces):
+            row, col = rng.choice(ConnectFour.generate_legal_moves(board))
+            board.make_move(col, char)
+            if board.winner != Board.empty or board.is_full():
+                break
+            char = Board.player if char == Board.ai else Board.ai
+        else:
+            return board
+
+
+def swap_sides(board: BitBoard) -> BitBoard:
+    # same position with the pieces of AI and player swapped, for solving it with player to move
+    swapped = BitBoard(Board.red, board.row, board.column)
+    for row in range(0, board.row):
+        for col in range(0, board.column):
+            char = board.get(row, col)
+            if char != Board.empty:
+                swapped.set(row, col, Board.player if char == Board.ai else Board.ai)
+    return swapped
+
+
+def sign(value) -> int:
+    return 0 if value == 0 else (1 if value > 0 else -1)
+
+
+def test_same_results_with_fewer_nodes():
+    # searched to the end of the game, so the scores are the results: win, draw or loss
+    n_row, n_column, n_pieces = 4, 5, 8
+    solver = Solver(n_row, n_column, tt_size_mb=1)
+    nodes = {False: 0, True: 0}
+    for seed in range(0, 12):
+        board = random_position(n_row, n_column, n_pieces, seed)
+        result = sign(solver.solve(board))
+        for threat_analysis in (False, True):
+            ai = ConnectFour.make_ai(board, evaluator="incremental", tt_size_mb=0,
+                                     threat_analysis=threat_analysis)
+            row, col = ai.think(board, n_row * n_column - n_pieces)
+            nodes[threat_analysis] += ai.last_stats.total_nodes
+            assert sign(ai.best_score) == result
+
+            # the move played keeps the result
+            board.make_move(col, Board.ai)
+            if board.winner == Board.ai:
+                assert result == 1
+            elif not board.is_full():
+                assert -sign(solver.solve(swap_sides(board))) == result
+            board.unmake_move()
+
+    assert nodes[True] < nodes[False] / 1.5
+
+
+def test_parallel_search_plays_the_same_moves():
+    ai_factory = functools.partial(ConnectFour.make_ai, evaluator="incremental", tt_size_mb=0,
+                                   threat_analysis=True)
+    for split_plies in (1, 2):
+        board = BitBoard(Board.red)
+        ai = ai_factory(board)
+        parallel = RootParallelSearch(ai_factory, ai.legal_moves_func, ConnectFour.is_endgame, workers=2,
+                                      split_plies=split_plies, board_class=BitBoard,
+                                      root_moves_func=ai.root_moves_func, threat_func=ai.threat_func)
+        try:
+            for seed in range(0, 6):
+                board = random_position(6, 7, 9, seed)
+                ai = ai_factory(board)
+                assert parallel.think(board, 4) == ai.think(board, 4)
+        finally:
+            parallel.close()
@@ -0,0 +1,140 @@
+# This file contains the implementation of ThreatAnalyzer class
+
+"""
+ThreatAnalyzer finds the threats of both sides on a Connect 4 board: empty cells where a side
+would complete four in a row. A threat in a playable cell (the lowest empty cell of its column) can
+be used at once, a threat higher up waits until its column is filled up to it.
+
+The board is looked at as two bit masks with the layout of BitBoard (see bitboard.py), a BitBoard
+already has them, for a Board they are made from its cells. The threat cells of all the lines are
+then found at once with shifts, for any board size:
+
+- wins: columns where the side to move wins with its next piece,
+- blocks: columns where the opponent would win with its next piece, the side to move must play
+  there. Two of them can't both be blocked, the side to move loses,
+- losing: columns where the piece would land right below an opponent's threat (and doesn't win),
+  the opponent would win on top of it,
+- odd and even threats of both sides, by the row of the threat counted from the bottom (1 is the
+  bottom row). In the endgame the first player usually needs odd threats and the second player
+  even ones, since the columns are filled up in pairs.
+
+analyze() gives all of these for the side to move. forced_moves() gives only what the search needs,
+and is used by BoardGameAI (see its threat_func) at every node:
+
+    (1, winning columns)      the side to move wins at once, no need to search the moves
+    (-1, None)                the side to move loses whatever it plays, the opponent wins next move
+    (0, columns to search)    the only blocking move, or the moves that don't lose at once
+    (0, None)                 nothing is forced, all moves are searched
+"""
+
+from board import Board
+from bitboard import BitBoard
+
+
+class ThreatAnalyzer:
+
+    def __init__(self, row: int, column: int):
+        self.row = row
+        self.column = column
+
+        self._h1 = row + 1   # bits of a column, with the sentinel bit on top
+        self._bottom = sum(1 << (c * self._h1) for c in range(0, column))
+        self._board_mask = self._bottom * ((1 << row) - 1)
+        self._shifts = (self._h1, self._h1 - 1, self._h1 + 1)
+        # cells of the odd rows from the bottom (1st, 3rd, ...), bits 0, 2, ... of every column
+        self._odd_rows = self._bottom * sum(1 << h for h in range(0, row, 2))
+
+    def masks(self, board: Board) -> tuple[int, int]:
+        # returns (AI pieces, player pieces) in the BitBoard layout
+        if isinstance(board, BitBoard):
+            return board._ai_mask, board._player_mask
+
+        cells = board.to_array()
+        ai_mask = 0
+        player_mask = 0
+        for c in range(0, self.column):
+            for h in range(0, board.heights[c]):
+                if cells[self.row - 1 - h, c] == Board.ai:
+                    ai_mask |= 1 << (c * self._h1 + h)
+                else:
+                    player_mask |= 1 << (c * self._h1 + h)
+
+        return ai_mask, player_mask
+
+    def threats(self, pieces: int, mask: int) -> int:
+        # empty cells that would complete four in a row for pieces, mask is all the pieces
+        # vertical: only 3 pieces below the cell
+        r = (pieces << 1) & (pieces << 2) & (pieces << 3)
+
+        # horizontal and diagonals: 3 on one side, or 2 on one side and 1 on the other
+        for s in self._shifts:
+            p = (pieces << s) & (pieces << 2 * s)
+            r |= p & ((pieces << 3 * s) | (pieces >> s))
+            p = (pieces >> s) & (pieces >> 2 * s)
+            r |= p & ((pieces << s) | (pieces >> 3 * s))
+
+        return r & (self._board_mask ^ mask)
+
+    def playable(self, mask: int) -> int:
+        # lowest empty cell of every column that is not full
+        return (mask + self._bottom) & self._board_mask
+
+    def analyze(self, board: Board, char: int) -> dict:
+        # threats of the position with char to move, see the description at the top of the file
+        ai_mask, player_mask = self.masks(board)
+        own, other = (ai_mask, player_mask) if char == Board.ai else (player_mask, ai_mask)
+        mask = ai_mask | player_mask
+        playable = self.playable(mask)
+        own_threats = self.threats(own, mask)
+        other_threats = self.threats(other, mask)
+
+        wins = own_threats & playable
+        return {
+            "wins": self.__columns(wins),
+            "blocks": self.__columns(other_threats & playable),
+            "losing": self.__columns((other_threats >> 1) & playable & ~wins),
+            "odd_threats": bin(own_threats & self._odd_rows).count("1"),
+            "even_threats": bin(own_threats & ~self._odd_rows).count("1"),
+            "opponent_odd_threats": bin(other_threats & self._odd_rows).count("1"),
+            "opponent_even_threats": bin(other_threats & ~self._odd_rows).count("1"),
+        }
+
+    def forced_moves(self, board: Board, char: int):
+        # returns (outcome, columns) for the search, see the description at the top of the file
+        ai_mask, player_mask = self.masks(board)
+        own, other = (ai_mask, player_mask) if char == Board.ai else (player_mask, ai_mask)
+        mask = ai_mask | player_mask
+        playable = self.playable(mask)
+        if not playable:
+            return 0, None
+
+        wins = self.threats(own, mask) & playable
+        if wins:
+            return 1, self.__columns(wins)
+
+        other_threats = self.threats(other, mask)
+        blocks = other_threats & playable
+        # moves below an opponent's threat, and moves that don't block when there is a threat
+        if blocks:
+            if blocks & (blocks - 1):
+                return -1, None
+            safe = blocks & ~(other_threats >> 1)
+        else:
+            safe = playable & ~(other_threats >> 1)
+
+        if not safe:
+            return -1, None
+        if safe == playable:
+            return 0, None
+        return 0, self.__columns(safe)
+
+    def __columns(self, cells: int) -> set[int]:
+        # columns that have a cell in cells
+        h1 = self._h1
+        columns = set()
+        while cells:
+            low = cells & -cells
+            columns.add((low.bit_length() - 1) // h1)
+            cells ^= low
+
+        return columns
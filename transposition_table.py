@@ -0,0 +1,99 @@
+# This file contains the implementation of ZobristHash and TranspositionTable classes
+
+"""
+The same position can be reached by many different move orders, TranspositionTable remembers
+the result of searching a position so the search does not have to do it again.
+
+Positions are identified by Zobrist hash: every (row, column, piece) triple gets a random 64 bit
+number, and the hash of a position is xor of the numbers of all the pieces on the board. Putting
+or removing a piece is just one xor, so the hash is updated incrementally while searching instead
+of being recomputed at each node. Keys are generated from a fixed seed, so the same position gets
+the same hash in every run.
+
+Each entry stores the remaining depth the position was searched with, its value, the type of the
+value (EXACT, LOWER bound or UPPER bound, because of alpha-beta cutoffs) and the best move found.
+
+Table has a fixed number of slots computed from the memory cap (size_mb). Position is stored at
+slot (hash % number of slots). When two positions map to the same slot, new entry replaces the old
+one if the old one comes from the previous searches (older generation) or if the new one was
+searched at least as deep as the old one (depth-preferred replacement). new_search() should be
+called at the beginning of every search to age existing entries.
+"""
+
+import random
+
+from board import Board
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class ZobristHash:
+
+    def __init__(self, row: int, column: int, seed: int=20240611):
+        self.row = row
+        self.column = column
+
+        rng = random.Random(seed)
+        self._keys = {}
+        for char in (Board.player, Board.ai):
+            self._keys[char] = [[rng.getrandbits(64) for _ in range(column)] for _ in range(row)]
+
+        # xor-ed to the hash when it is the min player's turn
+        self.side = rng.getrandbits(64)
+
+    def key(self, row: int, col: int, char: int) -> int:
+        return self._keys[char][row][col]
+
+    def hash_board(self, board: Board) -> int:
+        # computes the hash of the board from scratch
+        h = 0
+        for i in range(0, board.row):
+            for j in range(0, board.column):
+                ch = board.get(i, j)
+                if ch != Board.empty:
+                    h ^= self._keys[ch][i][j]
+
+        return h
+
+
+class TranspositionTable:
+
+    # rough size of one entry in memory: tuple of 6 items and the ints in it + slot in the list
+    ENTRY_BYTES = 128
+
+    def __init__(self, size_mb: float=16):
+        if size_mb <= 0:
+            raise ValueError("TranspositionTable::size_mb must be positive")
+
+        self.size = max(1, int(size_mb * 1024 * 1024) // TranspositionTable.ENTRY_BYTES)
+        self._entries = [None] * self.size
+        self.generation = 0
+
+    def new_search(self) -> None:
+        # entries from previous searches become replaceable
+        self.generation += 1
+
+    def clear(self) -> None:
+        self._entries = [None] * self.size
+        self.generation = 0
+
+    def probe(self, key: int):
+        # returns (depth, value, bound type, best move) or None if position is not in the table
+        entry = self._entries[key % self.size]
+        if entry is None or entry[0] != key:
+            return None
+
+        return entry[1], entry[2], entry[3], entry[4]
+
+    def store(self, key: int, depth: int, value, flag: int, move) -> None:
+        slot = key % self.size
+        old = self._entries[slot]
+        if old is not None and old[0] != key and old[5] == self.generation and old[1] > depth:
+            # keep the deeper entry of the current search
+            return
+
+        self._entries[slot] = (key, depth, value, flag, move, self.generation)
+
+    def __len__(self) -> int:
+        return sum(1 for e in self._entries if e is not None)